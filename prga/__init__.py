@@ -49,10 +49,11 @@ from .passes.translation import Translation
 from .passes.annotation import SwitchPathAnnotation
 from .passes.proginsertion import ProgCircuitryInsertion
 from .passes.rtl import VerilogCollection
+from .passes.bitgen import BitstreamIndexGeneration
 __all__.extend([
     "Flow", "Translation", "SwitchPathAnnotation", "VerilogCollection", "VPRArchGeneration", "ProgCircuitryInsertion",
     "VPRScalableDelegate", "VPRScalableArchGeneration", "VPR_RRG_Generation", "YosysScriptsCollection",
-    "Materialization",
+    "Materialization", "BitstreamIndexGeneration",
     ])
 
 # Integration
@@ -0,0 +1,68 @@
+# -*- encoding: ascii -*-
+"""Benchmarks for the XML streaming generation.
+
+Run with ``python -m prga.benchmark [elements]``.
+"""
+
+from .xml import XMLGenerator
+
+from timeit import timeit
+from io import BytesIO
+import sys
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ['benchmark_xml_generator']
+
+# ----------------------------------------------------------------------------
+# -- Benchmark ---------------------------------------------------------------
+# ----------------------------------------------------------------------------
+def _rrg_like_xml(elements, pretty, fast):
+    """Generate ``elements`` RRG-like ``node`` and ``edge`` elements with `XMLGenerator`.
+
+    Returns:
+        :obj:`bytes`: The generated XML
+    """
+    ostream = BytesIO()
+    with XMLGenerator(ostream, pretty, fast = fast) as xml, xml.element("rr_graph"):
+        with xml.element("rr_nodes"):
+            for i in range(elements):
+                with xml.element("node", {"capacity": 1, "id": i, "type": "CHANX", "direction": "INC_DIR"}):
+                    xml.element_leaf("loc", {"xlow": i % 97, "ylow": i % 89, "ptc": i % 64,
+                        "xhigh": i % 97, "yhigh": i % 89})
+                    xml.element_leaf("timing", {"C": 0., "R": 0.})
+                    xml.element_leaf("segment", {"segment_id": 0})
+        with xml.element("rr_edges"):
+            for i in range(elements):
+                attrs = {"src_node": i, "sink_node": (i * 7) % elements, "switch_id": 1}
+                if i % 4:
+                    xml.element_leaf("edge", attrs)
+                else:
+                    with xml.element("edge", attrs), xml.element("metadata"):
+                        xml.element_leaf("meta", {"name": "fasm_features"}, "sbox.{a[0]->b[0]}")
+    return ostream.getvalue()
+
+def benchmark_xml_generator(elements = 100000, repeat = 3, pretty = True):
+    """Time `XMLGenerator` with and without the fast mode on a stream of RRG-like ``node`` and ``edge`` elements.
+
+    Args:
+        elements (:obj:`int`): Number of nodes and number of edges generated in each run
+        repeat (:obj:`int`): Number of timed runs
+        pretty (:obj:`bool`): If the output XML should be indented
+
+    Returns:
+        :obj:`dict` [:obj:`bool`, :obj:`float` ]: Bytes per second with and without the fast mode
+    """
+    size, throughput = len(_rrg_like_xml(elements, pretty, False)), {}
+    for fast in (False, True):
+        t = timeit(lambda: _rrg_like_xml(elements, pretty, fast), number = repeat) / repeat
+        throughput[fast] = size / t
+        _logger.info("XMLGenerator(pretty = {}, fast = {}): {:.3f}s per run, {:.1f} MiB/s"
+                .format(pretty, fast, t, size / t / (1 << 20)))
+    return throughput
+
+if __name__ == "__main__":
+    logging.basicConfig(level = logging.INFO, format = "%(message)s")
+    for pretty in (True, False):
+        benchmark_xml_generator(*map(int, sys.argv[1:2]), pretty = pretty)
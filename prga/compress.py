@@ -0,0 +1,159 @@
+# -*- encoding: ascii -*-
+"""Multi-threaded gzip compression."""
+
+from .util import Object
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import os, struct, time, zlib, multiprocessing
+
+__all__ = ['ParallelGzipWriter', 'open_output']
+
+# ----------------------------------------------------------------------------
+# -- Parallel Gzip Writer ----------------------------------------------------
+# ----------------------------------------------------------------------------
+class ParallelGzipWriter(Object):
+    """Write a gzip stream with the input split into blocks that are compressed in parallel, in the same way as
+    `pigz`_.
+
+    Args:
+        fileobj (file-like object): The binary output stream. It is not closed when this writer is closed
+
+    Keyword Args:
+        compresslevel (:obj:`int`): Compression level, from 0 to 9
+        threads (:obj:`int`): Number of threads. zlib releases the GIL while compressing, so blocks are compressed
+            concurrently. Use the number of CPUs, up to 8, by default. Writers created in daemonic worker processes,
+            e.g. the workers of ``Flow(jobs = N)``, use 1 thread by default so the threads are not multiplied by the
+            worker processes
+        block_size (:obj:`int`): Number of input bytes in each block
+
+    Each block is compressed into raw deflate data with the last 32KiB of the previous block as the dictionary, and
+    ended with a sync flush except the last one. The compressed blocks are written in order after a gzip header, so
+    the output is a single gzip member that any gzip reader accepts, and is about the same size as compressing the
+    whole input in one go.
+
+    .. _pigz: https://zlib.net/pigz/
+    """
+
+    __slots__ = ['fileobj', 'compresslevel', 'threads', 'block_size',
+            '_executor', '_pending', '_buffer', '_buffered', '_dictionary', '_crc', '_size']
+
+    # maximum number of threads used when ``threads`` is not specified
+    max_default_threads = 8
+
+    def __init__(self, fileobj, *, compresslevel = 9, threads = None, block_size = 1 << 17):
+        self.fileobj = fileobj
+        self.compresslevel = compresslevel
+        if threads is None:
+            if multiprocessing.current_process().daemon:
+                threads = 1
+            else:
+                threads = min(os.cpu_count() or 1, self.max_default_threads)
+        self.threads = max(1, threads)
+        self.block_size = block_size
+        self._executor = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+        self._pending = deque()     # futures of compressed blocks, in order
+        self._buffer = []           # input collected for the next block
+        self._buffered = 0          # number of bytes in the buffer
+        self._dictionary = b''      # last 32KiB of the input submitted
+        self._crc = 0
+        self._size = 0
+
+        # gzip header, with the file name if there is one
+        name = getattr(fileobj, "name", None)
+        name = os.path.basename(name).encode("latin-1", "replace") if isinstance(name, str) else b''
+        if name.endswith(b".gz"):
+            name = name[:-3]
+        xfl = 2 if compresslevel == 9 else 4 if compresslevel == 1 else 0
+        fileobj.write(struct.pack("<BBBBIBB", 0x1f, 0x8b, 8, 8 if name else 0, int(time.time()), xfl, 255))
+        if name:
+            fileobj.write(name + b'\0')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @classmethod
+    def _compress(cls, data, dictionary, compresslevel, last):
+        if dictionary:
+            compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS, zdict = dictionary)
+        else:
+            compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    def _submit(self, data, last = False):
+        """Compress one block."""
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        args = data, self._dictionary, self.compresslevel, last
+        self._dictionary = (self._dictionary + data)[-(1 << 15):]
+        if self._executor is None:
+            self.fileobj.write(self._compress(*args))
+            return
+        self._pending.append(self._executor.submit(self._compress, *args))
+        # keep a bounded number of blocks in flight
+        while len(self._pending) > 2 * self.threads or (last and self._pending):
+            self.fileobj.write(self._pending.popleft().result())
+
+    @property
+    def closed(self):
+        """:obj:`bool`: Test if this writer is closed."""
+        return self._buffer is None
+
+    def write(self, data):
+        """Compress ``data``.
+
+        Args:
+            data (:obj:`bytes`-like object):
+
+        Returns:
+            :obj:`int`: Number of bytes written
+        """
+        self._buffer.append(data := bytes(data))
+        self._buffered += (size := len(data))
+        if self._buffered >= self.block_size:
+            buffered = b''.join(self._buffer)
+            end = len(buffered) - len(buffered) % self.block_size
+            for start in range(0, end, self.block_size):
+                self._submit(buffered[start : start + self.block_size])
+            self._buffer = [buffered[end:]]
+            self._buffered = len(buffered) - end
+        return size
+
+    def flush(self):
+        """Write the blocks compressed so far to the output stream. Input that does not fill a block yet is kept
+        for better compression."""
+        while self._pending and self._pending[0].done():
+            self.fileobj.write(self._pending.popleft().result())
+        self.fileobj.flush()
+
+    def close(self):
+        """Compress the remaining input, write the gzip trailer, and stop the threads."""
+        if self.closed:
+            return
+        self._submit(b''.join(self._buffer), True)
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.fileobj.write(struct.pack("<II", self._crc, self._size & 0xFFFFFFFF))
+        self._buffer = None
+
+# ----------------------------------------------------------------------------
+# -- Output Files ------------------------------------------------------------
+# ----------------------------------------------------------------------------
+def open_output(fileobj, name, compresslevel = 9, threads = None):
+    """Wrap an output stream with `ParallelGzipWriter` if the output file name ends with ".gz".
+
+    Args:
+        fileobj (file-like object): The binary output stream
+        name (:obj:`str`): Name of the output file
+        compresslevel (:obj:`int`): Compression level, from 0 to 9
+        threads (:obj:`int`): Number of threads. Refer to `ParallelGzipWriter` for the default
+
+    Returns:
+        file-like object: ``fileobj`` itself, or a `ParallelGzipWriter` that must be closed to complete the output
+    """
+    if name.endswith(".gz"):
+        return ParallelGzipWriter(fileobj, compresslevel = compresslevel, threads = threads)
+    return fileobj
@@ -209,6 +209,7 @@ class TileBuilder(BaseArrayBuilder):
         """
         # two passes
         # 1. visit CBoxes and connect
+        pairs = []
         for key, instance in self._module.instances.items():
             if isinstance(key, int):
                 continue
@@ -248,9 +249,10 @@ class TileBuilder(BaseArrayBuilder):
 
                 # connect
                 if box_pin.model.direction.is_input:
-                    self.connect(box_pin_conn, box_pin)
+                    pairs.append( (box_pin_conn, box_pin) )
                 else:
-                    self.connect(box_pin, box_pin_conn)
+                    pairs.append( (box_pin, box_pin_conn) )
+        NetUtils.connect_bulk(pairs, module = self._module)
 
         # 2. visit subblocks and connect
         for key, instance in self._module.instances.items():
@@ -4,7 +4,7 @@ from .base import BaseRoutingBoxBuilder
 from ...common import (Position, BridgeID, BridgeType, BlockFCValue, ModuleView, ModuleClass, BlockPinID, Direction,
         Orientation, Dimension, BlockPortFCValue)
 from ....algorithm.interconnect import InterconnectAlgorithms
-from ....netlist import PortDirection, Module, ModuleUtils
+from ....netlist import PortDirection, Module, ModuleUtils, NetUtils
 from ....exception import PRGAAPIError, PRGAInternalError
 from ....util import uno
 
@@ -198,6 +198,7 @@ class ConnectionBoxBuilder(BaseRoutingBoxBuilder):
                 fc = fc_override.setdefault(port.parent.key, BlockFCValue(default_fc.default_in, default_fc.default_out))
                 fc.overrides[port.key] = BlockPortFCValue(0)
         tile, orientation, offset = self._module.key
+        pairs = []
         # iterate through segment types
         for sgmt in self._context.segments.values():
             itracks = tuple(product(range(sgmt.width), range(sgmt.length)))
@@ -225,7 +226,7 @@ class ConnectionBoxBuilder(BaseRoutingBoxBuilder):
                                         Orientation.compose(orientation.dimension.perpendicular, sgmt_dir),
                                         section, dont_create = dont_create)
                                 if blockpin is not None and sgmt_i is not None:
-                                    self.connect(sgmt_i[idx], blockpin[pi])
+                                    pairs.append( (sgmt_i[idx], blockpin[pi]) )
                     else:
                         for ti, pi in InterconnectAlgorithms.crossbar(
                                 len(otracks), len(pin), fc.port_fc(pin.model, sgmt, False), n_util = outil):
@@ -235,7 +236,8 @@ class ConnectionBoxBuilder(BaseRoutingBoxBuilder):
                                         Orientation.compose(orientation.dimension.perpendicular, sgmt_dir),
                                         dont_create = dont_create)
                                 if blockpin is not None and sgmt_o is not None:
-                                    self.connect(blockpin[pi], sgmt_o[idx])
+                                    pairs.append( (blockpin[pi], sgmt_o[idx]) )
+        NetUtils.connect_bulk(pairs, module = self._module)
  
     @classmethod
     def new(cls, tile, orientation, offset = None, *, name = None, **kwargs):
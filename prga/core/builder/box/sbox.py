@@ -87,7 +87,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
         input_ = self.get_segment_input(isgmt, iori, isec, dont_create = dont_create)
         output = self.get_segment_output(osgmt, oori, osec, dont_create = dont_create)
         if input_ is not None and output is not None:
-            self.connect(input_[idx], output[odx])
+            yield input_[idx], output[odx]
 
     def _fill_subset(self, output_orientation,
             drive_at_crosspoints, crosspoints_only, exclude_input_orientations, dont_create):
@@ -102,7 +102,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                 input_ = self.get_segment_input(sgmt, iori, isec, dont_create = dont_create)
                 output = self.get_segment_output(sgmt, oori, osec, dont_create = dont_create)
                 if input_ is not None and output is not None:
-                    self.connect(input_, output)
+                    yield from zip(input_, output)
 
     def _fill_universal(self, output_orientation,
             drive_at_crosspoints, crosspoints_only, exclude_input_orientations, dont_create):
@@ -118,7 +118,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                     input_ = self.get_segment_input(sgmt, iori, sgmt.length, dont_create = dont_create)
                     output = self.get_segment_output(sgmt, output_orientation, 0, dont_create = dont_create)
                     if input_ is not None and output is not None:
-                        self.connect(input_, output)
+                        yield from zip(input_, output)
                 continue
             itracks = tuple( (sgmt, sec, idx) for sgmt in self._context.segments.values()
                     for sec in iori.direction.case(range(sgmt.length), reversed(range(sgmt.length)))
@@ -130,7 +130,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                     continue
                 elif drive_at_crosspoints and crosspoints_only and osec == 0:
                     continue
-                self._connect_tracks(isgmt, iori, isec + 1, idx,
+                yield from self._connect_tracks(isgmt, iori, isec + 1, idx,
                         osgmt, oori, osec, odx, dont_create = dont_create)
 
     def _fill_wilton(self, output_orientation,
@@ -152,7 +152,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                         input_ = self.get_segment_input(sgmt, iori, sgmt.length, dont_create = dont_create)
                         output = self.get_segment_output(sgmt, output_orientation, 0, dont_create = dont_create)
                         if input_ is not None and output is not None:
-                            self.connect(input_, output)
+                            yield from zip(input_, output)
                     continue
                 # input & output sets
                 #   east -> north: rev, non, +1
@@ -175,14 +175,14 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                 # enumerate connections
                 for i, (isgmt, idx) in enumerate(irev(tracks)):
                     osgmt, odx = tracks[(i + rotation + len(tracks)) % len(tracks)]
-                    self._connect_tracks(isgmt, iori, isgmt.length, idx,
+                    yield from self._connect_tracks(isgmt, iori, isgmt.length, idx,
                             osgmt, output_orientation, 0, odx, dont_create)
                 # passing wires: do balance
                 for isgmt in irev(segments):
                     for isec, idx in product(irev(range(1, isgmt.length)), irev(range(isgmt.width))):
                         osgmt, odx = tracks[o_balanced]
                         o_balanced = (o_balanced + 1) % len(tracks)
-                        self._connect_tracks(isgmt, iori, isec, idx,
+                        yield from self._connect_tracks(isgmt, iori, isec, idx,
                                 osgmt, output_orientation, 0, odx, dont_create)
         # 2. crosspoints
         if drive_at_crosspoints and any(sgmt.length > 1 for sgmt in segments):
@@ -203,14 +203,14 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                     for idx in irev(range(isgmt.width)):
                         osgmt, osec, odx = tracks[o]
                         o = (o + 1) % len(tracks)
-                        self._connect_tracks(isgmt, iori, isgmt.length, idx,
+                        yield from self._connect_tracks(isgmt, iori, isgmt.length, idx,
                                 osgmt, output_orientation, osec, odx, dont_create)
                 # passing wires next
                 for isgmt in irev(segments):
                     for isec, idx in product(irev(range(1, isgmt.length)), irev(range(isgmt.width))):
                         osgmt, osec, odx = tracks[o]
                         o = (o + 1) % len(tracks)
-                        self._connect_tracks(isgmt, iori, isec, idx,
+                        yield from self._connect_tracks(isgmt, iori, isec, idx,
                                 osgmt, output_orientation, osec, odx, dont_create)
 
     def _fill_cycle_free(self, output_orientation, 
@@ -235,7 +235,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                     input_ = self.get_segment_input(sgmt, iori, sgmt.length, dont_create = dont_create)
                     output = self.get_segment_output(sgmt, output_orientation, 0, dont_create = dont_create)
                     if input_ is not None and output is not None:
-                        self.connect(input_, output)
+                        yield from zip(input_, output)
                 continue
             # turns
             cycle_break_turn = ((output_orientation.is_east and iori.is_north) or
@@ -259,7 +259,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                         output = self.get_segment_output(osgmt, output_orientation, osec, dont_create = dont_create)
                         if output is None:
                             continue
-                        self.connect(input_[isi], output[osi])
+                        yield input_[isi], output[osi]
                     olc = (olc + 1) % len(tracks)
 
     def _fill_span_limited(self, output_orientation,
@@ -292,7 +292,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                     continue
                 if (osection == 0 and crosspoints_only) or (osection > 0 and not drive_at_crosspoints):
                     continue
-                self._connect_tracks(isgmt, iori, isection + 1, idx,
+                yield from self._connect_tracks(isgmt, iori, isection + 1, idx,
                         osgmt, oori, osection, odx, dont_create)
 
     def _fill_turn_limited(self, output_orientation,
@@ -314,7 +314,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                     input_ = self.get_segment_input(sgmt, iori, sgmt.length, dont_create = dont_create)
                     output = self.get_segment_output(sgmt, output_orientation, 0, dont_create = dont_create)
                     if input_ is not None and output is not None:
-                        self.connect(input_, output)
+                        yield from zip(input_, output)
                 continue
             for i in range(channel_width - 1):
                 # determine logical group and order for input
@@ -330,7 +330,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                         continue
                     osgmt, odx = tracks[o]
                     for osec in range(1 if crosspoints_only else 0, osgmt.length if drive_at_crosspoints else 1):
-                        self._connect_tracks(isgmt, iori, isec + 1, idx,
+                        yield from self._connect_tracks(isgmt, iori, isec + 1, idx,
                                 osgmt, oori, osec, odx, dont_create)
 
     # == high-level API ======================================================
@@ -410,16 +410,16 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
 
         # implement switch box pattern
         if pattern.is_subset:
-            self._fill_subset(output_orientation, drive_at_crosspoints, crosspoints_only,
+            pairs = self._fill_subset(output_orientation, drive_at_crosspoints, crosspoints_only,
                     exclude_input_orientations, dont_create)
         elif pattern.is_universal:
-            self._fill_universal(output_orientation, drive_at_crosspoints, crosspoints_only,
+            pairs = self._fill_universal(output_orientation, drive_at_crosspoints, crosspoints_only,
                     exclude_input_orientations, dont_create)
         elif pattern.is_wilton:
-            self._fill_wilton(output_orientation, drive_at_crosspoints, crosspoints_only,
+            pairs = self._fill_wilton(output_orientation, drive_at_crosspoints, crosspoints_only,
                     exclude_input_orientations, dont_create)
         elif pattern.is_cycle_free:
-            self._fill_cycle_free(output_orientation, drive_at_crosspoints, crosspoints_only,
+            pairs = self._fill_cycle_free(output_orientation, drive_at_crosspoints, crosspoints_only,
                     exclude_input_orientations, dont_create)
         elif pattern.is_span_limited:
             channel_width = sum(sgmt.width * sgmt.length for sgmt in self._context.segments.values())
@@ -430,7 +430,7 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                 _logger.warning("Overriding invalid max span ({}) with channel width: {}"
                         .format(max_span, channel_width))
                 max_span = channel_width
-            self._fill_span_limited(output_orientation, drive_at_crosspoints, crosspoints_only,
+            pairs = self._fill_span_limited(output_orientation, drive_at_crosspoints, crosspoints_only,
                     exclude_input_orientations, dont_create, max_span)
         elif pattern.is_turn_limited:
             channel_width = sum(sgmt.width * sgmt.length for sgmt in self._context.segments.values())
@@ -441,10 +441,11 @@ class SwitchBoxBuilder(BaseRoutingBoxBuilder):
                 _logger.warning("Overriding invalid max turn ({}) with channel width: {}"
                         .format(max_turn, channel_width))
                 max_turn = channel_width
-            self._fill_turn_limited(output_orientation, drive_at_crosspoints, crosspoints_only,
+            pairs = self._fill_turn_limited(output_orientation, drive_at_crosspoints, crosspoints_only,
                     exclude_input_orientations, dont_create, max_turn)
         else:
             raise NotImplementedError("Unsupported/Unimplemented switch box pattern: {}".format(pattern))
+        NetUtils.connect_bulk(pairs, module = self._module)
 
     @classmethod
     def new(cls, corner, *, identifier = None, name = None, **kwargs):
@@ -7,6 +7,7 @@ from .builder.block import SliceBuilder, LogicBlockBuilder, IOBlockBuilder
 from .builder.box import ConnectionBoxBuilder, SwitchBoxBuilder
 from .builder.array.tile import TileBuilder
 from .builder.array.array import ArrayBuilder
+from .shard import ShardedModuleDatabase
 from ..netlist import TimingArcType, PortDirection, Module, ModuleUtils, NetUtils
 from ..renderer.renderer import FileRenderer
 from ..renderer.lib import BuiltinCellLibrary
@@ -81,6 +82,7 @@ class Context(Object):
             '_switch_delegate',     # switch delegate
             '_fasm_delegate',       # FASM delegate
             '_verilog_headers',     # Verilog header rendering tasks
+            '_module_stamps',       # digests of the modules processed by incremental passes
             'summary',              # FPGA summary
             "version",              # version of the context
             'template_search_paths',    # File renderer template search paths
@@ -98,6 +100,7 @@ class Context(Object):
         self._top = None
         self._fasm_delegate = FASMDelegate()
         self._verilog_headers = {}
+        self._module_stamps = {}
 
         if template_search_paths is None:
             self.template_search_paths = []
@@ -184,6 +187,58 @@ class Context(Object):
         self._database[module.view, module.key] = module
         return module
 
+    def _module_digests(self, top):
+        """Compute the content digests of ``top`` and all its sub-modules. Refer to `ModuleUtils.content_hash` for
+        more information.
+
+        Args:
+            top (`Module`):
+
+        Returns:
+            :obj:`dict` [:obj:`Hashable`, :obj:`bytes` ]: Mapping from module keys to digests
+        """
+        digests, cache = {}, {}
+        def visit(module):
+            if module.key not in digests:
+                digests[module.key] = ModuleUtils.content_hash(module, _cache = cache)
+                for instance in module.instances.values():
+                    visit(instance.model)
+        visit(top)
+        return digests
+
+    def _is_up_to_date(self, pass_key, key, digest):
+        """Test if the module with ``key`` was processed by the pass with ``pass_key`` when its digest was
+        ``digest``.
+
+        Args:
+            pass_key (:obj:`str`): Key of the pass
+            key (:obj:`Hashable`): Key of the module
+            digest (:obj:`Hashable`): Current digest of the module, or a value derived from it. Refer to
+                `Context._module_digests`
+
+        Returns:
+            :obj:`bool`:
+        """
+        return self._module_stamps.get(key, {}).get(pass_key) == digest
+
+    def _stamp_module(self, pass_key, key, digest, *, reset = False):
+        """Record that the module with ``key`` is processed by the pass with ``pass_key`` when its digest is
+        ``digest``.
+
+        Args:
+            pass_key (:obj:`str`): Key of the pass
+            key (:obj:`Hashable`): Key of the module
+            digest (:obj:`Hashable`): Current digest of the module, or a value derived from it. Refer to
+                `Context._module_digests`
+
+        Keyword Args:
+            reset (:obj:`bool`): If set, the stamps of other passes on the same module are removed. This is used when
+                the module is re-translated, so all the passes after `Translation` must process the module again
+        """
+        if reset or (stamps := self._module_stamps.get(key)) is None:
+            stamps = self._module_stamps[key] = {}
+        stamps[pass_key] = digest
+
     def build_multimode(self, name, **kwargs):
         """Create a multi-mode primitive in abstract view.
 
@@ -614,11 +669,16 @@ class Context(Object):
         return ArrayBuilder(self, array)
 
     # -- Serialization -------------------------------------------------------
-    def pickle(self, file_):
+    def pickle(self, file_, *, sharded = False):
         """Pickle the architecture context into a file.
 
         Args:
             file_ (:obj:`str` or file-like object): output file or its name
+
+        Keyword Args:
+            sharded (:obj:`bool`): If set, ``file_`` is treated as the name of a directory, and each module in the
+                database is pickled into its own shard in the directory. Shards are loaded lazily when the context
+                is unpickled, so tools that only need a few modules do not pay for the whole context
         """
         try:
             r = self._renderer
@@ -631,17 +691,22 @@ class Context(Object):
 
         del self.summary.cwd
 
-        if isinstance(file_, str):
-            pickle.dump(self, open(file_, "wb"))
-            _logger.info("Context pickled to {}".format(file_))
-        else:
-            pickle.dump(self, file_)
-            _logger.info("Context pickled to {}".format(file_.name))
+        try:
+            if sharded:
+                ShardedModuleDatabase.dump(self, file_)
+                _logger.info("Context pickled to {} (sharded)".format(file_))
+            elif isinstance(file_, str):
+                pickle.dump(self, open(file_, "wb"))
+                _logger.info("Context pickled to {}".format(file_))
+            else:
+                pickle.dump(self, file_)
+                _logger.info("Context pickled to {}".format(file_.name))
 
-        self.summary.cwd = self.cwd = cwd
+        finally:
+            self.summary.cwd = self.cwd = cwd
 
-        if r is not None:
-            self._renderer = r
+            if r is not None:
+                self._renderer = r
 
     def pickle_summary(self, file_):
         """Pickle the summary into a binary file.
@@ -661,12 +726,18 @@ class Context(Object):
         """Unpickle a pickled architecture context.
 
         Args:
-            file_ (:obj:`str` or file-like object): the pickled file
+            file_ (:obj:`str` or file-like object): the pickled file, or the directory of a sharded context
         """
         name = file_ if isinstance(file_, str) else file_.name
-        obj = pickle.load(open(file_, "rb") if isinstance(file_, str) else file_)
+        if isinstance(file_, str) and os.path.isdir(file_):
+            index = ShardedModuleDatabase.read_index(file_)
+            obj, version = cls.__new__(cls), index.get("version")
+        else:
+            index = None
+            obj = pickle.load(open(file_, "rb") if isinstance(file_, str) else file_)
+            version = getattr(obj, "version", None)
         if isinstance(obj, cls):
-            if (version := getattr(obj, "version", None)) != VERSION:
+            if version != VERSION:
                 if version is None:
                     raise PRGAAPIError(
                             "The context is pickled by an old PRGA release, not supported by current version {}"
@@ -675,6 +746,8 @@ class Context(Object):
                     raise PRGAAPIError(
                             "The context is pickled by PRGA version {}, not supported by current version {}"
                             .format(version, VERSION))
+            if index is not None:
+                ShardedModuleDatabase.load(obj, file_, index)
             obj.summary.cwd = obj.cwd = os.path.dirname(os.path.abspath(name))
         _logger.info("Context {}unpickled from {}".format(
             "summary " if isinstance(obj, ContextSummary) else "", name))
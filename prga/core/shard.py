@@ -0,0 +1,366 @@
+# -*- encoding: ascii -*-
+"""Sharded, lazily-loaded persistence of the architecture context."""
+
+from ..netlist import Module, Instance, Pin
+from ..util import Object
+from ..exception import PRGAInternalError
+
+from collections.abc import MutableMapping
+import os, pickle
+
+import networkx as nx
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ['ShardedModuleDatabase']
+
+# ----------------------------------------------------------------------------
+# -- Shard Reference ---------------------------------------------------------
+# ----------------------------------------------------------------------------
+class _ShardReference(Object):
+    """Reference to an object stored in a shard which may not be loaded yet.
+
+    Args:
+        database (`ShardedModuleDatabase`): The database that owns the shard
+        owner (:obj:`tuple` [`ModuleView`, :obj:`Hashable` ]): Database key of the module that owns the object
+        path (:obj:`tuple` [:obj:`tuple` [:obj:`str`, :obj:`Hashable` ]]): Path from the owner module to the object.
+            Refer to `ShardedModuleDatabase._resolve` for more information
+    """
+
+    __slots__ = ['database', 'owner', 'path']
+
+    def __init__(self, database, owner, path):
+        self.database = database
+        self.owner = owner
+        self.path = path
+
+    def __call__(self):
+        return ShardedModuleDatabase._resolve(self.database, self.owner, self.path)
+
+# ----------------------------------------------------------------------------
+# -- Shard Pickler -----------------------------------------------------------
+# ----------------------------------------------------------------------------
+class _ShardPickler(pickle.Pickler):
+    """Pickler that replaces references to objects owned by other shards with persistent IDs.
+
+    Args:
+        file_ (file-like object): Output file
+        context (`Context`): The context being pickled
+        registry (:obj:`Mapping` [:obj:`int`, :obj:`tuple` ]): Mapping from object IDs to \(owner, path\) pairs
+        globals_ (:obj:`Mapping` [:obj:`int`, :obj:`str` ]): Mapping from object IDs to names of global wires
+        local (:obj:`Container`): Database keys of the modules pickled into this shard
+
+    Keyword Args:
+        lazy_models (:obj:`bool`): If set, the models of instances and pins owned by other shards are loaded lazily
+    """
+
+    def __init__(self, file_, context, registry, globals_, local, *, lazy_models = True):
+        super().__init__(file_, pickle.HIGHEST_PROTOCOL)
+        self.context = context
+        self.registry = registry
+        self.globals_ = globals_
+        self.local = local
+        self.lazy_models = lazy_models
+        self.dependences = set()
+
+    def persistent_id(self, obj):
+        if obj is self.context:
+            return ("ctx", )
+        elif type(obj) is _ShardReference:
+            return ("ref", obj.owner, obj.path)
+        elif (name := self.globals_.get(id(obj))) is not None:
+            return ("global", name)
+        elif (entry := self.registry.get(id(obj))) is None or entry[0] in self.local:
+            return None
+        self.dependences.add(entry[0])
+        return ("obj", ) + entry
+
+    def reducer_override(self, obj):
+        if not self.lazy_models or type(obj) not in (Instance, Pin):
+            return NotImplemented
+        model = obj.model
+        if (entry := self.registry.get(id(model))) is None or entry[0] in self.local:
+            return NotImplemented
+        # defer loading the model until it's accessed
+        func, args, (dict_, slots) = obj.__reduce_ex__(pickle.HIGHEST_PROTOCOL)[:3]
+        dict_ = dict(dict_ or {})
+        dict_["_lazy_model"] = _ShardReference(None, *entry)
+        slots = {k: v for k, v in slots.items() if k != "_model"}
+        return func, args, (dict_, slots)
+
+# ----------------------------------------------------------------------------
+# -- Shard Unpickler ---------------------------------------------------------
+# ----------------------------------------------------------------------------
+class _ShardUnpickler(pickle.Unpickler):
+    """Unpickler that resolves the persistent IDs generated by `_ShardPickler`.
+
+    Args:
+        file_ (file-like object): Input file
+        database (`ShardedModuleDatabase` or :obj:`Mapping`): The database being loaded
+
+    Keyword Args:
+        context (`Context`): The context that owns ``database``. Required if ``database`` is not a
+            `ShardedModuleDatabase`
+    """
+
+    def __init__(self, file_, database, *, context = None):
+        super().__init__(file_)
+        self.database = database
+        self.context = database.context if context is None else context
+
+    def persistent_load(self, pid):
+        if pid[0] == "ctx":
+            return self.context
+        elif pid[0] == "global":
+            return self.context._globals[pid[1]]
+        elif pid[0] == "obj":
+            return ShardedModuleDatabase._resolve(self.database, pid[1], pid[2])
+        elif pid[0] == "ref":
+            return _ShardReference(self.database, pid[1], pid[2])
+        else:
+            raise pickle.UnpicklingError("Unsupported persistent ID: {}".format(pid))
+
+# ----------------------------------------------------------------------------
+# -- Sharded Module Database -------------------------------------------------
+# ----------------------------------------------------------------------------
+class ShardedModuleDatabase(MutableMapping):
+    """Module database backed by a directory of shards. Each shard is loaded on first access.
+
+    Args:
+        directory (:obj:`str`): Directory of the sharded context
+        context (`Context`): The context that owns this database
+        index (:obj:`dict` [:obj:`Hashable`, :obj:`str` ]): Mapping from tokens of database keys to shard file
+            names. Refer to `ShardedModuleDatabase._token` for more information
+
+    Accessing a module by key only loads the shard containing the module, plus the shards it depends on. Iterating
+    over this database, e.g. ``context.tiles``, loads all shards, and yields the keys in the same order as the
+    database that was dumped.
+
+    Direct instantiation of this class is not recommended. Use `Context.unpickle` instead.
+    """
+
+    __slots__ = ['directory', 'context', '_index', '_loaded', '_order']
+
+    _INDEX = "index.pkl"
+    _GLOBALS = "globals.pkl"
+    _ROOT = "context.pkl"
+
+    def __init__(self, directory, context, index):
+        self.directory = directory
+        self.context = context
+        self._index = index
+        self._loaded = {}
+        self._order = {token: i for i, token in enumerate(index)}
+
+    def __getitem__(self, key):
+        try:
+            return self._loaded[key]
+        except KeyError:
+            pass
+        try:
+            shard = self._index[self._token(key)]
+        except KeyError:
+            raise KeyError(key)
+        self._load_shard(shard)
+        return self._loaded[key]
+
+    def __setitem__(self, key, value):
+        self._index.pop(self._token(key), None)
+        self._loaded[key] = value
+
+    def __delitem__(self, key):
+        self._order.pop(token := self._token(key), None)
+        if self._index.pop(token, None) is None:
+            del self._loaded[key]
+
+    def __contains__(self, key):
+        return key in self._loaded or self._token(key) in self._index
+
+    def __len__(self):
+        return len(self._loaded) + len(self._index)
+
+    def __iter__(self):
+        # keys may contain modules, so all shards must be loaded before the keys can be enumerated
+        while self._index:
+            self._load_shard(min(self._index.values()))
+        if order := self._order:
+            # shards are not loaded in order. Restore the order once all of them are loaded
+            self._loaded = {k: self._loaded[k] for k in sorted(self._loaded,
+                key = lambda k: order.get(self._token(k), len(order)))}
+            self._order = {}
+        for key in tuple(self._loaded):
+            yield key
+
+    def __reduce__(self):
+        return dict, (list(self.items()), )
+
+    def _load_shard(self, shard):
+        with open(os.path.join(self.directory, shard), "rb") as f:
+            modules = _ShardUnpickler(f, self).load()
+        for key, module in modules.items():
+            if self._index.get(token := self._token(key)) == shard:
+                del self._index[token]
+                self._loaded[key] = module
+        _logger.debug("Shard {} loaded ({} modules)".format(shard, len(modules)))
+
+    @classmethod
+    def _token(cls, key):
+        """Convert a database key into a token that is still equal to itself after being pickled and unpickled,
+        i.e. with all modules in it replaced by their views and keys.
+
+        Args:
+            key (:obj:`Hashable`):
+
+        Returns:
+            :obj:`Hashable`:
+        """
+        if isinstance(key, Module):
+            return "module", key.view, cls._token(key.key)
+        elif isinstance(key, tuple):
+            return "tuple", type(key), tuple(cls._token(k) for k in key)
+        else:
+            return key
+
+    @classmethod
+    def _resolve(cls, database, owner, path):
+        """Resolve an object stored in a shard.
+
+        Args:
+            database (:obj:`Mapping`): The module database
+            owner (:obj:`tuple` [`ModuleView`, :obj:`Hashable` ]): Database key of the module that owns the object
+            path (:obj:`tuple` [:obj:`tuple` [:obj:`str`, :obj:`Hashable` ]]): Path from the owner module to the
+                object. Each step is one of ``("c", name)`` (child of a module), ``("m", name)`` (mode of a
+                multi-mode module), ``("n", key)`` (pin of an instance), or ``("b", index)`` (bit of a bus)
+
+        Returns:
+            :obj:`object`:
+        """
+        obj = database[owner]
+        for step, key in path:
+            if step == "c":
+                obj = obj._children[key]
+            elif step == "m":
+                obj = obj.modes[key]
+            elif step == "n":
+                obj = obj._pins[key]
+            elif step == "b":
+                obj = obj._bits[key]
+            else:
+                raise PRGAInternalError("Unknown step in shard path: {}".format(step))
+        return obj
+
+    @classmethod
+    def _register(cls, registry, owner, module, path = tuple()):
+        registry[id(module)] = owner, path
+        for name, child in module._children.items():
+            childpath = path + (("c", name), )
+            registry[id(child)] = owner, childpath
+            buses = [(child, childpath)]
+            if isinstance(child, Instance):
+                buses.extend( (pin, childpath + (("n", key), )) for key, pin in child._pins.items() )
+            for bus, buspath in buses:
+                if buspath is not childpath:
+                    registry[id(bus)] = owner, buspath
+                for i, bit in enumerate(getattr(bus, "_bits", tuple())):
+                    registry[id(bit)] = owner, buspath + (("b", i), )
+        for name, mode in getattr(module, "modes", {}).items():
+            if isinstance(mode, Module):
+                cls._register(registry, owner, mode, path + (("m", name), ))
+
+    @classmethod
+    def dump(cls, context, directory):
+        """Dump ``context`` into ``directory``, one shard per module or per group of mutually dependent modules.
+
+        Args:
+            context (`Context`): The context to be dumped. Non-persistent attributes must be removed already
+            directory (:obj:`str`): Output directory
+        """
+        os.makedirs(directory, exist_ok = True)
+        for f in os.listdir(directory):
+            if f.endswith(".pkl"):
+                os.remove(os.path.join(directory, f))
+
+        # build the registry of all objects that may be referred to across shards
+        database = context._database
+        registry, globals_ = {}, {id(global_): name for name, global_ in context._globals.items()}
+        for key, module in database.items():
+            cls._register(registry, key, module)
+
+        # pickle each module into its own shard and record the dependences
+        shards, g = {}, nx.DiGraph()
+        for key, module in database.items():
+            shards[key] = "module_{:0>5d}.pkl".format(len(shards))
+            with open(os.path.join(directory, shards[key]), "wb") as f:
+                pickler = _ShardPickler(f, context, registry, globals_, (key, ))
+                pickler.dump({key: module})
+            g.add_node(key)
+            g.add_edges_from( (key, dep) for dep in pickler.dependences )
+
+        # merge circular-dependent modules into one shard
+        index = {}
+        for scc in nx.strongly_connected_components(g):
+            if len(scc) == 1:
+                key = next(iter(scc))
+                index[cls._token(key)] = shards[key]
+                continue
+            scc = sorted(scc, key = lambda k: shards[k])
+            for key in scc:
+                os.remove(os.path.join(directory, shards[key]))
+                index[cls._token(key)] = shards[scc[0]]
+            with open(os.path.join(directory, shards[scc[0]]), "wb") as f:
+                _ShardPickler(f, context, registry, globals_, set(scc)).dump({k: database[k] for k in scc})
+
+        # keep the order of the database in the index
+        index = {token: index[token] for token in map(cls._token, database)}
+
+        # pickle global wires and the remaining state of the context
+        with open(os.path.join(directory, cls._GLOBALS), "wb") as f:
+            pickle.dump(context._globals, f, pickle.HIGHEST_PROTOCOL)
+
+        state = dict(context.__dict__)
+        for attr in type(context).__slots__:
+            if attr not in ("__dict__", "_database", "_globals") and hasattr(context, attr):
+                state[attr] = getattr(context, attr)
+        with open(os.path.join(directory, cls._ROOT), "wb") as f:
+            _ShardPickler(f, context, registry, globals_, tuple()).dump(state)
+
+        # the index is written last so an incomplete dump is never loaded
+        with open(os.path.join(directory, cls._INDEX), "wb") as f:
+            pickle.dump({"version": context.version, "shards": index}, f, pickle.HIGHEST_PROTOCOL)
+
+        _logger.debug("{} modules dumped into {} shards".format(len(index), len(set(index.values()))))
+
+    @classmethod
+    def read_index(cls, directory):
+        """Read the index of a sharded context.
+
+        Args:
+            directory (:obj:`str`): Directory of the sharded context
+
+        Returns:
+            :obj:`dict`: A mapping with two keys, ``"version"`` and ``"shards"``
+        """
+        with open(os.path.join(directory, cls._INDEX), "rb") as f:
+            return pickle.load(f)
+
+    @classmethod
+    def load(cls, context, directory, index):
+        """Load a sharded context into ``context``. Modules are loaded lazily.
+
+        Args:
+            context (`Context`): An uninitialized context object, i.e. created by ``Context.__new__``
+            directory (:obj:`str`): Directory of the sharded context
+            index (:obj:`dict`): Index returned by `ShardedModuleDatabase.read_index`
+
+        Returns:
+            `Context`: ``context``
+        """
+        with open(os.path.join(directory, cls._GLOBALS), "rb") as f:
+            context._globals = pickle.load(f)
+        context._database = database = cls(directory, context, dict(index["shards"]))
+        with open(os.path.join(directory, cls._ROOT), "rb") as f:
+            state = _ShardUnpickler(f, database).load()
+        for k, v in state.items():
+            setattr(context, k, v)
+        return context
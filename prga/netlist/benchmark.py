@@ -0,0 +1,86 @@
+# -*- encoding: ascii -*-
+"""Microbenchmarks for the netlist layer.
+
+Run with ``python -m prga.netlist.benchmark <pickled context>``.
+"""
+
+from .module.instance import HierarchicalInstance
+from .module.util import ModuleUtils
+from .net.util import NetUtils
+
+from timeit import timeit
+import gc, sys, tracemalloc
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ['benchmark_reduce_conn_graph']
+
+def benchmark_reduce_conn_graph(module, repeat = 3, backend = "networkx", compositional = False):
+    """Time `ModuleUtils.reduce_conn_graph` on ``module`` with the arguments used by VPR RRG generation, and count
+    the hierarchical instances requested and the memory taken by the graph during one run.
+
+    Args:
+        module (`Module`): Typically the top-level array of a large fabric
+        repeat (:obj:`int`): Number of timed runs
+        backend (:obj:`str`): Graph backend. Refer to `ModuleUtils.reduce_conn_graph` for more information
+        compositional (:obj:`bool`): If set, the graph is built from per-module connection summaries. Refer to
+            `ModuleUtils.reduce_conn_graph` for more information
+
+    Returns:
+        :obj:`tuple` [:obj:`float`, :obj:`int`, :obj:`int`, :obj:`int` ]: Average time of one run, the numbers of
+            hierarchical instances requested and distinct hierarchical instances created in one run, and the number
+            of bytes taken by the graph
+    """
+    blackbox_instance = lambda i: i.model.module_class.is_block or i.model.module_class.is_routing_box
+
+    def run():
+        return ModuleUtils.reduce_conn_graph(module,
+                coalesce_connections = True,
+                blackbox_instance = blackbox_instance,
+                node_key = lambda n: (None if n.net_type.is_port or not blackbox_instance(n.instance) else
+                    NetUtils._reference(n)),
+                backend = backend,
+                store_paths = backend == "networkx",
+                summaries = {} if compositional else None)
+
+    # count the lookups and distinct objects by wrapping the constructor of hierarchical instances
+    lookups, distinct, new = [0], set(), HierarchicalInstance.__dict__["__new__"]
+    def counting_new(cls, hierarchy):
+        obj = new.__func__(cls, hierarchy)
+        lookups[0] += 1
+        distinct.add(obj)
+        return obj
+
+    gc.collect()
+    HierarchicalInstance.__new__ = staticmethod(counting_new)
+    try:
+        g = run()
+    finally:
+        HierarchicalInstance.__new__ = new
+    lookups, distinct = lookups[0], len(distinct)
+
+    # measure the memory taken by the graph
+    del g
+    gc.collect()
+    tracemalloc.start()
+    g = run()
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    t = timeit(run, number = repeat) / repeat
+    _logger.info("reduce_conn_graph({}, backend = {}, compositional = {}): {:.3f}s per run, {} nodes, {} edges, "
+            "{:.1f} MiB, {} hierarchical instances ({} distinct)".format(module.name, backend, compositional, t,
+                len(g), g.number_of_edges(), memory / (1 << 20), lookups, distinct))
+    NetUtils._clear_reference_cache(module)
+    return t, lookups, distinct, memory
+
+if __name__ == "__main__":
+    from ..core.context import Context
+
+    logging.basicConfig(level = logging.INFO, format = "%(message)s")
+    top = Context.unpickle(sys.argv[1]).top
+    for backend in ("networkx", "indexed"):
+        benchmark_reduce_conn_graph(top, backend = backend)
+    benchmark_reduce_conn_graph(top, backend = "indexed", compositional = True)
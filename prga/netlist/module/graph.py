@@ -0,0 +1,370 @@
+# -*- encoding: ascii -*-
+"""Lightweight graph returned by `ModuleUtils.reduce_conn_graph` and `ModuleUtils.reduce_timing_graph`."""
+
+from ...util import Object
+
+from collections.abc import Mapping, MutableMapping
+from array import array
+from networkx import NetworkXError, DiGraph, MultiDiGraph
+
+__all__ = ['IndexedDiGraph']
+
+# ----------------------------------------------------------------------------
+# -- Node Attributes Proxy ---------------------------------------------------
+# ----------------------------------------------------------------------------
+class _NodeAttrs(MutableMapping):
+    """Mutable proxy of the attributes of one node in an `IndexedDiGraph`.
+
+    Args:
+        graph (`IndexedDiGraph`):
+        index (:obj:`int`): Integer ID of the node
+    """
+
+    __slots__ = ['graph', 'index']
+
+    def __init__(self, graph, index):
+        self.graph = graph
+        self.index = index
+
+    def __getitem__(self, key):
+        if key == "net":
+            return self.graph._nets[self.index]
+        elif (attrs := self.graph._node_attrs[self.index]) is None:
+            raise KeyError(key)
+        return attrs[key]
+
+    def __setitem__(self, key, value):
+        if key == "net":
+            self.graph._nets[self.index] = value
+        elif (attrs := self.graph._node_attrs[self.index]) is None:
+            self.graph._node_attrs[self.index] = {key: value}
+        else:
+            attrs[key] = value
+
+    def __delitem__(self, key):
+        if key == "net" or (attrs := self.graph._node_attrs[self.index]) is None:
+            raise KeyError(key)
+        del attrs[key]
+
+    def __iter__(self):
+        yield "net"
+        if (attrs := self.graph._node_attrs[self.index]) is not None:
+            for key in attrs:
+                yield key
+
+    def __len__(self):
+        return 1 + len(self.graph._node_attrs[self.index] or ())
+
+# ----------------------------------------------------------------------------
+# -- Node View ---------------------------------------------------------------
+# ----------------------------------------------------------------------------
+class _NodeView(Mapping):
+    """Node view of an `IndexedDiGraph`, mimicking ``networkx.DiGraph.nodes``.
+
+    Args:
+        graph (`IndexedDiGraph`):
+    """
+
+    __slots__ = ['graph']
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, node):
+        return _NodeAttrs(self.graph, self.graph._index[node])
+
+    def __iter__(self):
+        return iter(self.graph._keys)
+
+    def __len__(self):
+        return len(self.graph._keys)
+
+    def __contains__(self, node):
+        return node in self.graph._index
+
+    def __call__(self, data = False, default = None):
+        if data is False:
+            return iter(self.graph._keys)
+        elif data is True:
+            return ( (node, _NodeAttrs(self.graph, i)) for i, node in enumerate(self.graph._keys) )
+        else:
+            return ( (node, _NodeAttrs(self.graph, i).get(data, default))
+                    for i, node in enumerate(self.graph._keys) )
+
+# ----------------------------------------------------------------------------
+# -- Edge View ---------------------------------------------------------------
+# ----------------------------------------------------------------------------
+class _EdgeView(Mapping):
+    """Edge view of an `IndexedDiGraph`, mimicking ``networkx.DiGraph.edges``. Edges are ``(u, v)`` tuples, or
+    ``(u, v, key)`` tuples in a multigraph, and map to their attribute dicts.
+
+    Args:
+        graph (`IndexedDiGraph`):
+    """
+
+    __slots__ = ['graph']
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, edge):
+        if (e := self.graph._edge_id(*edge)) is None:
+            raise KeyError(edge)
+        return self.graph._edge_attrs.get(e, {})
+
+    def __iter__(self):
+        return self(keys = self.graph._multigraph)
+
+    def __len__(self):
+        return len(self.graph._heads)
+
+    def __contains__(self, edge):
+        try:
+            return self.graph._edge_id(*edge) is not None
+        except TypeError:
+            return False
+
+    def __call__(self, nbunch = None, data = False, default = None, keys = False):
+        """Iterate over the edges in the order they are added.
+
+        Args:
+            nbunch (:obj:`Hashable` or :obj:`Iterable` [:obj:`Hashable` ]): If given, only the out-edges of these
+                nodes are included
+            data (:obj:`bool` or :obj:`str`): If ``True``, the attribute dict of each edge is included. If a string
+                is given, the value of the attribute is included instead
+            default: Value used for edges that don't have the requested attribute
+            keys (:obj:`bool`): If set, the key of each edge is included. Only valid for multigraphs
+
+        Yields:
+            :obj:`tuple`:
+        """
+        graph, heads = self.graph, None
+        if nbunch is not None:
+            try:
+                heads = {graph._index[nbunch]}
+            except (KeyError, TypeError):
+                heads = set(i for n in nbunch if (i := graph._index.get(n)) is not None)
+        nodes = graph._keys
+        for e, (ui, vi) in enumerate(zip(graph._heads, graph._tails)):
+            if heads is not None and ui not in heads:
+                continue
+            item = (nodes[ui], nodes[vi])
+            if keys:
+                item += (graph._edge_keys[e], )
+            if data is True:
+                item += (graph._edge_attrs.get(e, {}), )
+            elif data is not False:
+                item += (graph._edge_attrs.get(e, {}).get(data, default), )
+            yield item
+
+# ----------------------------------------------------------------------------
+# -- Indexed Directed Graph --------------------------------------------------
+# ----------------------------------------------------------------------------
+class IndexedDiGraph(Object):
+    """A lightweight directed graph with dense integer node IDs.
+
+    Keyword Args:
+        multigraph (:obj:`bool`): If set, parallel edges with different keys are allowed, like in
+            `networkx.MultiDiGraph`_
+
+    Nodes are numbered in the order they are added. Edges are kept in two ``array('i')`` tables of node IDs, and
+    the predecessor/successor adjacency is built in the compressed sparse row (CSR) format the first time it is
+    queried after edges are added. `IndexedDiGraph.has_edge` scans the CSR successor row, plus a small hash index of
+    the edges added since the CSR tables were built, which is folded into the tables once it grows too large. The
+    ``"net"`` attribute of each node is kept in a list, and other node and edge attributes are kept in side tables
+    only for the nodes and edges that have them.
+
+    This class implements the subset of the `networkx.DiGraph`_ API used by PRGA: ``nodes``, ``edges``,
+    ``predecessors``, ``successors``, ``has_node``, ``has_edge``, ``add_node``, ``add_edge``, ``number_of_nodes`` and
+    ``number_of_edges``. Nodes and edges cannot be removed. Use `IndexedDiGraph.to_networkx` for other use cases.
+
+    .. _networkx.DiGraph: https://networkx.github.io/documentation/stable/reference/classes/digraph.html
+    .. _networkx.MultiDiGraph: https://networkx.org/documentation/stable/reference/classes/multigraph.html
+    """
+
+    __slots__ = ['_multigraph', '_keys', '_index', '_nets', '_node_attrs',
+            '_heads', '_tails', '_edge_keys', '_edge_attrs', '_pending', '_pred', '_succ']
+
+    # minimum number of edges in the hash index before it is folded into the CSR tables
+    _PENDING_THRESHOLD = 4096
+
+    def __init__(self, *, multigraph = False):
+        self._multigraph = multigraph
+        self._keys = []             # node ID -> node
+        self._index = {}            # node -> node ID
+        self._nets = []             # node ID -> "net" attribute
+        self._node_attrs = []       # node ID -> other attributes, or None
+        self._heads = array('i')    # edge ID -> source node ID
+        self._tails = array('i')    # edge ID -> sink node ID
+        self._edge_keys = [] if multigraph else None
+        self._edge_attrs = {}       # edge ID -> attributes
+        self._pending = {}          # (u << 32 | v) -> ID(s) of the edges not in the CSR tables yet
+        self._pred = None           # CSR tables: (offsets, edge IDs)
+        self._succ = None
+
+    def __contains__(self, node):
+        return node in self._index
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def _add_node(self, node):
+        if (i := self._index.get(node)) is None:
+            i = self._index[node] = len(self._keys)
+            self._keys.append(node)
+            self._nets.append(None)
+            self._node_attrs.append(None)
+        return i
+
+    def _edge_id(self, u, v, key = None):
+        if (ui := self._index.get(u)) is None or (vi := self._index.get(v)) is None:
+            return None
+        elif len(self._pending) > max(self._PENDING_THRESHOLD, len(self._heads) // 2):
+            self._build_csr()
+
+        # edges in the CSR tables are older than the pending ones
+        candidates = []
+        if self._succ is not None and ui < len(offsets := self._succ[0]) - 1:
+            tails = self._tails
+            candidates.extend(e for e in self._succ[1][offsets[ui] : offsets[ui + 1]] if tails[e] == vi)
+        if (pending := self._pending.get( (ui << 32) | vi )) is not None:
+            candidates.extend( (pending, ) if type(pending) is int else pending )
+
+        for e in candidates:
+            if not self._multigraph or key is None or self._edge_keys[e] == key:
+                return e
+        return None
+
+    def _csr(self, by):
+        offsets = array('i', [0]) * (len(self._keys) + 1)
+        for i in by:
+            offsets[i + 1] += 1
+        for i in range(len(self._keys)):
+            offsets[i + 1] += offsets[i]
+        edges, fill = array('i', [0]) * len(by), offsets[:-1]
+        for e, i in enumerate(by):
+            edges[fill[i]] = e
+            fill[i] += 1
+        return offsets, edges
+
+    def _build_csr(self):
+        self._pred = self._csr(self._tails)
+        self._succ = self._csr(self._heads)
+        self._pending = {}
+
+    def _neighbors(self, node, pred):
+        if (i := self._index.get(node)) is None:
+            raise NetworkXError("The node {} is not in the graph.".format(node))
+        if self._succ is None or self._pending or len(self._succ[0]) <= len(self._keys):
+            self._build_csr()
+        (offsets, edges), nodes = (self._pred, self._heads) if pred else (self._succ, self._tails)
+        return iter([self._keys[j] for j in dict.fromkeys(nodes[e] for e in edges[offsets[i] : offsets[i + 1]])])
+
+    # == low-level API =======================================================
+    @property
+    def nodes(self):
+        """Node view. Works the same way as ``networkx.DiGraph.nodes``."""
+        return _NodeView(self)
+
+    @property
+    def edges(self):
+        """Edge view. Works the same way as ``networkx.DiGraph.edges``."""
+        return _EdgeView(self)
+
+    def is_multigraph(self):
+        """:obj:`bool`: Test if parallel edges are allowed."""
+        return self._multigraph
+
+    def is_directed(self):
+        """:obj:`bool`: Always ``True``."""
+        return True
+
+    def number_of_nodes(self):
+        """:obj:`int`: Number of nodes."""
+        return len(self._keys)
+
+    def number_of_edges(self):
+        """:obj:`int`: Number of edges."""
+        return len(self._heads)
+
+    def has_node(self, node):
+        """:obj:`bool`: Test if ``node`` is in this graph."""
+        return node in self._index
+
+    def has_edge(self, u, v, key = None):
+        """:obj:`bool`: Test if there is an edge from ``u`` to ``v`` (with ``key`` in a multigraph)."""
+        return self._edge_id(u, v, key) is not None
+
+    def add_node(self, node, **attrs):
+        """Add ``node``, or update the attributes of ``node`` if it's already in this graph.
+
+        Args:
+            node (:obj:`Hashable`):
+
+        Keyword Args:
+            **attrs: Node attributes
+        """
+        node_attrs = _NodeAttrs(self, self._add_node(node))
+        for k, v in attrs.items():
+            node_attrs[k] = v
+
+    def add_edge(self, u, v, key = None, **attrs):
+        """Add an edge from ``u`` to ``v``. Nodes are added if they are not in this graph yet. Unlike networkx
+        graphs, adding an existing edge creates a parallel edge instead of updating its attributes, so check with
+        `IndexedDiGraph.has_edge` first.
+
+        Args:
+            u (:obj:`Hashable`):
+            v (:obj:`Hashable`):
+            key (:obj:`Hashable`): Key of the edge in a multigraph. Ignored if this graph is not a multigraph
+
+        Keyword Args:
+            **attrs: Edge attributes
+        """
+        ui, vi, e = self._add_node(u), self._add_node(v), len(self._heads)
+        if (pending := self._pending.get(code := (ui << 32) | vi)) is None:
+            self._pending[code] = e
+        else:
+            # parallel edge
+            self._pending[code] = ((pending, ) if type(pending) is int else pending) + (e, )
+        if self._multigraph:
+            self._edge_keys.append(key)
+        if attrs:
+            self._edge_attrs[e] = attrs
+        self._heads.append(ui)
+        self._tails.append(vi)
+
+    def predecessors(self, node):
+        """Iterate over the predecessors of ``node``.
+
+        Raises:
+            `networkx.NetworkXError`: If ``node`` is not in this graph
+        """
+        return self._neighbors(node, True)
+
+    def successors(self, node):
+        """Iterate over the successors of ``node``.
+
+        Raises:
+            `networkx.NetworkXError`: If ``node`` is not in this graph
+        """
+        return self._neighbors(node, False)
+
+    def to_networkx(self):
+        """Convert this graph to a `networkx.DiGraph`_ or `networkx.MultiDiGraph`_ object.
+
+        Returns:
+            `networkx.DiGraph`_ or `networkx.MultiDiGraph`_:
+        """
+        g = MultiDiGraph() if self._multigraph else DiGraph()
+        for node, attrs in self.nodes(data = True):
+            g.add_node(node, **attrs)
+        for e, (ui, vi) in enumerate(zip(self._heads, self._tails)):
+            if self._multigraph:
+                g.add_edge(self._keys[ui], self._keys[vi], self._edge_keys[e], **self._edge_attrs.get(e, {}))
+            else:
+                g.add_edge(self._keys[ui], self._keys[vi], **self._edge_attrs.get(e, {}))
+        return g
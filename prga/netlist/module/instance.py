@@ -7,6 +7,7 @@ from ...exception import PRGAInternalError, PRGATypeError, PRGAIndexError
 
 from abc import abstractproperty, abstractmethod
 from collections.abc import Mapping
+from weakref import WeakValueDictionary
 
 __all__ = ['Instance', 'HierarchicalInstance']
 
@@ -153,6 +154,13 @@ class Instance(AbstractInstance):
     def __repr__(self):
         return 'Instance({}/{}[{}])'.format(self._parent.name, self._name, self._model.name)
 
+    def __getattr__(self, attr):
+        # the model may be loaded lazily if this instance is unpickled from a sharded context
+        if attr == "_model" and (ref := self.__dict__.pop("_lazy_model", None)) is not None:
+            self._model = ref()
+            return self._model
+        raise AttributeError(attr)
+
     # == low-level API =======================================================
     @property
     def name(self):
@@ -197,16 +205,35 @@ class HierarchicalInstance(AbstractInstance):
     Notes:
         Direct instantiation of this class is not recommended. Use `AbstractInstance._shrink_hierarchy`,
         `AbstractInstance._extend_hierarchy`, or `ModuleUtils._dereference` instead.
+
+        Hierarchical instances are interned: while a hierarchical instance is alive, creating another one with the
+        same hierarchy returns the same object.
     """
 
-    __slots__ = ["_hierarchy", "_pins_proxy"]
+    __slots__ = ["_hierarchy", "_pins_proxy", "__weakref__"]
+
+    __interned = WeakValueDictionary()
 
     # == internal API ========================================================
-    def __init__(self, hierarchy):
+    def __new__(cls, hierarchy):
+        hierarchy = tuple(hierarchy)
+        try:
+            return cls.__interned[hierarchy]
+        except KeyError:
+            pass
+
         if len(hierarchy) < 2:
             raise PRGAInternalError("Cannot create hierarchical instance with less than 2 levels")
-        self._hierarchy = hierarchy
-        self._pins_proxy = _InstancePinsProxy(self)
+        obj = super(HierarchicalInstance, cls).__new__(cls)
+        obj._hierarchy = hierarchy
+        obj._pins_proxy = _InstancePinsProxy(obj)
+        return cls.__interned.setdefault(hierarchy, obj)
+
+    def __init__(self, hierarchy):
+        pass
+
+    def __getnewargs__(self):
+        return (self._hierarchy, )
 
     def __repr__(self):
         s = '{}/{}'.format(self._hierarchy[-1].parent.name, self._hierarchy[-1].name)
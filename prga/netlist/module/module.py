@@ -2,6 +2,7 @@
 """Netlist modules."""
 
 from ..net.bus import Port
+from ..net.frozen import FrozenConnectivity
 from ...util import ReadonlyMappingProxy, uno, Enum, Object
 from ...exception import PRGAInternalError
 
@@ -44,6 +45,7 @@ class Module(Object):
         IS_CELL = 1 << 0
         ALLOW_MULTISOURCE = 1 << 1
         COALESCE_CONNECTIONS = 1 << 2
+        FROZEN = 1 << 3
 
     # == internal API ========================================================
     def __init__(self, name, *,
@@ -74,6 +76,11 @@ class Module(Object):
     def __repr__(self):
         return 'Module({})'.format(self.name)
 
+    def __getstate__(self):
+        # the intern table of hierarchical pin references is rebuilt lazily by `NetUtils._reference`
+        dict_ = {k: v for k, v in self.__dict__.items() if k != "_hierarchical_references"}
+        return dict_ or None, {k: getattr(self, k) for k in self.__slots__ if k != "__dict__"}
+
     def _add_child(self, child):
         """Add ``child`` into this module.
 
@@ -83,6 +90,9 @@ class Module(Object):
         Returns:
             ``child``
         """
+        # check if frozen
+        if self.is_frozen:
+            raise PRGAInternalError("Cannot add {} into {}. {} is frozen".format(child, self, self))
         # check parent
         if child.parent is not self:
             raise PRGAInternalError("{} is not the parent of {}".format(self, child))
@@ -142,3 +152,27 @@ class Module(Object):
     def coalesce_connections(self):
         """:obj:`bool`: Test if bit-wise connections are disallowed in this module."""
         return bool(self._flags & self._FLAGS.COALESCE_CONNECTIONS)
+
+    @property
+    def is_frozen(self):
+        """:obj:`bool`: Test if this module is frozen. Refer to `Module.freeze` for more information."""
+        return bool(self._flags & self._FLAGS.FROZEN)
+
+    def freeze(self):
+        """Freeze this module.
+
+        The connections in a frozen module are converted into compact, integer-indexed tables, and the per-net
+        connection mappings and `NetConnection` objects are released. `NetUtils.get_source`, `NetUtils.get_sinks`,
+        `NetUtils.get_connection` and other read-only methods keep working, but the connections they return are
+        materialized on each access and cannot be modified. Adding ports or instances into a frozen module, and
+        connecting or disconnecting nets in it raise `PRGAInternalError`.
+
+        Timing arcs in cell modules are kept as they are, but new timing arcs cannot be created after freezing.
+
+        Freezing a frozen module has no effect. Frozen modules cannot be unfrozen.
+        """
+        if self.is_frozen:
+            return
+        if not self.is_cell:
+            FrozenConnectivity(self)
+        self._flags |= self._FLAGS.FROZEN
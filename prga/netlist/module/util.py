@@ -3,6 +3,7 @@
 
 from .module import Module
 from .instance import Instance
+from .graph import IndexedDiGraph
 from ..net.common import AbstractNet, NetType, TimingArcType, PortDirection
 from ..net.util import NetUtils
 from ..net.bus import Port, Pin, HierarchicalPin
@@ -10,6 +11,7 @@ from ...exception import PRGAInternalError
 from ...util import uno, Object, Enum
 
 from itertools import chain, product
+from hashlib import blake2b
 from networkx import NetworkXError, DiGraph, MultiDiGraph
 
 import logging
@@ -145,6 +147,54 @@ class ModuleUtils(Object):
         """
         return module._add_child(Instance(module, model, name, key = key, **kwargs))
 
+    @classmethod
+    def content_hash(cls, module, *, _cache = None):
+        """Compute a digest of the content of ``module`` and all its sub-modules.
+
+        Args:
+            module (`Module`):
+
+        Keyword Args:
+            _cache (:obj:`dict` [:obj:`int`, :obj:`bytes` ]): Digests of the modules already hashed, indexed by the
+                ``id`` of the modules. Pass in the same mapping to reuse the digests when hashing multiple modules
+
+        Returns:
+            :obj:`bytes`:
+
+        The digest covers the name, key and class of ``module``, its ports and instances, the digests of the models
+        of its instances, the connections (in the order they are made), and the ``translate_attrs`` of the module,
+        its ports and its instances. Other custom attributes, e.g. annotations added by passes, are not covered.
+        """
+        _cache = uno(_cache, {})
+        if (digest := _cache.get(id(module))) is not None:
+            return digest
+
+        h = blake2b(digest_size = 16)
+        h.update(repr( (module.name, module.key, getattr(module, "module_class", None), module.is_cell,
+            getattr(module, "translate_attrs", None)) ).encode())
+
+        # ports and instances
+        for port in module.ports.values():
+            global_ = getattr(port, "global_", None)
+            h.update(repr( (port.key, port.name, len(port), port.direction, port.is_clock,
+                getattr(global_, "name", None), getattr(port, "translate_attrs", None)) ).encode())
+        for instance in module.instances.values():
+            h.update(repr( (instance.key, instance.name, getattr(instance, "translate_attrs", None)) ).encode())
+            h.update(cls.content_hash(instance.model, _cache = _cache))
+
+        # connections
+        if not module.is_cell:
+            buses = list(module.ports.values())
+            for instance in module.instances.values():
+                buses.extend(instance._pins.values())
+            for net in chain.from_iterable((bus, ) if bus._coalesce_connections else bus._bits for bus in buses):
+                for conn in net._connections.values():
+                    if conn.sink is net:
+                        h.update(repr( (NetUtils._reference(conn.source), NetUtils._reference(net)) ).encode())
+
+        digest = _cache[id(module)] = h.digest()
+        return digest
+
     @classmethod
     def __add_node_to_graph(cls, g, node, net, node_attrs, **reserved):
         attrs = node_attrs(net)
@@ -155,17 +205,147 @@ class ModuleUtils(Object):
         g.add_node(node, **reserved, **attrs)
 
     @classmethod
-    def __add_edge_to_graph(cls, g, u, v, path, edge_attrs, *key, prefix = "", **reserved):
+    def __new_graph(cls, backend, multigraph = False):
+        if backend == "networkx":
+            return MultiDiGraph() if multigraph else DiGraph()
+        elif backend == "indexed":
+            return IndexedDiGraph(multigraph = multigraph)
+        else:
+            raise PRGAInternalError("Unknown graph backend: {}. Supported backends are: networkx, indexed"
+                    .format(backend))
+
+    @classmethod
+    def __add_edge_to_graph(cls, g, u, v, path, edge_attrs, *key, prefix = "", store_path = True, **reserved):
         if g.has_edge(u, v, *key):
             raise PRGAInternalError("Bad reducing: multiple {}paths from {} to {}"
                     .format(prefix, path[0], path[-1]))
         reserved.update(path = path)
-        if (attrs := edge_attrs(path)) is not None:
+        if (attrs := {} if edge_attrs is None else edge_attrs(path)) is not None:
             for k in reserved.keys():
                 if k in attrs:
                     raise PRGAInternalError("'{}' is a reserved attribute for an edge".format(k))
+            if not store_path:
+                del reserved["path"]
             g.add_edge(u, v, *key, **reserved, **attrs)
 
+    @classmethod
+    def __summarize(cls, bus, index, summaries, blackbox_instance, allow_multisource, coalesce_connections):
+        """Summarize the connection paths ending at ``bus[index]`` within the parent module of ``bus``.
+
+        The summary is a tuple of ``(is_exit, net, path)`` triplets, in the same order as the DFS in
+        `ModuleUtils.reduce_conn_graph` visits them. ``net`` is either a candidate startpoint \(``is_exit`` unset\)
+        or an input port of the module \(``is_exit`` set\), and ``path`` is the sequence of nets between ``net`` and
+        the sink, exclusively. Nets are relative to the parent module of ``bus``, and the paths through non-blackboxed
+        sub-instances are summarized and inlined.
+
+        The summaries that a summary depends on are built with an explicit stack of `ModuleUtils.__summary_steps`
+        generators, so long chains of non-blackboxed instances do not hit the recursion limit.
+        """
+        if (summary := summaries.get( (bus, index) )) is not None:
+            return summary
+        args = summaries, blackbox_instance, allow_multisource, coalesce_connections
+        stack, building, summary = [cls.__summary_steps(bus, index, *args)], {(bus, index)}, None
+        while stack:
+            try:
+                request = stack[-1].send(summary)
+            except StopIteration as stop:
+                stack.pop()
+                summary = stop.value
+                continue
+            if (summary := summaries.get(request)) is None:
+                if request in building:
+                    raise PRGAInternalError("Combinational loop through {}".format(request[0]))
+                building.add(request)
+                stack.append(cls.__summary_steps(*request, *args))
+        return summary
+
+    @classmethod
+    def __summary_steps(cls, bus, index, summaries, blackbox_instance, allow_multisource, coalesce_connections):
+        """Build the summary of ``bus[index]``. Yields the ``(bus, index)`` keys of the summaries it depends on, and
+        expects the summaries to be sent back. Refer to `ModuleUtils.__summarize` for more information."""
+        module = bus.parent
+        if coalesce_connections and not module.coalesce_connections:
+            raise PRGAInternalError("{} supports bit-wise connections".format(module))
+        elif not allow_multisource and module.allow_multisource:
+            raise PRGAInternalError("{} allows multi-source connections".format(module))
+        sink = bus if index is None else bus[index]
+        summary, stack = [], []
+        for src in (NetUtils.get_multisource(sink) if module.allow_multisource else (NetUtils.get_source(sink), )):
+            if src is None:
+                continue
+            srcbus, srcidx = (src.bus, src.index) if src.net_type in (NetType.bit, NetType.slice_) else (src, None)
+            if srcbus.net_type is NetType.port:
+                stack.append( (True, src, srcbus, srcidx) )
+            elif srcbus.net_type is NetType.pin and not (srcbus.instance.model.is_cell or
+                    blackbox_instance(srcbus.instance)):
+                stack.append( (False, src, srcbus, srcidx) )
+            else:
+                summary.append( (False, src, tuple()) )
+        for is_exit, src, srcbus, srcidx in reversed(stack):
+            if is_exit:
+                summary.append( (True, src, tuple()) )
+                continue
+            instance = srcbus.instance
+            for sub_exit, net, path in (yield (srcbus.model, srcidx)):
+                net = cls._attach_hierarchy(net, instance)
+                path = tuple(cls._attach_hierarchy(n, instance) for n in path) + (src, )
+                if sub_exit:
+                    # ``net`` is an input pin of ``instance``. Keep on searching in this module
+                    netbus, netidx = (net.bus, net.index) if net.net_type in (NetType.bit, NetType.slice_) else (
+                            net, None)
+                    summary.extend( (e, n, p + (net, ) + path) for e, n, p in (yield (netbus, netidx)) )
+                else:
+                    summary.append( (False, net, path) )
+        summaries[bus, index] = summary = tuple(summary)
+        return summary
+
+    @classmethod
+    def __stitch_summaries(cls, g, module, hierarchy, summaries, blackbox_instance, allow_multisource,
+            coalesce_connections, node_key, node_attrs, edge_attrs, store_paths):
+        """Add the nodes and edges inside ``module`` (instantiated as ``hierarchy``) to ``g`` using connection
+        summaries. The nodes and edges are added in the same order as the DFS in `ModuleUtils.reduce_conn_graph`."""
+        args = summaries, blackbox_instance, allow_multisource, coalesce_connections
+        expand_paths = store_paths or edge_attrs is not None
+
+        def expand(bus, index, hierarchy, endpoint, path):
+            for is_exit, net, subpath in cls.__summarize(bus, index, *args):
+                if expand_paths:
+                    subpath = tuple(cls._attach_hierarchy(n, hierarchy) for n in subpath) + path
+                else:
+                    subpath = path
+                if is_exit:
+                    # continue in the parent module, unless this is a top-level input port
+                    if hierarchy is not None:
+                        if expand_paths:
+                            subpath = (cls._attach_hierarchy(net, hierarchy), ) + subpath
+                        netbus, netidx = (net.bus, net.index) if net.net_type in (NetType.bit, NetType.slice_) else (
+                                net, None)
+                        expand(hierarchy.hierarchy[0].pins[netbus.key], netidx,
+                                hierarchy._shrink_hierarchy(low = 1), endpoint, subpath)
+                    continue
+                src = cls._attach_hierarchy(net, hierarchy)
+                if (startpoint := node_key(src)) is not None:
+                    if startpoint not in g:
+                        cls.__add_node_to_graph(g, startpoint, src, node_attrs)
+                    cls.__add_edge_to_graph(g, startpoint, endpoint, (src, ) + subpath, edge_attrs,
+                            store_path = store_paths)
+
+        for instance in module.instances.values():
+            if not (instance.model.is_cell or blackbox_instance(instance)):
+                cls.__stitch_summaries(g, instance.model, instance._extend_hierarchy(above = hierarchy),
+                        *args, node_key, node_attrs, edge_attrs, store_paths)
+                continue
+            leaf = instance if hierarchy is None else instance._extend_hierarchy(above = hierarchy)
+            for pin in instance.pins.values():
+                bus = pin if hierarchy is None else HierarchicalPin(leaf, pin.model)
+                for net in ((bus, ) if coalesce_connections else bus):
+                    if (node := node_key(net)) is None or node in g:
+                        continue
+                    cls.__add_node_to_graph(g, node, net, node_attrs)
+                    if pin.model.direction.is_input:
+                        expand(pin, None if coalesce_connections or len(pin) == 1 else net.index,
+                                hierarchy, node, (net, ))
+
     @classmethod
     def reduce_conn_graph(cls, module, *,
             allow_multisource = False,
@@ -173,7 +353,10 @@ class ModuleUtils(Object):
             blackbox_instance = lambda i: False,
             node_key = lambda n: NetUtils._reference(n),
             node_attrs = lambda n: {},
-            edge_attrs = lambda p: {}):
+            edge_attrs = None,
+            backend = "networkx",
+            store_paths = True,
+            summaries = None):
         """Create a connection graph for ``module``.
 
         Args:
@@ -200,10 +383,30 @@ class ModuleUtils(Object):
                 A function that returns additional attributes for a path. This function is called only once when an edge
                 with valid endpoints is created. ``"path"`` is a reserved key whose corresponding value is a sequence
                 of nets that this path includes, from the startpoint to the endpoint, inclusively. If ``None`` is
-                returned, the edge is not added to the graph
+                returned, the edge is not added to the graph. If not set, no additional attributes are added
+            backend (:obj:`str`): Graph implementation. Supported backends are:
+
+                * ``"networkx"``: `networkx.DiGraph`_
+                * ``"indexed"``: `IndexedDiGraph`, a lightweight graph with dense integer node IDs and array-based
+                  adjacency, which takes a fraction of the memory for large modules
+
+            store_paths (:obj:`bool`): If unset, the ``"path"`` attribute is not stored on the edges. ``edge_attrs``
+                still receives the paths
+            summaries (:obj:`dict`): If set, the graph is built compositionally: the paths inside each module are
+                summarized once into this :obj:`dict` and reused for all instances of the module, instead of being
+                traversed again for every instance. Summaries do not depend on ``node_key``, ``node_attrs`` or
+                ``edge_attrs``, so the same :obj:`dict` may be passed to multiple calls as long as the modules are
+                not modified and the other arguments are the same. Refer to the notes below for the restrictions
 
         Returns:
-            `networkx.DiGraph`_:
+            `networkx.DiGraph`_ or `IndexedDiGraph`:
+
+        Notes:
+            Compositional reduction produces the same graph, with nodes and edges added in the same order, if
+            ``blackbox_instance`` depends only on the model of the instance, and ``node_key`` returns ``None`` for
+            all ports of ``module`` and all pins of non-blackboxed, non-cell instances, i.e. only pins of blackboxed
+            or cell instances may become nodes. If neither ``store_paths`` nor ``edge_attrs`` is set, paths are not
+            expanded during compositional reduction, and only contain the startpoint and the endpoint.
 
         .. _networkx.DiGraph: https://networkx.github.io/documentation/stable/reference/classes/digraph.html
         """
@@ -213,7 +416,11 @@ class ModuleUtils(Object):
         elif module.is_cell:
             raise PRGAInternalError("{} is a cell module".format(module))
         # 1. build graph
-        g = DiGraph()
+        g = cls.__new_graph(backend)
+        if summaries is not None:
+            cls.__stitch_summaries(g, module, None, summaries, blackbox_instance, allow_multisource,
+                    coalesce_connections, node_key, node_attrs, edge_attrs, store_paths)
+            return g
         for bus in cls._iter_nets(module, blackbox_instance):
             for net in ((bus, ) if coalesce_connections else bus):
                 if (node := node_key(net)) is None or node in g:
@@ -254,7 +461,8 @@ class ModuleUtils(Object):
                                 # Add the node
                                 cls.__add_node_to_graph(g, startpoint, src, node_attrs)
                             # add the edge, too
-                            cls.__add_edge_to_graph(g, startpoint, endpoint, (src, ) + path, edge_attrs)
+                            cls.__add_edge_to_graph(g, startpoint, endpoint, (src, ) + path, edge_attrs,
+                                    store_path = store_paths)
                         else:
                             # No it is not. Keep searching
                             stack.append( (src, endpoint, (src, ) + path) )
@@ -266,7 +474,9 @@ class ModuleUtils(Object):
             blackbox_instance = lambda i: False,
             node_key = lambda n: NetUtils._reference(n),
             node_attrs = lambda n: {},
-            edge_attrs = lambda p: {}):
+            edge_attrs = lambda p: {},
+            backend = "networkx",
+            store_paths = True):
         """Create a timing graph for ``module``.
 
         Args:
@@ -293,9 +503,14 @@ class ModuleUtils(Object):
                 of nets that this path includes, from the startpoint to the endpoint, inclusively; ``"type_"`` is a
                 reserved key indicating the type of this timing arc.  If ``None`` is returned, the edge is not added
                 to the graph
+            backend (:obj:`str`): Graph implementation. Supported backends are ``"networkx"``
+                \(`networkx.MultiDiGraph`_\) and ``"indexed"`` \(`IndexedDiGraph`\). Refer to
+                `ModuleUtils.reduce_conn_graph` for more information
+            store_paths (:obj:`bool`): If unset, the ``"path"`` attribute is not stored on the edges. ``edge_attrs``
+                still receives the paths
 
         Returns:
-            `networkx.MultiDiGraph`_:
+            `networkx.MultiDiGraph`_ or `IndexedDiGraph`:
 
         Notes:
             Clock networks are handled relatively naively in this method. Clock networks are detected using the
@@ -307,7 +522,7 @@ class ModuleUtils(Object):
         .. _networkx.MultiDiGraph: https://networkx.org/documentation/stable/reference/classes/multigraph.html
         """
         # build graph
-        g = MultiDiGraph()
+        g = cls.__new_graph(backend, True)
         for bus in cls._iter_nets(module, blackbox_instance):
             for net in bus:
                 if (node := node_key(net)) is None or node in g:
@@ -344,12 +559,12 @@ class ModuleUtils(Object):
                                 if (conflict := (d := g.nodes[clk_node])["clock_root"]) is not None:
                                     if conflict != clock_root:
                                         raise PRGAInternalError("Clock network driven by multiple sources: {}, {}"
-                                                .format(g[conflict]["net"], sink))
+                                                .format(g.nodes[conflict]["net"], sink))
                                     break
                                 d["clock_root"] = clock_root
                             if type_.is_seq_start or type_.is_seq_end:
                                 cls.__add_edge_to_graph(g, clock_root, endpoint, path, edge_attrs, type_,
-                                        type_ = type_)
+                                        type_ = type_, store_path = store_paths)
                         # stop searching
                         continue
                     elif hierarchy is not None and blackbox_instance(hierarchy):
@@ -371,7 +586,7 @@ class ModuleUtils(Object):
                                     # add the edge if ``type_`` is combinational
                                     if type_.is_comb_bitwise:
                                         cls.__add_edge_to_graph(g, startpoint, endpoint, (src, ) + path,
-                                                edge_attrs, type_, type_ = type_)
+                                                edge_attrs, type_, type_ = type_, store_path = store_paths)
                                 else:
                                     # No it is not. Keep traversing
                                     stack.append( (type_, src, endpoint, (src, ) + path, clk_nodes) )
@@ -390,7 +605,7 @@ class ModuleUtils(Object):
                                 # add the edge if ``type_`` is combinational
                                 if type_.is_comb_bitwise:
                                     cls.__add_edge_to_graph(g, startpoint, endpoint, (src, ) + path,
-                                            edge_attrs, type_, type_ = type_)
+                                            edge_attrs, type_, type_ = type_, store_path = store_paths)
                             else:
                                 # No it is not. Keep traversing
                                 stack.append( (type_, src, endpoint, (src, ) + path, clk_nodes) )
@@ -6,8 +6,24 @@ from .util import NetUtils
 from ...util import uno
 from ...exception import PRGAInternalError
 
+from weakref import WeakValueDictionary
+
 __all__ = ["Port", "Pin", "HierarchicalPin"]
 
+def _getstate(net):
+    """Get the pickled state of ``net``. References cached by `NetUtils._reference` are left out and rebuilt lazily
+    after unpickling."""
+    slots = {}
+    for cls in type(net).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if name not in ("_ref", "_refname", "__dict__", "__weakref__"):
+                try:
+                    # use the slot descriptor directly so lazily-loaded attributes are not loaded here
+                    slots[name] = cls.__dict__[name].__get__(net)
+                except AttributeError:
+                    pass
+    return net.__dict__ or None, slots
+
 # ----------------------------------------------------------------------------
 # -- Bit ---------------------------------------------------------------------
 # ----------------------------------------------------------------------------
@@ -23,7 +39,7 @@ class _Bit(AbstractNonReferenceNet):
             and accessible as dynamic attributes
     """
 
-    __slots__ = ["_bus", "_index", "_connections", "__dict__"]
+    __slots__ = ["_bus", "_index", "_connections", "_ref", "_refname", "__dict__"]
     def __init__(self, bus, index, **kwargs):
         self._bus = bus
         self._index = index
@@ -35,6 +51,9 @@ class _Bit(AbstractNonReferenceNet):
     def __repr__(self):
         return 'Bit({}[{}])'.format(self.bus, self.index)
 
+    def __getstate__(self):
+        return _getstate(self)
+
     def __len__(self):
         return 1
 
@@ -89,7 +108,7 @@ class _Bit(AbstractNonReferenceNet):
 class _Bus(AbstractNonReferenceNet):
     """Base class for `Port` and `Pin`."""
 
-    __slots__ = ["_connections", "_bits", "__dict__"]
+    __slots__ = ["_connections", "_bits", "_ref", "_refname", "__dict__"]
 
     def __init__(self, **kwargs):
 
@@ -101,6 +120,9 @@ class _Bus(AbstractNonReferenceNet):
         for k, v in kwargs.items():
             setattr(self, k, v)
 
+    def __getstate__(self):
+        return _getstate(self)
+
     def __getitem__(self, index):
         index = self._auto_index(index)
         if index.stop - index.start == 1:
@@ -264,6 +286,13 @@ class Pin(_Bus):
     def __repr__(self):
         return "Pin({}/{})".format(self._instance, self._model.name)
 
+    def __getattr__(self, attr):
+        # the model may be loaded lazily if this pin is unpickled from a sharded context
+        if attr == "_model" and (ref := self.__dict__.pop("_lazy_model", None)) is not None:
+            self._model = ref()
+            return self._model
+        raise AttributeError(attr)
+
     def __len__(self):
         return len(self._model)
 
@@ -308,13 +337,29 @@ class HierarchicalPin(AbstractNet):
     Args:
         instance (`HierarchicalInstance`): The instance that this pin belongs to
         model (`Port`): The port in the model of ``instance`` that this pin corresponds to
+
+    Hierarchical pins are interned: while a hierarchical pin is alive, creating another one with the same
+    ``instance`` and ``model`` returns the same object.
     """
 
-    __slots__ = ['_instance', '_model']
+    __slots__ = ['_instance', '_model', '__weakref__']
+
+    __interned = WeakValueDictionary()
+
+    def __new__(cls, instance, model):
+        try:
+            return cls.__interned[instance, model]
+        except KeyError:
+            obj = super(HierarchicalPin, cls).__new__(cls)
+            obj._instance = instance
+            obj._model = model
+            return cls.__interned.setdefault( (instance, model), obj )
 
     def __init__(self, instance, model):
-        self._instance = instance
-        self._model = model
+        pass
+
+    def __getnewargs__(self):
+        return (self._instance, self._model)
 
     def __repr__(self):
         return "HierPin({}/{})".format(self._instance, self._model.name)
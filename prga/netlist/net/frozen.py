@@ -0,0 +1,189 @@
+# -*- encoding: ascii -*-
+"""Compact, read-only connectivity store for frozen modules."""
+
+from .common import NetType, TimingArcType
+from .util import TimingArc, NetConnection, NetUtils
+from ...util import Object
+from ...exception import PRGAInternalError
+
+from collections.abc import Mapping
+from array import array
+
+__all__ = []
+
+# ----------------------------------------------------------------------------
+# -- Frozen Net Connection ---------------------------------------------------
+# ----------------------------------------------------------------------------
+class _FrozenNetConnection(NetConnection):
+    """Read-only connection materialized from a `FrozenConnectivity` store on demand."""
+
+    __slots__ = []
+
+    def __init__(self, source, sink, arc, attrs):
+        object.__setattr__(self, "_source", source)
+        object.__setattr__(self, "_sink", sink)
+        if arc is None and source.net_type is not NetType.const:
+            arc = TimingArc(TimingArcType.comb_bitwise, source, sink)
+        object.__setattr__(self, "_arc", arc)
+        if attrs is not None:
+            object.__setattr__(self, "__dict__", attrs)
+
+    def __setattr__(self, attr, value):
+        raise PRGAInternalError("Cannot set attribute '{}' of {}. {} is frozen"
+                .format(attr, self, self._sink.parent))
+
+    def __delattr__(self, attr):
+        raise PRGAInternalError("Cannot delete attribute '{}' of {}. {} is frozen"
+                .format(attr, self, self._sink.parent))
+
+# ----------------------------------------------------------------------------
+# -- Frozen Connections Mapping ----------------------------------------------
+# ----------------------------------------------------------------------------
+class _FrozenConnections(Mapping):
+    """Read-only replacement of the ``_connections`` mapping of a net in a frozen module.
+
+    Args:
+        store (`FrozenConnectivity`): The store that the connections are kept in
+        index (:obj:`int`): Index of the net in ``store``
+    """
+
+    __slots__ = ["_store", "_index"]
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __len__(self):
+        return self._store._offsets[self._index + 1] - self._store._offsets[self._index]
+
+    def __iter__(self):
+        store = self._store
+        for e in store._adjacency(self._index):
+            yield NetUtils._reference(store._other(e, self._index))
+
+    def __getitem__(self, key):
+        if (e := self._store._find(self._index, key)) is None:
+            raise KeyError(key)
+        return self._store._connection(e)
+
+    def values(self):
+        store = self._store
+        return tuple(store._connection(e) for e in store._adjacency(self._index))
+
+    def items(self):
+        store = self._store
+        return tuple( (NetUtils._reference(store._other(e, self._index)), store._connection(e))
+                for e in store._adjacency(self._index) )
+
+# ----------------------------------------------------------------------------
+# -- Frozen Connectivity Store -----------------------------------------------
+# ----------------------------------------------------------------------------
+class FrozenConnectivity(Object):
+    """Connections of a frozen module, kept in compressed sparse row (CSR) tables.
+
+    Args:
+        module (`Module`): The module to be frozen. Must not be a cell module
+
+    Every port, pin and bit that owns a ``_connections`` mapping is assigned an integer index, and every connection
+    an integer ID. The connections of net ``i`` are ``_edges[_offsets[i]:_offsets[i + 1]]``, in the same order as
+    they were in the original mapping. Connections are stored as the indices of their sources and sinks; constant
+    sources are stored as negative indices into a table of distinct constants. Custom attributes and annotated timing
+    arcs of connections are kept only for the connections that have them.
+
+    `NetConnection` objects are not kept. They are materialized on each access and are read-only. Looking up a
+    connection by the reference of the net on the other end builds a mapping from references to connection IDs for
+    the whole store on first use. The mapping is not pickled.
+
+    Direct instantiation of this class is not recommended. Use `Module.freeze` instead.
+    """
+
+    __slots__ = ["_nets", "_consts", "_offsets", "_edges", "_sources", "_sinks", "_attrs", "_arcs", "_lookup"]
+
+    def __init__(self, module):
+        if module.is_cell:
+            raise PRGAInternalError("{} is a cell module".format(module))
+
+        # 1. collect nets
+        self._nets = []
+        buses = list(module.ports.values())
+        for instance in module.instances.values():
+            buses.extend(instance._pins.values())
+        for bus in buses:
+            if bus._coalesce_connections:
+                self._nets.append(bus)
+            else:
+                self._nets.extend(bus._bits)
+        indices = {id(net): i for i, net in enumerate(self._nets)}
+
+        # 2. number connections and build tables
+        self._consts, consts = [], {}
+        self._offsets, self._edges = array("Q", [0]), array("Q")
+        self._sources, self._sinks = array("q"), array("Q")
+        self._attrs, self._arcs = {}, {}
+        ids = {}
+        for net in self._nets:
+            for conn in net._connections.values():
+                if (e := ids.get(id(conn))) is None:
+                    e = ids[id(conn)] = len(self._sinks)
+                    if (source := conn.source).net_type is NetType.const:
+                        ref = NetUtils._reference(source)
+                        if (c := consts.get(ref)) is None:
+                            c = consts[ref] = len(self._consts)
+                            self._consts.append(source)
+                        self._sources.append(~c)
+                    else:
+                        self._sources.append(indices[id(source)])
+                    self._sinks.append(indices[id(conn.sink)])
+                    if (attrs := getattr(conn, "__dict__", None)):
+                        self._attrs[e] = attrs
+                    if (arc := conn.arc) is not None and not (arc.max_ is None and arc.min_ is None):
+                        self._arcs[e] = arc
+                self._edges.append(e)
+            self._offsets.append(len(self._edges))
+
+        # 3. replace the mappings
+        for i, net in enumerate(self._nets):
+            net._connections = _FrozenConnections(self, i)
+        self._lookup = None
+
+    def __getstate__(self):
+        return None, {k: getattr(self, k) for k in self.__slots__ if k != "_lookup"}
+
+    def _adjacency(self, i):
+        return self._edges[self._offsets[i] : self._offsets[i + 1]]
+
+    def _source(self, e):
+        if (i := self._sources[e]) < 0:
+            return self._consts[~i]
+        return self._nets[i]
+
+    def _other(self, e, i):
+        if self._sinks[e] == i:
+            return self._source(e)
+        return self._nets[self._sinks[e]]
+
+    def _find(self, i, key):
+        """Find the ID of the connection between net ``i`` and the net referred to by ``key``.
+
+        Args:
+            i (:obj:`int`): Index of the net
+            key (:obj:`Hashable`): Reference of the net on the other end, i.e. the key in the ``_connections``
+                mapping of net ``i``
+
+        Returns:
+            :obj:`int` or ``None``:
+        """
+        if (lookup := getattr(self, "_lookup", None)) is None:
+            lookup = self._lookup = {}
+            for e, sink in enumerate(self._sinks):
+                lookup.setdefault( (sink, NetUtils._reference(self._source(e))), e )
+                if (source := self._sources[e]) >= 0:
+                    lookup.setdefault( (source, NetUtils._reference(self._nets[sink])), e )
+        return lookup.get( (i, key) )
+
+    def _connection(self, e):
+        return _FrozenNetConnection(self._source(e), self._nets[self._sinks[e]],
+                self._arcs.get(e), self._attrs.get(e))
+
+    def __len__(self):
+        return len(self._sinks)
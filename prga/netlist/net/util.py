@@ -206,8 +206,8 @@ class NetUtils(Object):
 
     @classmethod
     def __connect(cls, module, source, sink, **kwargs):
-        """Connect ``source`` and ``sink``. This method should only be used in `NetUtils.connect` and
-        `NetUtils._break_bits` because it doesn't validate ``source`` or ``sink``."""
+        """Connect ``source`` and ``sink``. This method should only be used in `NetUtils.connect`,
+        `NetUtils.connect_bulk` and `NetUtils._break_bits` because it doesn't validate ``source`` or ``sink``."""
         srcref, sinkref = map(lambda x: cls._reference(x), (source, sink))
         if (conn := sink._connections.get(srcref)) is None:
             if not module.allow_multisource and len(sink._connections):
@@ -301,6 +301,13 @@ class NetUtils(Object):
     def _reference(cls, net, *, byname = False):
         """Get a hashable key for ``net``.
 
+        References of ports, pins and bits are cached on the nets themselves, and references of hierarchical pins are
+        interned in a table stored on the top-level module. References only depend on the keys and names of ports
+        and instances, which never change, so cached references are never invalidated, but they stay alive as long as
+        the nets or the top-level module do. Passes that reference many hierarchical pins should call
+        `NetUtils._clear_reference_cache` when they are done. Cached references are left out when nets and modules
+        are pickled. Bits created by `NetUtils._break_bits` have the same references as the slices they replace.
+
         Args:
             net (`AbstractNet`):
 
@@ -310,7 +317,29 @@ class NetUtils(Object):
         Returns:
             :obj:`Sequence` [:obj:`Hashable` ] or :obj:`str`:
         """
-        if net.net_type.is_const:
+        net_type = net.net_type
+        if net_type is NetType.port or net_type is NetType.pin or net_type is NetType.bit:
+            try:
+                return net._refname if byname else net._ref
+            except AttributeError:
+                pass
+            ref = cls.__reference(net, byname)
+            if byname:
+                net._refname = ref
+            else:
+                net._ref = ref
+            return ref
+        elif net_type is NetType.hierarchical:
+            try:
+                table = net.parent._hierarchical_references
+            except AttributeError:
+                table = net.parent._hierarchical_references = {}
+            key = net.model, net.instance.hierarchy, byname
+            try:
+                return table[key]
+            except KeyError:
+                return table.setdefault(key, cls.__reference(net, byname))
+        elif net_type is NetType.const:
             if byname:
                 if net.value is None:
                     return "{}'hx".format(len(net))
@@ -318,7 +347,15 @@ class NetUtils(Object):
                     return "{}'h{:x}".format(len(net), net.value)
             else:
                 return (net.value, len(net), NetType.const)
-        elif net.net_type.is_port:
+        elif net_type is NetType.slice_:
+            return cls.__reference(net, byname)
+        else:
+            raise PRGAInternalError("Cannot create reference for {}".format(net))
+
+    @classmethod
+    def __reference(cls, net, byname):
+        """Create a reference for a port, pin, hierarchical pin, bit or slice without using the cache."""
+        if net.net_type.is_port:
             if byname:
                 return net.name
             else:
@@ -328,7 +365,7 @@ class NetUtils(Object):
                 return ".".join(i.name for i in reversed(net.instance.hierarchy)) + "." + net.model.name
             else:
                 return (net.model.key, ) + tuple(i.key for i in net.instance.hierarchy)
-        elif net.net_type.is_bit or net.net_type.is_slice:
+        else:
             if byname:
                 if isinstance(net.index, int):
                     return cls._reference(net.bus, byname = True) + "[{}]".format(net.index)
@@ -337,8 +374,15 @@ class NetUtils(Object):
                             net.range_.stop - 1, net.range_.start)
             else:
                 return (net.index, cls._reference(net.bus))
-        else:
-            raise PRGAInternalError("Cannot create reference for {}".format(net))
+
+    @classmethod
+    def _clear_reference_cache(cls, top):
+        """Clear the intern table of hierarchical pin references in ``top``.
+
+        Args:
+            top (`Module`): The top-level module of the hierarchical pins
+        """
+        top.__dict__.pop("_hierarchical_references", None)
 
     @classmethod
     def _dereference(cls, module, ref, *, byname = False):
@@ -418,6 +462,8 @@ class NetUtils(Object):
                     .format(bus, bus.parent))
         elif not bus._coalesce_connections:
             raise PRGAInternalError("{} is already broken into bits".format(bus))
+        elif bus.parent.is_frozen:
+            raise PRGAInternalError("Cannot break {} into bits. {} is frozen".format(bus, bus.parent))
 
         connections = bus._break_bits()
         if bus.is_sink:
@@ -479,6 +525,8 @@ class NetUtils(Object):
             raise PRGAInternalError(
                     "{} is a cell module. Create timing arcs with `NetUtils.create_timing_arc` instead"
                     .format(module))
+        elif module.is_frozen:
+            raise PRGAInternalError("Cannot connect {} to {}. {} is frozen".format(sources, sinks, module))
 
         # 3. create connection pairs
         pairs = None
@@ -492,7 +540,7 @@ class NetUtils(Object):
                 for item in (concat.items if concat.net_type.is_concat else [concat]):
                     if item.net_type not in (NetType.port, NetType.pin, NetType.const):
                         raise PRGAInternalError("{} does not support bitwise connections ({} is not a bus)"
-                            .format(item))
+                            .format(module, item))
                     list_.append(item)
             sources, sinks = source_list, sink_list
             if len(sources) != len(sinks):
@@ -530,6 +578,60 @@ class NetUtils(Object):
                         .format(src, len(src), sink, len(sink)))
             cls.__connect(module, src, sink, **kwargs)
 
+    @classmethod
+    def connect_bulk(cls, pairs, *, module, **kwargs):
+        """Connect pre-resolved source-sink pairs in ``module``.
+
+        Unlike `NetUtils.connect`, this method does not concatenate or pair up nets, and only ``module`` is
+        validated. Use this method to create a large number of connections in a tight loop.
+
+        Args:
+            pairs (:obj:`Iterable` [:obj:`tuple` [`AbstractNonReferenceNet`, `AbstractNonReferenceNet` ]]): Source
+                and sink pairs. Each source is a port, pin, bit or constant value in ``module``, and each sink is a
+                port, pin or bit in ``module`` of the same width as its source. Pairs of multi-bit buses are connected
+                bus-wise if both buses coalesce connections, and paired up bit-wise otherwise. Slices of buses are
+                also accepted in modules that support bit-wise connections. Sources and sinks are not otherwise
+                validated, so use with care
+
+        Keyword Args:
+            module (`Module`): Parent module of the sources and sinks
+            **kwargs: Custom attibutes assigned to all connections
+        """
+        if module.is_cell:
+            raise PRGAInternalError(
+                    "{} is a cell module. Create timing arcs with `NetUtils.create_timing_arc` instead"
+                    .format(module))
+        elif module.is_frozen:
+            raise PRGAInternalError("Cannot connect nets in {}. {} is frozen".format(module, module))
+
+        for src, sink in pairs:
+            if (net_type := src.net_type) is NetType.const and src.value is None:
+                continue
+            elif net_type is NetType.slice_ and len(src) == 1:
+                src, net_type = cls.__resolve_bit(module, src), NetType.bit
+            if (sink_type := sink.net_type) is NetType.slice_ and len(sink) == 1:
+                sink, sink_type = cls.__resolve_bit(module, sink), NetType.bit
+            if len(sink) > 1 and (NetType.slice_ in (net_type, sink_type) or not (sink._coalesce_connections and
+                    (net_type is NetType.const or src._coalesce_connections))):
+                # multi-bit slices, or either bus is already broken into bits
+                if module.coalesce_connections:
+                    raise PRGAInternalError("{} does not support bitwise connections (cannot connect {} to {})"
+                            .format(module, src, sink))
+                for src_bit, sink_bit in cls.__pair_bitwise(src, sink):
+                    cls.__connect(module, src_bit, sink_bit, **kwargs)
+                continue
+            cls.__connect(module, src, sink, **kwargs)
+
+    @classmethod
+    def __resolve_bit(cls, module, slice_):
+        """Get the persistent bit for the single-bit ``slice_``, breaking its bus into bits if needed."""
+        if module.coalesce_connections:
+            raise PRGAInternalError("{} does not support bitwise connections ({} is not a bus)"
+                    .format(module, slice_))
+        elif (bus := slice_.bus)._coalesce_connections:
+            cls._break_bits(bus)
+        return bus._bits[slice_.range_.start]
+
     @classmethod
     def disconnect(cls, sources = None, sinks = None):
         """Disconnect ``sources`` and ``sinks``.
@@ -570,6 +672,8 @@ class NetUtils(Object):
 
         if module is None:
             raise PRGAInternalError("At least one of 'sources' and 'sinks' must be specified")
+        elif module.is_frozen:
+            raise PRGAInternalError("Cannot disconnect {} from {}. {} is frozen".format(sinks, sources, module))
 
         # 3. create disconnection pairs
         pairs = None
@@ -581,7 +685,7 @@ class NetUtils(Object):
                 for item in (concat.items if concat.net_type.is_concat else [concat]):
                     if item.net_type not in (NetType.port, NetType.pin, NetType.const):
                         raise PRGAInternalError("{} does not support bitwise connections ({} is not a bus)"
-                            .format(item))
+                            .format(module, item))
                     list_.append(item)
             if source_list and sink_list:
                 if len(source_list) != len(sink_list):
@@ -781,7 +885,7 @@ class NetUtils(Object):
             elif source.net_type.is_bit or source._coalesce_connections:
                 return tuple(conn.sink for conn in source._connections.values())
         elif source.net_type.is_slice and source.bus._coalesce_connections:
-            return tuple(sink[source.index] for sink in cls.get_sinks(source))
+            return tuple(sink[source.index] for sink in cls.get_sinks(source.bus))
         bitwise = tuple(cls.get_sinks(bit) for bit in source)
         l = []
         for sinks in zip_longest(bitwise):
@@ -876,6 +980,9 @@ class NetUtils(Object):
             raise PRGAInternalError("{} is not a port in a cell module".format(sink))
         elif source.parent is not sink.parent:
             raise PRGAInternalError("{} and {} are not in the same module".format(source, sink))
+        elif source.parent.is_frozen:
+            raise PRGAInternalError("Cannot create timing arc in {}. {} is frozen"
+                    .format(source.parent, source.parent))
         type_ = TimingArcType.construct(type_)
         # 2. further validate arguments
         if type_.is_comb_bitwise or type_.is_comb_matrix:
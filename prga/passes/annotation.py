@@ -14,7 +14,11 @@ __all__ = ['SwitchPathAnnotation']
 # -- Switch Path Annotation Pass ---------------------------------------------
 # ----------------------------------------------------------------------------
 class SwitchPathAnnotation(AbstractPass):
-    """Annotate design-view implementation of programmable connections on abstract views."""
+    """Annotate design-view implementation of programmable connections on abstract views.
+
+    This pass is incremental: when it is run again on the same context, only the modules re-translated since they
+    were annotated are annotated again.
+    """
 
     @property
     def key(self):
@@ -24,7 +28,11 @@ class SwitchPathAnnotation(AbstractPass):
     def dependences(self):
         return ("translation", )
 
-    def __process_module(self, context, abstract = None, _cache = None):
+    @property
+    def is_incremental_pass(self):
+        return True
+
+    def __process_module(self, context, digests, abstract = None, _cache = None):
         # short alias
         umod = uno(abstract, context.top)
 
@@ -38,9 +46,13 @@ class SwitchPathAnnotation(AbstractPass):
             return
         _cache.add(umod.key)
 
+        # check if ``abstract`` is annotated in a previous run. If so, so are all its submodules
+        if context._is_up_to_date(self.key, umod.key, digests[umod.key]):
+            return
+
         # process submodules (instances)
         for i in umod.instances.values():
-            self.__process_module(context, i.model, _cache)
+            self.__process_module(context, digests, i.model, _cache)
 
         # shortcut for arrays and tiles
         if umod.module_class in (ModuleClass.array, ModuleClass.tile):
@@ -79,7 +91,12 @@ class SwitchPathAnnotation(AbstractPass):
                     NetUtils._dereference(umod, endpoint), skip_validations = True)
             conn.switch_path = tuple(switch_path)
 
+        # release the hierarchical pin references interned while reducing the timing graph
+        NetUtils._clear_reference_cache(lmod)
         _logger.info(" .. Annotated: {}".format(umod))
 
     def run(self, context):
-        self.__process_module(context)
+        digests = context._module_digests(context.top)
+        self.__process_module(context, digests)
+        for key, digest in digests.items():
+            context._stamp_module(self.key, key, digest)
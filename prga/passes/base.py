@@ -31,6 +31,19 @@ class AbstractPass(Object):
         """:obj:`bool`: Test if this is a read-only pass that can be run multiple times."""
         return False
 
+    @property
+    def is_incremental_pass(self):
+        """:obj:`bool`: Test if this pass only processes the modules changed since the last time it was run, so it
+        can be run again on the same context after the architecture is modified."""
+        return False
+
+    @property
+    def transient_attributes(self):
+        """:obj:`Sequence` [:obj:`str` ]: Attributes of this pass that do not affect its results, e.g. run-time
+        settings, opened files, and states collected while running. They are excluded from the digest that
+        identifies the checkpoints saved after this pass."""
+        return tuple()
+
     @property
     def dependences(self):
         """Passes that this pass depend on."""
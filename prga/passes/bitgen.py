@@ -0,0 +1,74 @@
+# -*- encoding: ascii -*-
+
+from .base import AbstractPass
+from ..tools.bitgen.scanchain import ScanchainBitstreamGenerator
+from ..tools.bitgen.pktchain import PktchainBitstreamGenerator
+from ..tools.bitgen.frame import FrameBitstreamGenerator
+from ..tools.bitgen.index import BitstreamIndex
+from ..exception import PRGAAPIError
+
+import os
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ['BitstreamIndexGeneration']
+
+# ----------------------------------------------------------------------------
+# -- Bitstream Index Generation Pass -----------------------------------------
+# ----------------------------------------------------------------------------
+class BitstreamIndexGeneration(AbstractPass):
+    """Precompile all legal FASM features into a bitstream index, so the bitstream generator can work without
+    loading the architecture context.
+
+    Args:
+        output_file (:obj:`str` of file-like object): The output file
+
+    Refer to `BitstreamIndex` for more information about the index file.
+    """
+
+    __slots__ = ['output_file']
+
+    _generators = {
+            'Scanchain':    ScanchainBitstreamGenerator,
+            'Pktchain':     PktchainBitstreamGenerator,
+            'Frame':        FrameBitstreamGenerator,
+            }
+
+    def __init__(self, output_file = "bitgen.idx"):
+        self.output_file = output_file
+
+    @property
+    def transient_attributes(self):
+        return ("output_file", )
+
+    @property
+    def key(self):
+        return "bitgen.index"
+
+    @property
+    def dependences(self):
+        return ("prog.insertion", )
+
+    @property
+    def is_readonly_pass(self):
+        return True
+
+    def run(self, context):
+        if (generator := self._generators.get(prog_type := context.prog_entry.__name__)) is None:
+            raise PRGAAPIError("Bitstream index not supported for programming circuitry type: {}"
+                    .format(prog_type))
+
+        index = generator(context).build_index()
+
+        if isinstance(self.output_file, str):
+            f = self.output_file
+            if os.path.dirname(f):
+                os.makedirs(os.path.dirname(f), exist_ok = True)
+            with open(f, "wb") as output:
+                BitstreamIndex.write(output, prog_type, context.summary, index)
+        else:
+            f = self.output_file.name
+            BitstreamIndex.write(self.output_file, prog_type, context.summary, index)
+
+        _logger.info("Bitstream index ({} features) generated: {}".format(len(index), f))
@@ -1,16 +1,41 @@
 # -*- encoding: ascii -*-
 
 from ..util import Object, uno
+from ..core.shard import ShardedModuleDatabase, _ShardPickler, _ShardUnpickler
 from ..exception import PRGAInternalError, PRGAAPIError
 
+from itertools import chain
+from hashlib import blake2b
 import networkx as nx
-import time
+import os, io, re, time, pickle, multiprocessing
 
 import logging
 _logger = logging.getLogger(__name__)
 
 __all__ = ["Flow"]
 
+# passes and context in the worker processes. Refer to `Flow._run_parallel`
+_worker = None
+
+def _init_worker(passes, context, registry):
+    global _worker
+    _worker = passes, context, registry
+
+def _run_readonly_pass(i):
+    passes, context, registry = _worker
+    summary, stamps = Flow._snapshot_summary(context.summary), {k: dict(v) for k, v in context._module_stamps.items()}
+    # render the files of this pass in the worker process
+    context.renderer = None
+    Flow._run_pass(passes[i], context)
+    context.renderer.render()
+    # summary and stamps may refer to modules, so they are pickled with the modules replaced by references
+    globals_ = {id(global_): name for name, global_ in context._globals.items()}
+    with io.BytesIO() as f:
+        _ShardPickler(f, context, registry, globals_, tuple(), lazy_models = False).dump( (
+            Flow._diff_summary(context.summary, summary),
+            Flow._diff_module_stamps(context._module_stamps, stamps) ) )
+        return f.getvalue()
+
 # ----------------------------------------------------------------------------
 # -- Flow --------------------------------------------------------------------
 # ----------------------------------------------------------------------------
@@ -19,11 +44,24 @@ class Flow(Object):
     
     Args:
         *args: Passes
+
+    Keyword Args:
+        jobs (:obj:`int`): Number of worker processes. If greater than 1, read-only passes are run after the other
+            passes whenever the dependences allow, and those that do not depend on each other are run concurrently in
+            forked worker processes. Each worker renders the files added by its pass, and the updates to
+            ``context.summary`` are merged back into the context
+        checkpoint_dir (:obj:`str`): If set, a checkpoint of the context is saved in this directory after each pass
+            that is not read-only, and read-only passes are run after the other passes whenever the dependences
+            allow. Refer to `Flow.run` for more information
     """
 
-    __slots__ = ["_passes"]
-    def __init__(self, *passes):
+    __slots__ = ["_passes", "jobs", "checkpoint_dir"]
+
+    _reprog_address = re.compile(" at 0x[0-9a-fA-F]+")
+    def __init__(self, *passes, jobs = 1, checkpoint_dir = None):
         self._passes = list(iter(passes))
+        self.jobs = jobs
+        self.checkpoint_dir = checkpoint_dir
 
     def __key_is_prefix(self, key, other):
         """Check if ``key`` is a prefix of ``other``.
@@ -55,6 +93,227 @@ class Flow(Object):
         """
         return not (self.__key_is_prefix(key, other) or self.__key_is_prefix(other, key))
 
+    @classmethod
+    def _run_pass(cls, pass_, context):
+        _logger.info("********************")
+        _logger.info("running pass '%s'", pass_.key)
+        t = time.time()
+        pass_.run(context)
+        _logger.info("pass '%s' took %f seconds", pass_.key, time.time() - t)
+
+    @classmethod
+    def _pass_digest(cls, pass_):
+        """Compute a digest of the type, the key and the parameters of ``pass_``.
+
+        Args:
+            pass_ (`AbstractPass`):
+
+        Returns:
+            :obj:`bytes`:
+
+        Parameters are the attributes of ``pass_``, compared by their ``repr``. Attributes listed in
+        `AbstractPass.transient_attributes` do not affect the result of the pass, and are excluded. Parameters without a stable ``repr``, e.g. functions, produce a different
+        digest in every Python process, which is reported with a warning.
+        """
+        h = blake2b(digest_size = 16)
+        h.update(repr( (type(pass_).__module__, type(pass_).__qualname__, pass_.key) ).encode())
+        attrs = set(getattr(pass_, "__dict__", ()))
+        for c in type(pass_).__mro__:
+            slots = getattr(c, "__slots__", ())
+            attrs.update( (slots, ) if isinstance(slots, str) else slots )
+        attrs.difference_update( ("__dict__", "__weakref__") )
+        attrs.difference_update(pass_.transient_attributes)
+        for attr in sorted(attrs):
+            if hasattr(pass_, attr):
+                r = repr( (attr, getattr(pass_, attr)) )
+                if cls._reprog_address.search(r):
+                    _logger.warning("Parameter '{}' of pass '{}' is not stable across runs. Checkpoints saved after "
+                            "this pass cannot be resumed from".format(attr, pass_.key))
+                h.update(r.encode())
+        return h.digest()
+
+    def _checkpoints(self, passes, order, context):
+        """Name the checkpoints saved after the passes that are not read-only.
+
+        Args:
+            passes (:obj:`Sequence` [`AbstractPass` ]): All passes in this flow
+            order (:obj:`Sequence` [:obj:`int` ]): Indices of the passes in the order they are run
+            context (`Context`):
+
+        Returns:
+            :obj:`dict` [:obj:`int`, :obj:`str` ]: Mapping from pass indices to checkpoint names
+
+        The name of a checkpoint consists of the position and the key of the pass, and a digest of the initial
+        abstract-view architecture and the parameters of all the passes up to the checkpoint. A checkpoint is
+        therefore never picked up if anything before it changes.
+        """
+        h = blake2b(digest_size = 16)
+        if (top := context.top) is not None:
+            h.update(context._module_digests(top)[top.key])
+        h.update(repr(sorted(getattr(context, "_applied_passes", ()))).encode())
+        checkpoints = {}
+        for i in order:
+            if passes[i].is_readonly_pass:
+                continue
+            h.update(self._pass_digest(passes[i]))
+            checkpoints[i] = "{:0>2d}_{}_{}".format(len(checkpoints), passes[i].key, h.hexdigest())
+        return checkpoints
+
+    @classmethod
+    def _load_checkpoint(cls, context, directory):
+        """Load a checkpoint into ``context``.
+
+        Args:
+            context (`Context`):
+            directory (:obj:`str`): Directory of the checkpoint
+
+        Returns:
+            :obj:`bool`: ``False`` if the checkpoint is incomplete or saved by another version of PRGA
+        """
+        try:
+            index = ShardedModuleDatabase.read_index(directory)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False
+        if index.get("version") != context.version:
+            return False
+        ShardedModuleDatabase.load(context, directory, index)
+        # following passes modify the modules, so load all of them now
+        context._database = dict(context._database.items())
+        context.summary.cwd = context.cwd
+        _logger.info("Checkpoint loaded from {}".format(directory))
+        return True
+
+    @classmethod
+    def _snapshot_summary(cls, summary):
+        """Take a snapshot of ``summary``. Each attribute is pickled, and attributes that are dicts are pickled per
+        key.
+
+        Args:
+            summary (`ContextSummary`):
+
+        Returns:
+            :obj:`dict`:
+        """
+        snapshot = {}
+        for attr in chain(type(summary).__slots__, summary.__dict__):
+            if attr == "__dict__" or not hasattr(summary, attr):
+                continue
+            elif type(value := getattr(summary, attr)) is dict:
+                snapshot[attr] = {k: pickle.dumps(v) for k, v in value.items()}
+            else:
+                snapshot[attr] = pickle.dumps(value)
+        return snapshot
+
+    @classmethod
+    def _diff_summary(cls, summary, snapshot):
+        """Find the updates to ``summary`` since ``snapshot`` is taken.
+
+        Args:
+            summary (`ContextSummary`):
+            snapshot (:obj:`dict`): Return value of `Flow._snapshot_summary`
+
+        Returns:
+            :obj:`list` [:obj:`tuple` ]: Updates to be applied with `Flow._apply_summary_diff`
+        """
+        updates, current = [], cls._snapshot_summary(summary)
+        for attr, value in current.items():
+            if type(value) is dict and type(prev := snapshot.get(attr)) is dict:
+                changed = {k: getattr(summary, attr)[k] for k, v in value.items() if prev.get(k) != v}
+                removed = tuple(k for k in prev if k not in value)
+                if changed or removed:
+                    updates.append( ("update", attr, changed, removed) )
+            elif value != snapshot.get(attr):
+                updates.append( ("set", attr, getattr(summary, attr)) )
+        for attr in snapshot:
+            if attr not in current:
+                updates.append( ("del", attr) )
+        return updates
+
+    @classmethod
+    def _apply_summary_diff(cls, summary, updates):
+        """Apply the updates found by `Flow._diff_summary` to ``summary``.
+
+        Args:
+            summary (`ContextSummary`):
+            updates (:obj:`list` [:obj:`tuple` ]):
+        """
+        for op, attr, *args in updates:
+            if op == "set":
+                setattr(summary, attr, args[0])
+            elif op == "del":
+                delattr(summary, attr)
+            else:
+                if type(value := getattr(summary, attr, None)) is not dict:
+                    value = {}
+                    setattr(summary, attr, value)
+                changed, removed = args
+                value.update(changed)
+                for k in removed:
+                    value.pop(k, None)
+
+    @classmethod
+    def _diff_module_stamps(cls, stamps, snapshot):
+        """Find the updates to the module stamps since ``snapshot`` is taken. Refer to `Context._stamp_module`.
+
+        Args:
+            stamps (:obj:`dict`): Current module stamps
+            snapshot (:obj:`dict`): A copy of the module stamps taken earlier
+
+        Returns:
+            :obj:`list` [:obj:`tuple` [:obj:`Hashable`, :obj:`Hashable`, :obj:`Hashable` ]]: Key of the module, key
+                of the pass, and the digest
+        """
+        updates = []
+        for key, passes in stamps.items():
+            prev = snapshot.get(key, {})
+            for pass_key, digest in passes.items():
+                if pass_key not in prev or prev[pass_key] != digest:
+                    updates.append( (key, pass_key, digest) )
+        return updates
+
+    def _run_parallel(self, passes, g, nodes, context):
+        """Run read-only passes concurrently in forked worker processes.
+
+        Args:
+            passes (:obj:`Sequence` [`AbstractPass` ]): All passes in this flow
+            g (`networkx.DiGraph`_): Dependence graph of ``passes``
+            nodes (:obj:`Sequence` [:obj:`int` ]): Indices of the read-only passes to be run, in topological order
+            context (`Context`):
+
+        .. _networkx.DiGraph: https://networkx.github.io/documentation/stable/reference/classes/digraph.html
+        """
+        # group passes into waves. Passes in the same wave do not depend on each other
+        levels, waves = {}, []
+        for i in nodes:
+            level = levels[i] = 1 + max((levels[j] for j in g.predecessors(i) if j in levels), default = -1)
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(i)
+
+        registry = None
+        for wave in waves:
+            if len(wave) == 1:
+                self._run_pass(passes[wave[0]], context)
+            else:
+                _logger.info("********************")
+                _logger.info("running passes concurrently: %s", ", ".join("'{}'".format(passes[i].key) for i in wave))
+                t = time.time()
+                if registry is None:
+                    registry = {}
+                    for k, module in context._database.items():
+                        ShardedModuleDatabase._register(registry, k, module)
+                with multiprocessing.get_context("fork").Pool(min(self.jobs, len(wave)), _init_worker,
+                        (passes, context, registry)) as pool:
+                    for payload in pool.imap(_run_readonly_pass, wave):
+                        with io.BytesIO(payload) as f:
+                            summary, stamps = _ShardUnpickler(f, context._database, context = context).load()
+                        self._apply_summary_diff(context.summary, summary)
+                        for key, pass_key, digest in stamps:
+                            context._stamp_module(pass_key, key, digest)
+                _logger.info("passes took %f seconds", time.time() - t)
+            for i in wave:
+                context._applied_passes.add(passes[i].key)
+
     def add_pass(self, pass_):
         """Add one pass to the flow.
 
@@ -63,12 +322,21 @@ class Flow(Object):
         """
         self._passes.append( pass_ )
 
-    def run(self, context):
+    def run(self, context, *, resume = False):
         """Run all added passes on ``context``.
 
         Args:
             context (`Context`):
+
+        Keyword Args:
+            resume (:obj:`bool`): If set, the newest valid checkpoint in ``checkpoint_dir`` is loaded into
+                ``context``, and the passes that are not read-only up to the checkpoint are skipped. A checkpoint is
+                valid only if the architecture in ``context`` and the parameters of the passes up to the checkpoint
+                are unchanged. Read-only passes are always run because the files they add are only rendered at the
+                end of the flow
         """
+        if resume and self.checkpoint_dir is None:
+            raise PRGAAPIError("Cannot resume a flow without checkpoints. Set 'checkpoint_dir'")
         if not hasattr(context, "_applied_passes"):
             context._applied_passes = set()
         # 1. resolve dependences/conflicts
@@ -80,8 +348,8 @@ class Flow(Object):
                     # 1.1 is the pass added twice?
                     if pass_.key in passes:
                         raise PRGAAPIError("Pass {} is added twice".format(pass_.key))
-                    # 1.2 is the pass already executed?
-                    if pass_.key in context._applied_passes:
+                    # 1.2 is the pass already executed? Incremental passes may be executed again
+                    if pass_.key in context._applied_passes and not pass_.is_incremental_pass:
                         raise PRGAAPIError("Pass {} is already applied to the context".format(pass_.key))
                     # 1.3 any duplicates? 
                     try:
@@ -91,7 +359,8 @@ class Flow(Object):
                         pass
                     try:
                         duplicate = next(key for key in context._applied_passes
-                                if not self.__key_is_irrelevent(pass_.key, key))
+                                if not (self.__key_is_irrelevent(pass_.key, key) or
+                                    (pass_.is_incremental_pass and key == pass_.key)))
                         raise PRGAAPIError("Pass {} and {} conflict with each other".format(pass_.key, key))
                     except StopIteration:
                         pass
@@ -139,19 +408,44 @@ class Flow(Object):
                 if any(self.__key_is_prefix(rule, other.key) for rule in pass_.passes_after_self):
                     # ``other`` cannot be executed before ``pass_``
                     g.add_edge(i, j)
-        # sort
+        # sort. When running with multiple jobs, read-only passes are deferred so more of them can run concurrently.
+        #   The same applies when checkpoints are enabled, so fewer read-only passes are run again after resuming
         try:
-            passes = [passes[i] for i in nx.topological_sort(g)]
+            if self.jobs > 1 or self.checkpoint_dir is not None:
+                order = list(nx.lexicographical_topological_sort(g, key = lambda i: (passes[i].is_readonly_pass, i)))
+            else:
+                order = list(nx.topological_sort(g))
         except nx.exception.NetworkXUnfeasible:
             raise PRGAAPIError("Cannot determine a feasible order of the passes")
-        # 3. run passes
-        for pass_ in passes:
-            _logger.info("********************")
-            _logger.info("running pass '%s'", pass_.key)
-            t = time.time()
-            pass_.run(context)
-            _logger.info("pass '%s' took %f seconds", pass_.key, time.time() - t)
-            context._applied_passes.add(pass_.key)
+        # 3. run passes. Read-only passes at the end of the flow may run concurrently
+        tail = len(order)
+        if self.jobs > 1:
+            if "fork" not in multiprocessing.get_all_start_methods():
+                _logger.warning("Parallel pass execution is not supported on this platform. Use 1 job instead")
+            else:
+                while tail > 0 and passes[order[tail - 1]].is_readonly_pass:
+                    tail -= 1
+        checkpoints, skipped = {}, set()
+        if self.checkpoint_dir is not None:
+            checkpoints = self._checkpoints(passes, order, context)
+            if resume:
+                for pos in reversed(range(len(order))):
+                    if ((name := checkpoints.get(order[pos])) is not None and
+                            self._load_checkpoint(context, os.path.join(self.checkpoint_dir, name))):
+                        skipped.update(i for i in order[:pos + 1] if not passes[i].is_readonly_pass)
+                        break
+                else:
+                    _logger.info("No valid checkpoint found in {}".format(self.checkpoint_dir))
+        for i in order[:tail]:
+            if i in skipped:
+                _logger.info("skipping pass '%s' (restored from checkpoint)", passes[i].key)
+                continue
+            self._run_pass(passes[i], context)
+            context._applied_passes.add(passes[i].key)
+            if (name := checkpoints.get(i)) is not None:
+                context.pickle(os.path.join(self.checkpoint_dir, name), sharded = True)
+        if tail < len(order):
+            self._run_parallel(passes, g, order[tail:], context)
         # 4. render all files
         try:
             context._renderer.render()
@@ -2,13 +2,22 @@
 
 from .base import AbstractPass
 
+import logging
+_logger = logging.getLogger(__name__)
+
 __all__ = ['ProgCircuitryInsertion']
 
 # ----------------------------------------------------------------------------
 # -- Programming Circuitry Insertion Pass ------------------------------------
 # ----------------------------------------------------------------------------
 class ProgCircuitryInsertion(AbstractPass):
-    """Insert programming circuitry."""
+    """Insert programming circuitry.
+
+    This pass is incremental: when it is run again on the same context, it is skipped if nothing is re-translated
+    since the last run. Otherwise, if the programming circuitry entry supports incremental insertion, only the
+    re-translated modules are processed. If not, `Translation` re-translates all modules so programming circuitry is
+    inserted from scratch.
+    """
 
     __slots__ = ['_kwargs']
 
@@ -19,6 +28,10 @@ class ProgCircuitryInsertion(AbstractPass):
     def key(self):
         return "prog.insertion"
 
+    @property
+    def is_incremental_pass(self):
+        return True
+
     @property
     def dependences(self):
         return ("annotation.switch_path", )
@@ -28,4 +41,10 @@ class ProgCircuitryInsertion(AbstractPass):
         return ("rtl", )
 
     def run(self, context):
+        digests = context._module_digests(context.top)
+        if context._is_up_to_date(self.key, context.top.key, digests[context.top.key]):
+            _logger.info("Programming circuitry is up to date")
+            return
         context.prog_entry.insert_prog_circuitry(context, **self._kwargs)
+        for key, digest in digests.items():
+            context._stamp_module(self.key, key, digest)
@@ -7,6 +7,9 @@ from ..exception import PRGAInternalError, PRGAAPIError
 
 import os
 
+import logging
+_logger = logging.getLogger(__name__)
+
 __all__ = ['VerilogCollection']
 
 # ----------------------------------------------------------------------------
@@ -25,10 +28,13 @@ class VerilogCollection(AbstractPass):
         view (`ModuleView` or :obj:`str`): Generate Verilog source files with the specified view
         incremental (:obj:`bool`): If set to ``True``, the RTL sources already listed in
             ``context.summary.rtl["sources"]`` will not be overwritten
+
+    When this pass is run again on the same context, Verilog files are not rendered again for the modules that are
+    not re-translated since the files were rendered, if the files still exist.
     """
 
     __slots__ = ['renderer', 'src_output_dir', 'header_output_dir', 'view',
-            'visited_modules', 'added_headers', 'incremental']
+            'visited_modules', 'added_headers', 'incremental', 'digests']
     def __init__(self, src_output_dir = ".", header_output_dir = None, view = ModuleView.design,
             incremental = False):
         self.src_output_dir = src_output_dir
@@ -58,7 +64,13 @@ class VerilogCollection(AbstractPass):
         self.visited_modules[module.key] = f
 
         if getattr(module, "do_generate_verilog", not os.path.isabs(f)):
-            self.renderer.add_verilog(f, module, getattr(module, "verilog_template", "generic/module.tmpl.v"))
+            if ((digest := self.digests.get(module.key)) is not None and os.path.exists(f)
+                    and context._is_up_to_date((self.key, f), module.key, digest)):
+                _logger.info(" .. Up to date: {}".format(f))
+            else:
+                self.renderer.add_verilog(f, module, getattr(module, "verilog_template", "generic/module.tmpl.v"))
+                if digest is not None:
+                    context._stamp_module((self.key, f), module.key, digest)
         for instance in module.instances.values():
             self._process_module(context, instance.model)
 
@@ -73,6 +85,10 @@ class VerilogCollection(AbstractPass):
     def dependences(self):
         return ("translation", )
 
+    @property
+    def transient_attributes(self):
+        return ("renderer", "visited_modules", "added_headers", "digests")
+
     @property
     def is_readonly_pass(self):
         return True
@@ -82,6 +98,11 @@ class VerilogCollection(AbstractPass):
         if (top := context.system_top) is None:
             raise PRGAAPIError("System top module is not set")
 
+        # digests of the translated modules, combined with the state of programming circuitry insertion
+        stamps = context._module_stamps
+        self.digests = {key: (digest, stamps[key].get("prog.insertion"))
+                for key, digest in context._module_digests(context.top).items()
+                if context._is_up_to_date("translation", key, digest)}
         self._process_module(context, top)
 
         if not hasattr(context.summary, "rtl"):
@@ -1,21 +1,38 @@
 # -*- encoding: ascii -*-
 
 from .base import AbstractPass
-from ..netlist import PortDirection, Module, ModuleUtils, NetUtils, TimingArcType
+from ..netlist import PortDirection, Module, ModuleUtils, NetType, NetUtils, TimingArcType
 from ..core.common import ModuleClass, NetClass, IOType, ModuleView, SegmentID, BlockPinID, Position
 from ..core.builder.array.array import ArrayBuilder
+from ..core.shard import ShardedModuleDatabase, _ShardPickler, _ShardUnpickler
 from ..prog import ProgDataValue
 from ..util import Object, uno
 from ..exception import PRGAInternalError, PRGAAPIError
 
 from itertools import chain
 from networkx.exception import NetworkXError
+import io, multiprocessing
 
 import logging
 _logger = logging.getLogger(__name__)
 
 __all__ = ['SwitchDelegate', 'Translation']
 
+# pass and context in the worker processes. Refer to `Translation._translate_parallel`
+_worker = None
+
+def _init_worker(pass_, context, modules, registry):
+    global _worker
+    _worker = pass_, context, modules, registry
+
+def _translate_module(job):
+    # module keys may contain modules, so modules are passed by their indices
+    i, is_top = job
+    pass_, context, modules, registry = _worker
+    existing = len(context._database)
+    pass_._process_module(modules[i], context, is_top = is_top)
+    return Translation._dump_new_modules(context, registry, tuple(context._database)[existing:])
+
 # ----------------------------------------------------------------------------
 # -- Switch Delegate ---------------------------------------------------------
 # ----------------------------------------------------------------------------
@@ -92,12 +109,20 @@ class Translation(AbstractPass):
             primitives. By default, if the design view is not defined for a primitive, an error is raised.
             If ``create_blackbox_for_undefined_primitives`` is set to ``True``, an empty design view is created in
             this case.
+        jobs (:obj:`int`): Number of worker processes. If greater than 1, modules are translated bottom-up in
+            forked worker processes, one level of hierarchy at a time, and merged back into the context. The result
+            is identical to translating with one job
+
+    This pass is incremental: when it is run again on the same context, only the modules changed since they were
+    translated (including the modules whose sub-modules are changed) are translated again. Refer to
+    `ModuleUtils.content_hash` for what is considered a change.
     """
 
-    __slots__ = ['top', 'create_blackbox_for_undefined_primitives']
-    def __init__(self, top = None, *, create_blackbox_for_undefined_primitives = False):
+    __slots__ = ['top', 'create_blackbox_for_undefined_primitives', 'jobs']
+    def __init__(self, top = None, *, create_blackbox_for_undefined_primitives = False, jobs = 1):
         self.top = top
         self.create_blackbox_for_undefined_primitives = create_blackbox_for_undefined_primitives
+        self.jobs = jobs
 
     @property
     def dependences(self):
@@ -107,6 +132,14 @@ class Translation(AbstractPass):
     def key(self):
         return "translation"
 
+    @property
+    def transient_attributes(self):
+        return ("jobs", )
+
+    @property
+    def is_incremental_pass(self):
+        return True
+
     @classmethod
     def _get_or_create_io(cls, module, iotype, position = Position(0, 0), subtile = 0):
         if module.module_class.is_io_block:
@@ -216,16 +249,22 @@ class Translation(AbstractPass):
             pass
         else:
             # abstract connections
+            pairs = []      # connections are made in bulk after all sinks are visited
             for usink in ModuleUtils._iter_nets(module):
                 if not usink.is_sink:
                     continue
                 lsink = NetUtils._dereference(design, NetUtils._reference(usink))
                 if module.coalesce_connections:
                     usrc = NetUtils.get_source(usink, return_const_if_unconnected = True)
-                    NetUtils.connect(NetUtils._dereference(design, NetUtils._reference(usrc)), lsink)
+                    pairs.append((NetUtils._dereference(design, NetUtils._reference(usrc)), lsink))
                 elif not module.allow_multisource:
                     usrc = NetUtils.get_source(usink, return_const_if_unconnected = True)
-                    NetUtils.connect([NetUtils._dereference(design, NetUtils._reference(i)) for i in usrc], lsink)
+                    if usrc.net_type in (NetType.port, NetType.pin, NetType.const):
+                        # whole-bus connection. `NetUtils.connect_bulk` pairs up the bits if either bus is broken
+                        pairs.append((NetUtils._dereference(design, NetUtils._reference(usrc)), lsink))
+                    else:
+                        pairs.extend(zip((NetUtils._dereference(design, NetUtils._reference(i)) for i in usrc),
+                            lsink))
                 else:
                     for i, bit in enumerate(usink):
                         if len(usrcs := NetUtils.get_multisource(bit)) == 0:
@@ -247,7 +286,7 @@ class Translation(AbstractPass):
                                 ):
 
                             # direct connect (no programmability)
-                            NetUtils.connect(NetUtils._dereference(design, NetUtils._reference(usrcs)), lsink[i])
+                            pairs.append((NetUtils._dereference(design, NetUtils._reference(usrcs)), lsink[i]))
                             continue
 
                         switch_model = context.switch_delegate.get_switch(len(usrcs), design)
@@ -264,7 +303,8 @@ class Translation(AbstractPass):
                         NetUtils.connect(
                                 [NetUtils._dereference(design, NetUtils._reference(usrc)) for usrc in usrcs], 
                                 switch.pins["i"])
-                        NetUtils.connect(switch.pins["o"], lsink[i])
+                        pairs.append((switch.pins["o"], lsink[i]))
+            NetUtils.connect_bulk(pairs, module = design)
 
             # design connections
             for net in ModuleUtils._iter_nets(design):
@@ -303,11 +343,136 @@ class Translation(AbstractPass):
         _logger.info(" .. Translated: {}".format(module))
         return design
 
+    @classmethod
+    def _dump_new_modules(cls, context, registry, keys):
+        """Pickle the modules newly added into the database of ``context`` in a worker process.
+
+        Args:
+            context (`Context`):
+            registry (:obj:`dict`): Registry of the objects in the modules already in the database. Refer to
+                `ShardedModuleDatabase._register` for more information. The new modules are registered as well
+            keys (:obj:`Sequence` [:obj:`tuple` [`ModuleView`, :obj:`Hashable` ]]): Database keys of the new modules,
+                in the order they are added
+
+        Returns:
+            :obj:`list` [:obj:`tuple` [:obj:`bytes`, :obj:`bytes` ]]: Pickled database keys and pickled modules.
+                Modules that are not in ``keys`` are referred to by their database keys, so each module must be
+                loaded after the modules before it
+        """
+        database = context._database
+        globals_ = {id(global_): name for name, global_ in context._globals.items()}
+        payload = []
+        for k in keys:
+            entry = []
+            for obj, local in ( (k, tuple()), ({k: database[k]}, (k, )) ):
+                with io.BytesIO() as f:
+                    _ShardPickler(f, context, registry, globals_, local, lazy_models = False).dump(obj)
+                    entry.append(f.getvalue())
+            payload.append(tuple(entry))
+            ShardedModuleDatabase._register(registry, k, database[k])
+        return payload
+
+    def _translate_level(self, context, modules, jobs, registry):
+        """Translate modules in one level of hierarchy with worker processes, and merge them into the database.
+
+        Args:
+            context (`Context`):
+            modules (:obj:`Sequence` [`Module` ]): Modules to be translated, in abstract view
+            jobs (:obj:`Sequence` [:obj:`tuple` [:obj:`int`, :obj:`bool` ]]): Indices of the modules to be
+                translated in ``modules``, and whether each module is the top-level array
+            registry (:obj:`dict`): Registry of the objects in the modules already in the database
+        """
+        database = context._database
+        with multiprocessing.get_context("fork").Pool(min(self.jobs, len(jobs)), _init_worker,
+                (self, context, modules, registry)) as pool:
+            for payload in pool.imap(_translate_module, jobs):
+                for key, module in payload:
+                    with io.BytesIO(key) as f:
+                        key = _ShardUnpickler(f, database, context = context).load()
+                    if key in database:
+                        # e.g. a switch module also created by another worker
+                        continue
+                    with io.BytesIO(module) as f:
+                        database[key] = _ShardUnpickler(f, database, context = context).load()[key]
+
+    def _translate_parallel(self, top, context):
+        """Translate the modules under ``top`` bottom-up with ``jobs`` worker processes.
+
+        Args:
+            top (`Module`): Top-level array in abstract view
+            context (`Context`):
+        """
+        database = context._database
+        if type(database) is not dict or "fork" not in multiprocessing.get_all_start_methods():
+            _logger.warning("Parallel translation is not supported for this context or platform. Use 1 job instead")
+            return
+
+        # 1. find the modules to be translated in the same order as `Translation._process_module`, and group them by
+        #    their levels in the hierarchy
+        order, levels = [], {}
+        def visit(module):
+            if (level := levels.get(module.key)) is not None:
+                return level
+            elif (ModuleView.design, module.key) in database:
+                return -1
+            levels[module.key] = level = 1 + max(
+                    (visit(instance.model) for instance in module.instances.values()), default = -1)
+            order.append(module)
+            return level
+        visit(top)
+        jobs = [[] for _ in range(max(levels.values(), default = -1) + 1)]
+        for i, module in enumerate(order):
+            jobs[levels[module.key]].append( (i, module is top) )
+
+        # 2. translate modules level by level. Worker processes are forked after the lower levels are merged, so
+        #    the translated sub-modules are shared instead of pickled
+        existing, registry = tuple(database), {}
+        for k, module in database.items():
+            ShardedModuleDatabase._register(registry, k, module)
+        for level in jobs:
+            registered = len(database)
+            if len(level) == 1:
+                for i, is_top in level:
+                    self._process_module(order[i], context, is_top = is_top)
+            else:
+                self._translate_level(context, order, level, registry)
+            for k in tuple(database)[registered:]:
+                ShardedModuleDatabase._register(registry, k, database[k])
+
+        # 3. restore the order of the modules in the database as if they were translated sequentially
+        ordered = {k: database[k] for k in existing}
+        for module in order:
+            design = database[ModuleView.design, module.key]
+            for instance in design.instances.values():
+                if database.get(k := (ModuleView.design, instance.model.key)) is instance.model:
+                    ordered.setdefault(k, instance.model)
+            ordered[ModuleView.design, module.key] = design
+        ordered.update(database)
+        database.clear()
+        database.update(ordered)
+
     def run(self, context):
         top = uno(self.top, context.top)
         if top is None:
             raise PRGAAPIError("Top-level array not set yet.")
+        # remove the design views of the modules changed since they were translated
+        digests, stamps = context._module_digests(top), context._module_stamps
+        stale = set(key for key, digest in digests.items()
+                if (stamp := stamps.get(key, {}).get(self.key)) is not None and stamp != digest)
+        if (stale and "prog.insertion" in getattr(context, "_applied_passes", ())
+                and not context.prog_entry.supports_incremental_insertion):
+            # programming circuitry is inserted into the translated modules and cannot be inserted incrementally
+            stale = set(key for key in digests if self.key in stamps.get(key, {}))
+        for key in stale:
+            del context._database[ModuleView.design, key]
+        pending = tuple(key for key in digests if (ModuleView.design, key) not in context._database)
+        _logger.info("{} modules to be translated ({} changed)".format(len(pending), len(stale)))
+        # translate modules in parallel if requested
+        if self.jobs > 1:
+            self._translate_parallel(top, context)
         # recursively process modules
         system_top = self._process_module(top, context, is_top = True)
+        for key in pending:
+            context._stamp_module(self.key, key, digests[key], reset = True)
         if top is context.top:
             context.system_top = system_top
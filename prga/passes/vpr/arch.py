@@ -6,12 +6,13 @@ from ...core.builder.array.array import ArrayBuilder
 from ...core.common import (Orientation, Position, ModuleView, IO, PrimitiveClass)
 from ...netlist import TimingArcType, NetUtils, ModuleUtils, PortDirection
 from ...xml import XMLGenerator
+from ...compress import open_output
 from ...exception import PRGAInternalError
 
 from abc import abstractproperty, abstractmethod
 from collections.abc import Sequence
 from itertools import product
-import os, gzip
+import os
 
 __all__ = ["VPRArchGeneration", "VPRScalableDelegate"]
 
@@ -25,17 +26,22 @@ class _VPRArchGeneration(AbstractPass):
 
     __slots__ = [
             # customizable variables
-            'output_file', 'fasm', # 'timing',
+            'output_file', 'fasm', 'compresslevel', # 'timing',
             # temporary variables
             'xml', 'lut_sizes', 'active_primitives', 'active_blocks', 'active_tiles',
             ]
 
-    def __init__(self, output_file, *, fasm = None):
+    def __init__(self, output_file, *, fasm = None, compresslevel = 9):
         # , timing = None):
         self.output_file = output_file
         self.fasm = fasm
+        self.compresslevel = compresslevel
         # self.timing = timing
 
+    @property
+    def transient_attributes(self):
+        return ("output_file", "xml", "lut_sizes", "active_primitives", "active_blocks", "active_tiles")
+
     @property
     def is_readonly_pass(self):
         return True
@@ -564,20 +570,17 @@ class _VPRArchGeneration(AbstractPass):
         if not hasattr(context.summary, 'vpr'):
             context.summary.vpr = {}
         # output file update to the VPR summary is done per subclass
-        if isinstance(self.output_file, str):
+        output_file = self.output_file
+        if owned := isinstance(self.output_file, str):
             f = self.output_file
             os.makedirs(os.path.dirname(f), exist_ok = True)
-            self._update_output_file(context.summary.vpr, f)
-            if f.endswith(".gz"):
-                self.output_file = gzip.open(f, "wb")
-            else:
-                self.output_file = open(f, "wb")
+            raw = open(f, "wb")
         else:
             f = self.output_file.name
             os.makedirs(os.path.dirname(f), exist_ok = True)
-            self._update_output_file(context.summary.vpr, f)
-            if f.endswith(".gz"):
-                self.output_file = gzip.open(self.output_file, "wb")
+            raw = self.output_file
+        self._update_output_file(context.summary.vpr, f)
+        self.output_file = open_output(raw, f, self.compresslevel)
         # FASM 
         if self.fasm is None:
              self.fasm = context.fasm_delegate
@@ -598,7 +601,7 @@ class _VPRArchGeneration(AbstractPass):
             self.active_primitives = set()
             self.lut_sizes = set()
         # XML generation
-        with XMLGenerator(self.output_file, True) as xml, xml.element("architecture"):
+        with XMLGenerator(self.output_file, True, fast = True) as xml, xml.element("architecture"):
             self.xml = xml
             # layout: done per subclass
             with xml.element("layout"):
@@ -685,6 +688,14 @@ class _VPRArchGeneration(AbstractPass):
                     #             ' '.join(map(str, segment.cb_pattern)))
             # clean up
             del xml
+        # close the file object created by this pass, so the output is complete when the pass returns
+        if self.output_file is not raw:
+            self.output_file.close()
+        if owned:
+            raw.close()
+        else:
+            raw.flush()
+        self.output_file = output_file
 
     # -- properties/methods to be overriden/implemented by sub-classes -------
     @abstractproperty
@@ -712,15 +723,20 @@ class VPRArchGeneration(_VPRArchGeneration):
     
     Args:
         output_file (:obj:`str` of file-like object): The output file. If the file name ends with ".gz", the output
-            file will be compressed using gzip
+            file will be compressed using gzip, with blocks compressed in parallel
 
     Keyword Args:
         fasm (`FASMDelegate`): Overwrite the deafult fasm delegate provided by the context
+        compresslevel (:obj:`int`): Compression level of gzipped output, from 0 to 9
     """
     # timing (`TimingDelegate`): Overwrite the default iming delegate provided by the context
 
     __slots__ = ['ios']
 
+    @property
+    def transient_attributes(self):
+        return super(VPRArchGeneration, self).transient_attributes + ("ios", )
+
     @property
     def key(self):
         return "vpr.arch"
@@ -796,11 +812,12 @@ class VPRScalableArchGeneration(_VPRArchGeneration):
     
     Args:
         output_file (:obj:`str` of file-like object): The output file. If the file name ends with ".gz", the output
-            file will be compressed using gzip
+            file will be compressed using gzip, with blocks compressed in parallel
         delegate (`VPRScalableDelegate`):
 
     Keyword Args:
         fasm (`FASMDelegate`): Overwrite the deafult fasm delegate provided by the context
+        compresslevel (:obj:`int`): Compression level of gzipped output, from 0 to 9
 
     **WARNING**: The routing graph generated by VPR during FPGA sizing and routing channel fitting is almost
     always different than the one generated by PRGA. Use the scalable architecture description only for
@@ -810,8 +827,9 @@ class VPRScalableArchGeneration(_VPRArchGeneration):
     # timing (`TimingDelegate`): Overwrite the default iming delegate provided by the context
 
     __slots__ = ['delegate', 'update_summary']
-    def __init__(self, output_file, delegate, *, update_summary = False, timing = None):
-        super(VPRScalableArchGeneration, self).__init__(output_file, fasm = FASMDelegate(), timing = timing)
+    def __init__(self, output_file, delegate, *, update_summary = False, timing = None, compresslevel = 9):
+        super(VPRScalableArchGeneration, self).__init__(output_file, fasm = FASMDelegate(), timing = timing,
+                compresslevel = compresslevel)
         self.delegate = delegate
         self.update_summary = update_summary
 
@@ -3,19 +3,110 @@
 from ..base import AbstractPass
 from ...core.builder.array.array import ArrayBuilder
 from ...core.common import (Orientation, ModuleView, Position)
-from ...util import uno
-from ...netlist import NetType, NetUtils, ModuleUtils
+from ...util import Object, uno
+from ...netlist import NetType, NetUtils, ModuleUtils, HierarchicalInstance
 from ...xml import XMLGenerator
+from ...compress import ParallelGzipWriter
+from ...exception import PRGAAPIError
 
 import logging
 _logger = logging.getLogger(__name__)
 
-import time, os, gzip
+import time, os, shutil, multiprocessing
 from itertools import product
+from tempfile import TemporaryDirectory
 import networkx as nx 
 
 __all__ = ["VPR_RRG_Generation"]
 
+# pass, context and options in the worker processes. Refer to `VPR_RRG_Generation._generate_parallel`
+_worker = None
+
+def _init_worker(pass_, context, directory, compress):
+    global _worker
+    _worker = pass_, context, directory, compress
+    # progress is reported by the parent process
+    _logger.setLevel(logging.WARNING)
+
+def _generate_band(job):
+    tag, band = job
+    pass_, context, directory, compress = _worker
+    path = os.path.join(directory, "{}.{}".format(tag, band))
+    # each worker is a process of its own, so fragments are compressed in one thread
+    with open(path, "wb") as raw, (ParallelGzipWriter(raw, compresslevel = pass_.compresslevel, threads = 1)
+            if compress else raw) as f:
+        with XMLGenerator(f, True, fast = True, depth = 2) as xml:
+            pass_.xml = xml
+            pass_.num_nodes = pass_.num_edges = 0
+            if tag == "rr_nodes":
+                pass_._nodes(pass_.bands[band])
+                return path, pass_.num_nodes, 0
+            else:
+                replicated = pass_._edges(context, pass_.bands[band])
+                return path, pass_.num_edges, replicated
+
+# ----------------------------------------------------------------------------
+# -- Spliced Output Stream ---------------------------------------------------
+# ----------------------------------------------------------------------------
+class _SplicedStream(Object):
+    """Output stream that fragments generated by worker processes are spliced into.
+
+    Args:
+        raw (file-like object): The output file
+        compress (:obj:`bool`): If set, the output is a multi-member gzip stream. Data written into this stream is
+            compressed into a new member after each fragment, and the fragments are gzip members themselves
+        compresslevel (:obj:`int`): Compression level
+    """
+
+    __slots__ = ['raw', 'compress', 'compresslevel', 'member']
+    def __init__(self, raw, compress, compresslevel = 9):
+        self.raw = raw
+        self.compress = compress
+        self.compresslevel = compresslevel
+        self.member = None
+
+    def write(self, data):
+        if not self.compress:
+            return self.raw.write(data)
+        elif self.member is None:
+            self.member = ParallelGzipWriter(self.raw, compresslevel = self.compresslevel)
+        return self.member.write(data)
+
+    def close(self):
+        """End the current gzip member. The output file is not closed."""
+        if self.member is not None:
+            self.member.close()
+            self.member = None
+
+    def splice(self, path):
+        """Copy the fragment in file ``path`` into the output file."""
+        self.close()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.raw)
+
+# ----------------------------------------------------------------------------
+# -- Edge Template -----------------------------------------------------------
+# ----------------------------------------------------------------------------
+class _EdgeTemplate(Object):
+    """Edges driving one bit of a sink node, recorded together with everything their computation depends on.
+
+    Args:
+        anchor (`Position`): Position of the tile or switch box that the sink node belongs to
+
+    A template is replicated for the same sink in another tile or switch box by shifting all recorded nodes by the
+    offset between the two positions. It applies only if the shifted top-level instances have the same models, the
+    shifted tracks span the same channels, and the first predecessor of each shifted node in the coarse-grained
+    connection graph is the shifted predecessor.
+    """
+
+    __slots__ = ['anchor', 'instances', 'tracks', 'lookups', 'edges']
+    def __init__(self, anchor):
+        self.anchor = anchor
+        self.instances = None       # sequence of (top-level instance key, model)
+        self.tracks = {}            # track node -> (orientation, lower position, higher position)
+        self.lookups = []           # sequence of (node, first predecessor or None)
+        self.edges = []             # sequence of (head node, head index, switches)
+
 # ----------------------------------------------------------------------------
 # -- VPR rrg.xml Generation --------------------------------------------------
 # ----------------------------------------------------------------------------
@@ -24,25 +115,51 @@ class VPR_RRG_Generation(AbstractPass):
     
     Args:
         output_file (:obj:`str` of file-like object): The output file. If the file name ends with ".gz", the output
-            file will be compressed using gzip
+            file will be compressed using gzip, with blocks compressed in parallel. If the file name ends with
+            ".bin", the routing resource graph is written in VPR's binary format instead of XML. VPR only reads
+            binary routing resource graphs from files named "*.bin", so binary output cannot be gzipped
 
     Keyword Args:
         fasm (`FASMDelegate`): Overwrite the deafult fasm delegate provided by the context
+        edge_templates (:obj:`bool`): If set (default), the edges driving each sink node in a tile or switch box are
+            recorded as a template, and replicated for the same sink node in other tiles or switch boxes with the
+            same models and neighborhood. Edges are computed in full only for the first occurrence of each pattern
+            and for irregular positions, e.g. the edges of the fabric, tiles that disallow segments passing through,
+            and hierarchical sub-arrays. The output is the same either way
+        jobs (:obj:`int`): Number of worker processes. If greater than 1, the grid is partitioned into column bands
+            with similar numbers of nodes. The nodes and edges of each band are generated in forked worker
+            processes into temporary files, which are concatenated in order into the output file. Gzipped
+            output becomes a multi-member gzip stream, with each band compressed by its worker. The output
+            contains the same nodes and edges as with one job, grouped by band. Not supported for the binary
+            format
+        compresslevel (:obj:`int`): Compression level of gzipped output, from 0 to 9
     """
 
     # timing (`TimingDelegate`): Overwrite the default iming delegate provided by the context
 
-    __slots__ = ['output_file', 'fasm', # 'timing',                       # customizable variables
+    __slots__ = [
+            # customizable variables:
+            'output_file', 'fasm', 'edge_templates', 'jobs', 'compresslevel', # 'timing',
             # temporary variables:
             'xml', 'tile2id', 'tilepin2ptc', 'switch2id', 'sgmt2id', 'sgmt2ptc',
             'chanx', 'chany', 'conn_graph', 'num_nodes', 'num_edges',
+            'tracks', 'instances', 'templates', 'trace', 'margin', 'bands',
             ]
-    def __init__(self, output_file, *, fasm = None):
+    def __init__(self, output_file, *, fasm = None, edge_templates = True, jobs = 1, compresslevel = 9):
         # , timing = None):
         self.output_file = output_file
         self.fasm = fasm
+        self.edge_templates = edge_templates
+        self.jobs = jobs
+        self.compresslevel = compresslevel
         # self.timing = timing
 
+    @property
+    def transient_attributes(self):
+        return ("output_file", "jobs", "xml", "tile2id", "tilepin2ptc", "switch2id", "sgmt2id", "sgmt2ptc",
+                "chanx", "chany", "conn_graph", "num_nodes", "num_edges",
+                "tracks", "instances", "templates", "trace", "margin", "bands")
+
     @property
     def key(self):
         return "vpr.rrg"
@@ -67,6 +184,8 @@ class VPR_RRG_Generation(AbstractPass):
             higher_position (`Position`): The higher position of starting/ending channel
             ptc_position (:obj:`int`): Used to calculate the PTC for VPR
         """
+        if (analysis := self.tracks.get(node)) is not None:
+            return analysis
         segment, ori = node[0].prototype, node[0].orientation
         sbox_position, corner = node[1]
         sbox_position = sum(node[2:], sbox_position)
@@ -89,7 +208,8 @@ class VPR_RRG_Generation(AbstractPass):
                     low = pos
                 else:
                     break
-        return ori, low, high, virtual_start[dim] - dir_.case(1, segment.length)
+        analysis = self.tracks[node] = ori, low, high, virtual_start[dim] - dir_.case(1, segment.length)
+        return analysis
 
     def _analyze_blockpin(self, pin):
         """Analyze a block pin node.
@@ -166,7 +286,10 @@ class VPR_RRG_Generation(AbstractPass):
                 coalesce_connections = True,
                 blackbox_instance = lambda i: i.model.module_class.is_block or i.model.module_class.is_routing_box,
                 node_key = node_key,
-                node_attrs = node_attrs
+                node_attrs = node_attrs,
+                backend = "indexed",
+                store_paths = False,
+                summaries = {},
                 )
         t = time.time() - t
         _logger.info(" .. Completed constructing coarse-grained routing graph for VPR RRG generation")
@@ -274,18 +397,27 @@ class VPR_RRG_Generation(AbstractPass):
         if self.num_edges % 1000 == 0:
             _logger.info("   .. {:0>6d}K edges generated".format(self.num_edges // 1000))
 
-    def _edge_box_output(self, head_pin_bit, tail_pin_bit, tail_pkg, fasm_features = tuple(), delay = 0.0):
+    def _fasm_features(self, switches):
+        return tuple(feature for src, sink, hierarchy in switches
+                for feature in self.fasm.fasm_features_for_interblock_switch(src, sink, hierarchy))
+
+    def _routing_edge(self, head_node, head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, switches):
+        if self.trace is not None:
+            self.trace.edges.append( (head_node, head_idx, switches) )
+        self._edge(self.conn_graph.nodes[head_node]["id"] + head_idx, tail_id, head_pin_bit, tail_pin_bit,
+                delay, self._fasm_features(switches))
+
+    def _edge_box_output(self, head_pin_bit, tail_pin_bit, tail_pkg, switches = tuple(), delay = 0.0):
         sink, index, hierarchy = ModuleUtils._analyze_sink(head_pin_bit)
         if index is not None:
             sink = sink[index]
         for src in NetUtils.get_multisource(sink):
-            this_fasm = fasm_features + self.fasm.fasm_features_for_interblock_switch(src, sink, hierarchy)
             # FIXME: timing
             # this_delay = delay + self.timing.vpr_delay_of_routing_switch(src_port_bit, sink_port_bit)
             self._edge_box_input(ModuleUtils._attach_hierarchy(src, hierarchy), tail_pin_bit, tail_pkg,
-                    this_fasm, delay)
+                    switches + ((src, sink, hierarchy), ), delay)
 
-    def _edge_box_input(self, head_pin_bit, tail_pin_bit, tail_pkg, fasm_features = tuple(), delay = 0.0):
+    def _edge_box_input(self, head_pin_bit, tail_pin_bit, tail_pkg, switches = tuple(), delay = 0.0):
         head_idx, head_node, parent = None, None, None
 
         if head_pin_bit.net_type in (NetType.slice_, NetType.bit):
@@ -301,14 +433,18 @@ class VPR_RRG_Generation(AbstractPass):
             predit = self.conn_graph.predecessors(head_node)
             pred_node = next(predit)
         except (nx.NetworkXError, StopIteration):
+            pred_node = None
+        if self.trace is not None:
+            self.trace.lookups.append( (head_node, pred_node) )
+        if pred_node is None:
             return
 
         head_pin_bus = NetUtils._dereference(parent, pred_node)
         head_pin_bit = head_pin_bus[head_idx]
 
         pred_data = self.conn_graph.nodes[pred_node]
-        if (id_ := pred_data.get("id")) is None:
-            self._edge_box_output(head_pin_bit, tail_pin_bit, tail_pkg, fasm_features, delay)
+        if pred_data.get("id") is None:
+            self._edge_box_output(head_pin_bit, tail_pin_bit, tail_pkg, switches, delay)
             return
 
         if tail_pkg[0] in ("CHANX", "CHANY"):                     # ??? -> track
@@ -316,38 +452,317 @@ class VPR_RRG_Generation(AbstractPass):
             tail_start = tail_ori.direction.case(tail_lower, tail_higher)
             if pred_data["type"] in ("CHANX", "CHANY"):             # track -> track
                 head_ori, head_lower, head_higher, _ = self._analyze_track(pred_node)
+                if self.trace is not None:
+                    self.trace.tracks[pred_node] = head_ori, head_lower, head_higher
                 if head_ori is tail_ori:                            # straight connection
                     dim, dir_ = tail_ori.decompose()
                     if (head_lower[dim.perpendicular] == tail_start[dim.perpendicular] and
                             head_lower[dim] <= tail_start[dim] + dir_.case(-1, 1) <= head_higher[dim]):
-                        self._edge(id_ + head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, fasm_features)
+                        self._routing_edge(pred_node, head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, switches)
                         return
                 elif head_ori is not tail_ori.opposite:             # not a U-turn
                     from_dim, from_dir = head_ori.decompose()
                     to_dim, to_dir = tail_ori.decompose()
                     if (head_lower[to_dim] + to_dir.case(1, 0) == tail_start[to_dim] and
                             head_lower[from_dim] <= tail_start[from_dim] + from_dir.case(0, 1) <= head_higher[from_dim]):
-                        self._edge(id_ + head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, fasm_features)
+                        self._routing_edge(pred_node, head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, switches)
                         return
             else:                                                   # block pin -> track
                 head_chan, head_ori, _ = self._analyze_blockpin(head_pin_bus)
                 dim = head_ori.dimension.perpendicular
                 if dim is tail_ori.dimension and head_chan == tail_start:
-                    self._edge(id_ + head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, fasm_features)
+                    self._routing_edge(pred_node, head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, switches)
                     return
         else:                                                       # ??? -> block pin
             tail_id, tail_chan, dim = tail_pkg[1:]
             if pred_data["type"] in ("CHANX", "CHANY"):             # track -> block pin
                 head_ori, head_lower, head_higher, _ = self._analyze_track(pred_node)
+                if self.trace is not None:
+                    self.trace.tracks[pred_node] = head_ori, head_lower, head_higher
                 if (dim is head_ori.dimension and head_lower[dim] <= tail_chan[dim] <= head_higher[dim]
                         and tail_chan[dim.perpendicular] == head_lower[dim.perpendicular]):
-                    self._edge(id_ + head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, fasm_features)
+                    self._routing_edge(pred_node, head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, switches)
                     return
             else:                                                   # block pin -> block pin
-                self._edge(id_ + head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, fasm_features)
+                self._routing_edge(pred_node, head_idx, tail_id, head_pin_bit, tail_pin_bit, delay, switches)
                 return
         _logger.debug("Physical connection {} -> {} ignored due to reachability".format(head_pin_bit, tail_pin_bit))
 
+    @classmethod
+    def _shift_key(cls, key, offset):
+        if isinstance(key, Position):
+            return key + offset
+        else:
+            return key[0] + offset, key[1]
+
+    @classmethod
+    def _shift(cls, node, offset):
+        """Shift the top-level instance in ``node`` by ``offset``."""
+        return node[:-1] + (cls._shift_key(node[-1], offset), )
+
+    def _shift_hierarchy(self, hierarchy, offset):
+        if hierarchy is None:
+            return None
+        instance = self.instances[self._shift_key(hierarchy.hierarchy[-1].key, offset)]
+        if len(hierarchy.hierarchy) == 1:
+            return instance
+        else:
+            return HierarchicalInstance(hierarchy.hierarchy[:-1] + (instance, ))
+
+    def _finalize_template(self, template, sink_node):
+        """Collect the top-level instances that ``template`` depends on.
+
+        Args:
+            template (`_EdgeTemplate`):
+            sink_node (:obj:`Sequence` [:obj:`Hashable` ]): The sink node that ``template`` is recorded for
+
+        Returns:
+            :obj:`bool`: ``False`` if ``template`` depends on instances other than tiles and switch boxes, in which
+                case it cannot be replicated
+        """
+        keys = {sink_node[-1]}
+        for node, pred in template.lookups:
+            keys.add(node[-1])
+            if pred is not None:
+                keys.add(pred[-1])
+        for _, _, switches in template.edges:
+            keys.update(hierarchy.hierarchy[-1].key for _, _, hierarchy in switches if hierarchy is not None)
+        instances = []
+        for key in keys:
+            if (instance := self.instances.get(key)) is None:
+                return False
+            instances.append( (key, instance.model) )
+        template.instances = tuple(instances)
+        return True
+
+    def _replicate_template(self, template, anchor, tail_id):
+        """Emit the edges in ``template`` for the same sink node in the tile or switch box at ``anchor``.
+
+        Args:
+            template (`_EdgeTemplate`):
+            anchor (`Position`): Position of the tile or switch box
+            tail_id (:obj:`int`): ID of the sink node bit
+
+        Returns:
+            :obj:`bool`: ``False`` if ``template`` does not apply at ``anchor``
+        """
+        offset = anchor - template.anchor
+        for key, model in template.instances:
+            if (instance := self.instances.get(self._shift_key(key, offset))) is None or instance.model is not model:
+                return False
+        for node, pred in template.lookups:
+            try:
+                shifted = next(self.conn_graph.predecessors(self._shift(node, offset)))
+            except (nx.NetworkXError, StopIteration):
+                shifted = None
+            if shifted != (None if pred is None else self._shift(pred, offset)):
+                return False
+        for node, (ori, lower, higher) in template.tracks.items():
+            shifted_ori, shifted_lower, shifted_higher, _ = self._analyze_track(self._shift(node, offset))
+            if shifted_ori is not ori or shifted_lower != lower + offset or shifted_higher != higher + offset:
+                return False
+        for head_node, head_idx, switches in template.edges:
+            self._edge(self.conn_graph.nodes[self._shift(head_node, offset)]["id"] + head_idx, tail_id,
+                    fasm_features = self._fasm_features(tuple( (src, sink, self._shift_hierarchy(hierarchy, offset))
+                        for src, sink, hierarchy in switches )))
+        return True
+
+    def _edge_sink(self, sink_node, index, sink_pin_bit, tail_pkg):
+        """Emit the edges driving bit ``index`` of ``sink_node``.
+
+        Args:
+            sink_node (:obj:`Sequence` [:obj:`Hashable` ]): A track node or an IPIN node
+            index (:obj:`int`): Index of the bit in ``sink_node``
+            sink_pin_bit (`AbstractNet`): The bit
+            tail_pkg (:obj:`tuple`): Information about the bit. Refer to `VPR_RRG_Generation._edge_box_input` for
+                more information
+
+        Returns:
+            :obj:`bool`: ``True`` if the edges are replicated from a template
+        """
+        analyze = self._edge_box_output if tail_pkg[0] in ("CHANX", "CHANY") else self._edge_box_input
+        if self.templates is None or sink_node[-1] not in self.instances:
+            analyze(sink_pin_bit, sink_pin_bit, tail_pkg)
+            return False
+        anchor = sink_node[-1] if isinstance(sink_node[-1], Position) else sink_node[-1][0]
+        # positions close to the edges of the fabric see different channels and neighbors. Keep their templates
+        # apart from the others, so the first template tried usually applies
+        (x, y), width, height = anchor, len(self.chanx), len(self.chanx[0])
+        boundary = (min(x, self.margin), min(y, self.margin),
+                min(width - 1 - x, self.margin), min(height - 1 - y, self.margin))
+        templates = self.templates.setdefault( (self._shift(sink_node, -anchor), index, boundary), [] )
+        for i, template in enumerate(templates):
+            if self._replicate_template(template, anchor, tail_pkg[1]):
+                # keep the most recently used template first. Most sink nodes are in the regular part of the fabric
+                if i > 0:
+                    templates.insert(0, templates.pop(i))
+                return True
+        self.trace = _EdgeTemplate(anchor)
+        if tail_pkg[0] in ("CHANX", "CHANY"):
+            self.trace.tracks[sink_node] = tail_pkg[4], tail_pkg[2], tail_pkg[3]
+        analyze(sink_pin_bit, sink_pin_bit, tail_pkg)
+        template, self.trace = self.trace, None
+        # irregular sink nodes may have many different neighborhoods. Don't keep too many templates for them
+        if len(templates) < 16 and self._finalize_template(template, sink_node):
+            templates.append(template)
+        return False
+
+    def _nodes(self, nodes):
+        """Generate the RRG nodes for the given nodes in the connection graph.
+
+        Args:
+            nodes (:obj:`Iterable` [:obj:`tuple` [:obj:`Hashable`, :obj:`Mapping` ]]): Nodes in the connection graph
+                and their attributes
+        """
+        for node, data in nodes:
+            if "id" not in data:
+                continue
+            elif data["type"] in ("CHANX", "CHANY"):    # track
+                ori, lower, higher, ptc_pos = self._analyze_track(node)
+                segment = node[0].prototype
+                ptc = self.sgmt2ptc[segment.name] + ori.direction.case(0, 1)
+                for i in range(segment.width):
+                    self._node(data["type"],
+                            data["id"] + i, 
+                            ptc + 2 * (ptc_pos % segment.length) * segment.width + i * 2,
+                            lower.x,
+                            lower.y,
+                            track_dir = ori.direction,
+                            xhigh = higher.x,
+                            yhigh = higher.y,
+                            # segment = self.timing.vpr_segment(segment),
+                            segment = segment,
+                            )
+            else:                                       # block pin
+                pin = data["net"]
+                _, ori, pos = self._analyze_blockpin(pin)
+                blkinst = pin.instance.hierarchy[0]
+                tilepin2ptc = self.tilepin2ptc[blkinst.parent.key]
+                srcsink_ptc, equivalent, iopin_ptc = tilepin2ptc[blkinst.key][pin.model.key]
+                # SOURCE/SINK node
+                if equivalent:
+                    self._node(pin.model.direction.case("SINK", "SOURCE"),
+                            data["srcsink_id"],
+                            srcsink_ptc,
+                            pos.x,
+                            pos.y,
+                            capacity = len(pin),
+                            xhigh = pos.x + blkinst.model.width - 1,
+                            yhigh = pos.y + blkinst.model.height - 1)
+                else:
+                    for i in range(len(pin)):
+                        self._node(pin.model.direction.case("SINK", "SOURCE"),
+                                data["srcsink_id"] + i,
+                                srcsink_ptc + i,
+                                pos.x,
+                                pos.y,
+                                capacity = 1,
+                                xhigh = pos.x + blkinst.model.width - 1,
+                                yhigh = pos.y + blkinst.model.height - 1)
+                # IPIN/OPIN node
+                for i in range(len(pin)):
+                    self._node(pin.model.direction.case("IPIN", "OPIN"),
+                            data["id"] + i,
+                            iopin_ptc + i,
+                            pos.x + pin.model.position.x,
+                            pos.y + pin.model.position.y,
+                            port_ori = ori)
+
+    def _edges(self, context, nodes):
+        """Generate the RRG edges driving the given nodes in the connection graph.
+
+        Args:
+            context (`Context`):
+            nodes (:obj:`Iterable` [:obj:`tuple` [:obj:`Hashable`, :obj:`Mapping` ]]): Nodes in the connection graph
+                and their attributes
+
+        Returns:
+            :obj:`int`: Number of sink node bits whose edges are replicated from templates
+        """
+        replicated = 0
+        for sink_node, sink_data in nodes:
+            if (type_ := sink_data.get("type")) is None:
+                continue
+            elif type_ in ("CHANX", "CHANY"):
+                # 1. get the pin
+                sink_pin = sink_data["net"]
+                # 2. prepare the tail package
+                ori, lower, higher, _ = self._analyze_track(sink_node)
+                # 3. emit edges
+                for i, sink_pin_bit in enumerate(sink_pin):
+                    replicated += self._edge_sink(sink_node, i, sink_pin_bit,
+                            # tail_type, tail_id,             lower_pos, higher_pos, orientation
+                            (type_,      sink_data["id"] + i, lower,     higher,     ori))
+            elif type_ == "IPIN":
+                # 1. get the pin
+                sink_pin = NetUtils._dereference(context.top, sink_node)
+                # 2. prepare the tail package
+                chan, ori, _ = self._analyze_blockpin(sink_pin)
+                iopin_id = sink_data["id"]
+                srcsink_id = sink_data["srcsink_id"]
+                equivalent = sink_data.get("equivalent", False)
+                # 3. emit edges
+                for i, sink_pin_bit in enumerate(sink_pin):
+                    # 3.1 IPIN -> SINK
+                    self._edge(iopin_id + i, srcsink_id + (0 if equivalent else i), switch_id = 0)
+                    # 3.2 ??? -> IPIN
+                    replicated += self._edge_sink(sink_node, i, sink_pin_bit,
+                            # tail_type, tail_id,      chan_pos, dimension
+                            (type_,      iopin_id + i, chan,     ori.dimension.perpendicular))
+            elif type_ == "OPIN":
+                # 1. get the pin
+                sink_pin = NetUtils._dereference(context.top, sink_node)
+                # 2. emit SOURCE -> OPIN edges
+                iopin_id = sink_data["id"]
+                srcsink_id = sink_data["srcsink_id"]
+                equivalent = sink_data.get("equivalent", False)
+                for i in range(len(sink_pin)):
+                    self._edge(srcsink_id + (0 if equivalent else i), iopin_id + i, switch_id = 0)
+        return replicated
+
+    def _partition(self, jobs):
+        """Partition the nodes in the connection graph into column bands with similar numbers of nodes.
+
+        Args:
+            jobs (:obj:`int`): Number of worker processes. A few bands are created per worker for load balancing
+        """
+        columns = [[] for _ in self.chanx]
+        for node, data in self.conn_graph.nodes(data = True):
+            if "type" in data:
+                # nodes are grouped by the top-level tile, switch box or sub-array they belong to
+                key = node[-1]
+                columns[(key if isinstance(key, Position) else key[0]).x].append( (node, data) )
+        total = sum(len(column) for column in columns)
+        count = min(len(columns), 4 * jobs)
+        self.bands = [[]]
+        for column in columns:
+            if len(self.bands) < count and len(self.bands[-1]) * count >= total:
+                self.bands.append( [] )
+            self.bands[-1].extend(column)
+
+    def _generate_parallel(self, context, tag):
+        """Generate the nodes or edges of each band in worker processes, and splice them into the output file.
+
+        Args:
+            context (`Context`):
+            tag (:obj:`str`): "rr_nodes" or "rr_edges"
+
+        Returns:
+            :obj:`int`: Number of nodes or edges generated
+            :obj:`int`: Number of sink node bits whose edges are replicated from templates
+        """
+        self.xml.flush()
+        generated = replicated = 0
+        with TemporaryDirectory() as d, multiprocessing.get_context("fork").Pool(min(self.jobs, len(self.bands)),
+                _init_worker, (self, context, d, self.output_file.compress)) as pool:
+            for path, g, r in pool.imap(_generate_band, ((tag, i) for i in range(len(self.bands)))):
+                self.output_file.splice(path)
+                os.remove(path)
+                generated += g
+                replicated += r
+                _logger.info("   .. {:0>8.1f}K {} generated".format(generated / 1000, tag[3:]))
+        return generated, replicated
+
     def run(self, context):
         # runtime-generated data
         self.tile2id = {}
@@ -360,23 +775,37 @@ class VPR_RRG_Generation(AbstractPass):
             for y in range(context.top.height)] for x in range(context.top.width)]
         self.chany = [[(0 <= x < context.top.width - 1 and 0 < y < context.top.height - 1)
             for y in range(context.top.height)] for x in range(context.top.width)]
+        self.tracks = {}
+        # tiles and switch boxes that edge templates can be recorded for and replicated in
+        self.instances = {key: instance for key, instance in context.top.instances.items()
+                if instance.model.module_class.is_tile or instance.model.module_class.is_switch_box}
+        self.templates = {} if self.edge_templates else None
+        self.trace = None
         channel_width = context.summary.vpr["channel_width"] = 2 * sum(sgmt.width * sgmt.length
                 for sgmt in context.segments.values())
+        self.margin = max(iter(sgmt.length for sgmt in context.segments.values()), default = 0) + 2
         # update VPR summary
-        if isinstance(self.output_file, str):
-            f = self.output_file
-            os.makedirs(os.path.dirname(f), exist_ok = True)
-            context.summary.vpr["rrg"] = f
-            if f.endswith(".gz"):
-                self.output_file = gzip.open(f, "wb")
-            else:
-                self.output_file = open(f, "wb")
+        output_file = self.output_file
+        f = output_file if (owned := isinstance(output_file, str)) else output_file.name
+        compress = f.endswith(".gz")
+        if (binary := f[:-3 if compress else None].endswith(".bin")) and compress:
+            raise PRGAAPIError("Binary routing resource graph cannot be gzipped: {}. VPR only reads binary routing "
+                    "resource graphs from files named \"*.bin\"".format(f))
+        os.makedirs(os.path.dirname(f), exist_ok = True)
+        raw = open(f, "wb") if owned else output_file
+        context.summary.vpr["rrg"] = f
+        # parallel generation
+        if (jobs := self.jobs) > 1 and (binary or "fork" not in multiprocessing.get_all_start_methods()
+                or multiprocessing.current_process().daemon):
+            _logger.warning("Parallel RRG generation is not supported for binary output, on this platform, or in "
+                    "a worker process. Use 1 job instead")
+            jobs = 1
+        if jobs > 1:
+            self.output_file = _SplicedStream(raw, compress, self.compresslevel)
+        elif compress:
+            self.output_file = ParallelGzipWriter(raw, compresslevel = self.compresslevel)
         else:
-            f = self.output_file.name
-            os.makedirs(os.path.dirname(f), exist_ok = True)
-            context.summary.vpr["rrg"] = f
-            if f.endswith(".gz"):
-                self.output_file = gzip.open(self.output_file, "wb")
+            self.output_file = raw
         # FASM 
         if self.fasm is None:
             self.fasm = context.fasm_delegate
@@ -386,7 +815,12 @@ class VPR_RRG_Generation(AbstractPass):
         #     self.timing = TimingDelegate()  # fake timing
         # self.timing.reset()
         # routing resource graph generation
-        with XMLGenerator(self.output_file, True) as xml, xml.element("rr_graph"):
+        if binary:
+            from .rrgbin import RRGBinaryWriter
+            generator = RRGBinaryWriter(self.output_file)
+        else:
+            generator = XMLGenerator(self.output_file, True, fast = True)
+        with generator as xml, xml.element("rr_graph"):
             self.xml = xml
             _logger.info(" .. Start RRG meta-data generation")
             t = time.time()
@@ -444,64 +878,17 @@ class VPR_RRG_Generation(AbstractPass):
             with xml.element("grid"):
                 self._grid(context.top)
                 self._construct_conn_graph(context.top)
+                if jobs > 1:
+                    self._partition(jobs)
             # nodes
             with xml.element("rr_nodes"):
                 _logger.info(" .. Start RRG node generation")
                 t = time.time()
                 self.num_nodes = 0
-                for node, data in self.conn_graph.nodes(data = True):
-                    if "id" not in data:
-                        continue
-                    elif data["type"] in ("CHANX", "CHANY"):    # track
-                        ori, lower, higher, ptc_pos = self._analyze_track(node)
-                        segment = node[0].prototype
-                        ptc = self.sgmt2ptc[segment.name] + ori.direction.case(0, 1)
-                        for i in range(segment.width):
-                            self._node(data["type"],
-                                    data["id"] + i, 
-                                    ptc + 2 * (ptc_pos % segment.length) * segment.width + i * 2,
-                                    lower.x,
-                                    lower.y,
-                                    track_dir = ori.direction,
-                                    xhigh = higher.x,
-                                    yhigh = higher.y,
-                                    # segment = self.timing.vpr_segment(segment),
-                                    segment = segment,
-                                    )
-                    else:                                       # block pin
-                        pin = data["net"]
-                        _, ori, pos = self._analyze_blockpin(pin)
-                        blkinst = pin.instance.hierarchy[0]
-                        tilepin2ptc = self.tilepin2ptc[blkinst.parent.key]
-                        srcsink_ptc, equivalent, iopin_ptc = tilepin2ptc[blkinst.key][pin.model.key]
-                        # SOURCE/SINK node
-                        if equivalent:
-                            self._node(pin.model.direction.case("SINK", "SOURCE"),
-                                    data["srcsink_id"],
-                                    srcsink_ptc,
-                                    pos.x,
-                                    pos.y,
-                                    capacity = len(pin),
-                                    xhigh = pos.x + blkinst.model.width - 1,
-                                    yhigh = pos.y + blkinst.model.height - 1)
-                        else:
-                            for i in range(len(pin)):
-                                self._node(pin.model.direction.case("SINK", "SOURCE"),
-                                        data["srcsink_id"] + i,
-                                        srcsink_ptc + i,
-                                        pos.x,
-                                        pos.y,
-                                        capacity = 1,
-                                        xhigh = pos.x + blkinst.model.width - 1,
-                                        yhigh = pos.y + blkinst.model.height - 1)
-                        # IPIN/OPIN node
-                        for i in range(len(pin)):
-                            self._node(pin.model.direction.case("IPIN", "OPIN"),
-                                    data["id"] + i,
-                                    iopin_ptc + i,
-                                    pos.x + pin.model.position.x,
-                                    pos.y + pin.model.position.y,
-                                    port_ori = ori)
+                if jobs > 1:
+                    self.num_nodes, _ = self._generate_parallel(context, "rr_nodes")
+                else:
+                    self._nodes(self.conn_graph.nodes(data = True))
                 _logger.info(" .. Completed RRG node generation")
                 t = time.time() - t
                 _logger.info("   .. RRG node generation took %f seconds", t)
@@ -511,46 +898,29 @@ class VPR_RRG_Generation(AbstractPass):
                 _logger.info(" .. Start RRG edge generation")
                 t = time.time()
                 self.num_edges = 0
-                for sink_node, sink_data in self.conn_graph.nodes(data = True):
-                    if (type_ := sink_data.get("type")) is None:
-                        continue
-                    elif type_ in ("CHANX", "CHANY"):
-                        # 1. get the pin
-                        sink_pin = sink_data["net"]
-                        # 2. prepare the tail package
-                        ori, lower, higher, _ = self._analyze_track(sink_node)
-                        # 3. emit edges
-                        for i, sink_pin_bit in enumerate(sink_pin):
-                            self._edge_box_output(sink_pin_bit, sink_pin_bit,
-                                    # tail_type, tail_id,             lower_pos, higher_pos, orientation
-                                    (type_,      sink_data["id"] + i, lower,     higher,     ori))
-                    elif type_ == "IPIN":
-                        # 1. get the pin
-                        sink_pin = NetUtils._dereference(context.top, sink_node)
-                        # 2. prepare the tail package
-                        chan, ori, _ = self._analyze_blockpin(sink_pin)
-                        iopin_id = sink_data["id"]
-                        srcsink_id = sink_data["srcsink_id"]
-                        equivalent = sink_data.get("equivalent", False)
-                        # 3. emit edges
-                        for i, sink_pin_bit in enumerate(sink_pin):
-                            # 3.1 IPIN -> SINK
-                            self._edge(iopin_id + i, srcsink_id + (0 if equivalent else i), switch_id = 0)
-                            # 3.2 ??? -> IPIN
-                            self._edge_box_input(sink_pin_bit, sink_pin_bit,
-                                    # tail_type, tail_id,      chan_pos, dimension
-                                    (type_,      iopin_id + i, chan,     ori.dimension.perpendicular))
-                    elif type_ == "OPIN":
-                        # 1. get the pin
-                        sink_pin = NetUtils._dereference(context.top, sink_node)
-                        # 2. emit SOURCE -> OPIN edges
-                        iopin_id = sink_data["id"]
-                        srcsink_id = sink_data["srcsink_id"]
-                        equivalent = sink_data.get("equivalent", False)
-                        for i in range(len(sink_pin)):
-                            self._edge(srcsink_id + (0 if equivalent else i), iopin_id + i, switch_id = 0)
+                if jobs > 1:
+                    self.num_edges, replicated = self._generate_parallel(context, "rr_edges")
+                else:
+                    replicated = self._edges(context, self.conn_graph.nodes(data = True))
                 _logger.info(" .. Completed RRG edge generation")
                 t = time.time() - t
                 _logger.info("   .. RRG edge generation took %f seconds", t)
                 _logger.info("   .. {:0>8.1f}K edges generated".format(self.num_edges / 1000))
+                if self.templates is not None and jobs > 1:
+                    # templates are recorded in the worker processes
+                    _logger.info("   .. Edges of {} sink node bits replicated from templates".format(replicated))
+                elif self.templates is not None:
+                    _logger.info("   .. Edges of {} sink node bits replicated from {} templates".format(replicated,
+                        sum(len(templates) for templates in self.templates.values())))
             del self.xml
+            self.templates = self.tracks = self.instances = self.bands = None
+            # release the hierarchical pin references interned while constructing the connection graph
+            NetUtils._clear_reference_cache(context.top)
+        # close the file object created by this pass, so the output is complete when the pass returns
+        if self.output_file is not raw:
+            self.output_file.close()
+        if owned:
+            raw.close()
+        else:
+            raw.flush()
+        self.output_file = output_file
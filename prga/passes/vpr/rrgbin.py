@@ -0,0 +1,527 @@
+# -*- encoding: ascii -*-
+"""VPR's binary routing resource graph format.
+
+VPR reads and writes routing resource graphs in the `Cap'n Proto`_ format when the file name ends with ".bin". This
+module writes and reads the format without the Cap'n Proto runtime. The layout of each struct is computed from the
+tables below with the same algorithm the Cap'n Proto compiler uses, so the tables are the only place to update if
+``rr_graph.capnp`` changes in VPR.
+
+Run ``python -m prga.passes.vpr.rrgbin <rrg.xml> <rrg.bin>`` to check that the two files describe the same graph.
+
+.. _Cap'n Proto: https://capnproto.org/encoding.html
+"""
+
+from ...util import Object
+from ...exception import PRGAInternalError
+
+from lxml.etree import iterparse
+from itertools import zip_longest
+from tempfile import TemporaryFile
+import struct, shutil, mmap, gzip, sys
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ['RRGBinaryWriter', 'RRGBinaryReader', 'compare_rrg']
+
+# ----------------------------------------------------------------------------
+# -- Schema ------------------------------------------------------------------
+# ----------------------------------------------------------------------------
+# Enumerants in ``rr_graph.capnp``. Value 0 is ``uxsdInvalid``, i.e. the attribute is not set
+_ENUMS = {
+        "SwitchType":       ("mux", "tristate", "pass_gate", "short", "buffer"),
+        "NodeType":         ("CHANX", "CHANY", "SOURCE", "SINK", "OPIN", "IPIN"),
+        "NodeDirection":    ("INC_DIR", "DEC_DIR", "BI_DIR"),
+        "LocSide":          ("LEFT", "RIGHT", "TOP", "BOTTOM"),
+        "PinType":          ("OPEN", "OUTPUT", "INPUT"),
+        }
+
+# Fields of the structs in ``rr_graph.capnp`` in the order of their ordinals. Each field is identified by the XML
+# attribute or child element it corresponds to. ``None`` stands for the text content of the element. Types starting
+# with "[" are lists of structs, which correspond to repeated child elements
+_STRUCTS = {
+        "RrGraph":          (("schema_file_id", "Text"), ("tool_comment", "Text"), ("tool_name", "Text"),
+                                ("tool_version", "Text"), ("channels", "Channels"), ("switches", "Switches"),
+                                ("segments", "Segments"), ("block_types", "BlockTypes"), ("grid", "GridLocs"),
+                                ("rr_nodes", "RrNodes"), ("rr_edges", "RrEdges")),
+        "Channels":         (("channel", "Channel"), ("x_list", "[XList"), ("y_list", "[YList")),
+        "Channel":          (("chan_width_max", "Int32"), ("x_max", "Int32"), ("x_min", "Int32"), ("y_max", "Int32"),
+                                ("y_min", "Int32")),
+        "XList":            (("index", "UInt32"), ("info", "Int32")),
+        "YList":            (("index", "UInt32"), ("info", "Int32")),
+        "Switches":         (("switch", "[Switch"), ),
+        "Switch":           (("id", "Int32"), ("name", "Text"), ("type", "SwitchType"), ("timing", "Timing"),
+                                ("sizing", "Sizing")),
+        "Timing":           (("Cin", "Float32"), ("Cinternal", "Float32"), ("Cout", "Float32"), ("R", "Float32"),
+                                ("Tdel", "Float32")),
+        "Sizing":           (("buf_size", "Float32"), ("mux_trans_size", "Float32")),
+        "Segments":         (("segment", "[Segment"), ),
+        "Segment":          (("id", "Int32"), ("name", "Text"), ("timing", "SegmentTiming")),
+        "SegmentTiming":    (("C_per_meter", "Float32"), ("R_per_meter", "Float32")),
+        "BlockTypes":       (("block_type", "[BlockType"), ),
+        "BlockType":        (("height", "Int32"), ("id", "Int32"), ("name", "Text"), ("width", "Int32"),
+                                ("pin_class", "[PinClass")),
+        "PinClass":         (("type", "PinType"), ("pin", "[Pin")),
+        "Pin":              (("ptc", "Int32"), (None, "Text")),
+        "GridLocs":         (("grid_loc", "[GridLoc"), ),
+        "GridLoc":          (("block_type_id", "Int32"), ("height_offset", "Int32"), ("width_offset", "Int32"),
+                                ("x", "Int32"), ("y", "Int32")),
+        "RrNodes":          (("node", "[Node"), ),
+        "Node":             (("capacity", "UInt32"), ("direction", "NodeDirection"), ("id", "UInt32"),
+                                ("type", "NodeType"), ("loc", "NodeLoc"), ("timing", "NodeTiming"),
+                                ("segment", "NodeSegment"), ("metadata", "Metadata")),
+        "NodeLoc":          (("ptc", "Int32"), ("side", "LocSide"), ("xhigh", "Int32"), ("xlow", "Int32"),
+                                ("yhigh", "Int32"), ("ylow", "Int32")),
+        "NodeTiming":       (("C", "Float32"), ("R", "Float32")),
+        "NodeSegment":      (("segment_id", "Int32"), ),
+        "Metadata":         (("meta", "[Meta"), ),
+        "Meta":             (("name", "Text"), (None, "Text")),
+        "RrEdges":          (("edge", "[Edge"), ),
+        "Edge":             (("id", "UInt32"), ("sink_node", "UInt32"), ("src_node", "UInt32"),
+                                ("switch_id", "UInt32"), ("metadata", "Metadata")),
+        }
+
+# Lists written into their own segments while the graph is generated. Their elements are never kept in memory
+_STREAMED = {"rr_nodes": 1, "rr_edges": 2}
+
+# Segment that the sub-structs of streamed list elements are written into. More segments are added if it fills up
+_HEAP = 3
+
+# Pointer offsets are 29-bit word counts for far pointers
+_MAX_SEGMENT_WORDS = 1 << 29
+
+# Cap'n Proto pointer kinds and list element sizes
+_STRUCT, _LIST, _FAR = 0, 1, 2
+_BYTE, _INLINE_COMPOSITE = 2, 7
+
+_PACKERS = {"UInt16": struct.Struct("<H"), "Int32": struct.Struct("<i"), "UInt32": struct.Struct("<I"),
+        "Float32": struct.Struct("<f")}
+
+# Converters from XML attribute values to the values stored
+_CONVERTERS = {"Int32": int, "UInt32": int, "Float32": float}
+_CONVERTERS.update( (type_, {v: i + 1 for i, v in enumerate(values)}.__getitem__)
+        for type_, values in _ENUMS.items() )
+
+# ----------------------------------------------------------------------------
+# -- Struct Layout -----------------------------------------------------------
+# ----------------------------------------------------------------------------
+class _StructLayout(Object):
+    """Layout of a struct, computed in the same way as the Cap'n Proto compiler does for structs without unions or
+    groups.
+
+    Args:
+        name (:obj:`str`): Name of the struct in `_STRUCTS`
+    """
+
+    __slots__ = ['name', 'data_words', 'pointers', 'data', 'pointer_fields', 'children']
+    def __init__(self, name):
+        self.name = name
+        self.data_words = self.pointers = 0
+        self.data = []              # sequence of (field, type, packer, byte offset)
+        self.pointer_fields = []    # sequence of (field, type, pointer index)
+        self.children = {}          # child element tag -> layout. Filled in once all layouts are created
+
+        holes = [0] * 6             # holes[lg]: offset of a free slot of 2**lg bits, in units of its size. 0 if none
+
+        def try_allocate(lg):
+            if lg >= len(holes):
+                return None
+            elif holes[lg]:
+                offset, holes[lg] = holes[lg], 0
+                return offset
+            elif (offset := try_allocate(lg + 1)) is not None:
+                holes[lg] = 2 * offset + 1
+                return 2 * offset
+            return None
+
+        for field, type_ in _STRUCTS[name]:
+            if type_ == "Text" or type_.startswith("[") or type_ in _STRUCTS:
+                self.pointer_fields.append( (field, type_, self.pointers) )
+                self.pointers += 1
+                continue
+            elif type_ in _ENUMS:
+                lg, packer = 4, _PACKERS["UInt16"]
+            else:
+                lg, packer = 5, _PACKERS[type_]
+            if (offset := try_allocate(lg)) is None:
+                offset = self.data_words << (6 - lg)
+                self.data_words += 1
+                hole, hole_lg = offset + 1, lg
+                while hole_lg < len(holes):
+                    holes[hole_lg] = hole
+                    hole, hole_lg = (hole + 1) // 2, hole_lg + 1
+            self.data.append( (field, type_, packer, offset << (lg - 3)) )
+
+    @property
+    def words(self):
+        """:obj:`int`: Size of this struct in words."""
+        return self.data_words + self.pointers
+
+_LAYOUTS = {name: _StructLayout(name) for name in _STRUCTS}
+for _layout in _LAYOUTS.values():
+    _layout.children.update( (field, _LAYOUTS[type_.lstrip("[")])
+            for field, type_, _ in _layout.pointer_fields if type_ != "Text" )
+del _layout
+
+def _struct_pointer(offset, layout):
+    return ((offset << 2) & 0xFFFFFFFF) | _STRUCT | (layout.data_words << 32) | (layout.pointers << 48)
+
+def _list_pointer(offset, size, count):
+    return ((offset << 2) & 0xFFFFFFFF) | _LIST | (size << 32) | (count << 35)
+
+def _far_pointer(segment, offset):
+    return (offset << 3) | _FAR | (segment << 32)
+
+def _float32(value):
+    return struct.unpack("<f", struct.pack("<f", float(value)))[0]
+
+# ----------------------------------------------------------------------------
+# -- Binary Routing Resource Graph Writer ------------------------------------
+# ----------------------------------------------------------------------------
+class RRGBinaryWriter(Object):
+    """Write a routing resource graph in VPR's binary format through the same API as `XMLGenerator`.
+
+    Args:
+        ostream (file-like object): The output stream
+
+    Elements are collected into a tree and encoded when the root element is closed, except the ``node`` and
+    ``edge`` elements, which are encoded as soon as they are closed. Nodes and edges are written into two temporary
+    files holding their own segments, and their ``loc``, ``timing``, ``segment`` and ``metadata`` sub-structs into
+    another, so memory use does not grow with the size of the graph. The segments are concatenated into
+    ``ostream`` when the generator is closed.
+    """
+
+    __slots__ = ['_ostream', '_stack', '_root', '_lists', '_heaps']
+    def __init__(self, ostream):
+        self._ostream = ostream
+
+    def __enter__(self):
+        self._stack = []            # open elements: [tag, attrs, children, text, layout]
+        self._root = None
+        self._lists = {}            # segment -> [temporary file, number of elements, layout of the elements]
+        for tag, segment in _STREAMED.items():
+            layout, = _LAYOUTS["RrGraph"].children[tag].children.values()
+            self._lists[segment] = [TemporaryFile(), 0, layout]
+        self._heaps = []            # sequence of [temporary file, number of words]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self._write()
+        finally:
+            for f, _, _ in self._lists.values():
+                f.close()
+            for f, _ in self._heaps:
+                f.close()
+
+    # == internal API ========================================================
+    def _open(self, tag, attrs):
+        if not self._stack:
+            layout = _LAYOUTS["RrGraph"]
+        elif (layout := self._stack[-1][4].children.get(tag)) is None:
+            raise PRGAInternalError("Element '{}' is not allowed in '{}'".format(tag, self._stack[-1][0]))
+        self._stack.append( [tag, attrs or {}, [], None, layout] )
+
+    def _close(self):
+        element = self._stack.pop()
+        if not self._stack:
+            self._root = element
+        elif (segment := _STREAMED.get(self._stack[-1][0])) is not None:
+            f, count, layout = list_ = self._lists[segment]
+            buf = bytearray(8 * layout.words)
+            self._encode_struct(buf, 0, layout, element, True)
+            f.write(buf)
+            list_[1] = count + 1
+        else:
+            self._stack[-1][2].append(element)
+
+    def _encode_pointer(self, buf, at, type_, value):
+        """Append ``value`` to ``buf`` and write a pointer to it at word ``at``."""
+        target = len(buf) // 8
+        offset = target - at - 1
+        if type_ == "Text":
+            data = str(value).encode("ascii") + b"\0"
+            buf += data + bytes(-len(data) % 8)
+            pointer = _list_pointer(offset, _BYTE, len(data))
+        elif type_.startswith("["):
+            layout = _LAYOUTS[type_[1:]]
+            buf += bytes(8 * (1 + len(value) * layout.words))
+            struct.pack_into("<Q", buf, 8 * target, _struct_pointer(len(value), layout))
+            for i, element in enumerate(value):
+                self._encode_struct(buf, target + 1 + i * layout.words, layout, element)
+            pointer = _list_pointer(offset, _INLINE_COMPOSITE, len(value) * layout.words)
+        else:
+            layout = _LAYOUTS[type_]
+            buf += bytes(8 * layout.words)
+            self._encode_struct(buf, target, layout, value)
+            pointer = _struct_pointer(offset, layout)
+        struct.pack_into("<Q", buf, 8 * at, pointer)
+
+    def _encode_far(self, type_, value):
+        """Append ``value`` with a landing pad to the heap, and return a far pointer to the landing pad."""
+        buf = bytearray(8)
+        self._encode_pointer(buf, 0, type_, value)
+        words = len(buf) // 8
+        if not self._heaps or self._heaps[-1][1] + words > _MAX_SEGMENT_WORDS:
+            self._heaps.append( [TemporaryFile(), 0] )
+        heap = self._heaps[-1]
+        heap[0].write(buf)
+        pointer = _far_pointer(_HEAP + len(self._heaps) - 1, heap[1])
+        heap[1] += words
+        return pointer
+
+    def _encode_struct(self, buf, at, layout, element, far = False):
+        """Encode ``element`` into the struct at word ``at`` of ``buf``. If ``far`` is set, the sub-structs are
+        written into the heap instead of ``buf``."""
+        _, attrs, children, text, _ = element
+        for field, type_, packer, offset in layout.data:
+            if (value := attrs.get(field)) is not None:
+                try:
+                    packer.pack_into(buf, 8 * at + offset, _CONVERTERS[type_](value))
+                except (KeyError, ValueError):
+                    raise PRGAInternalError("Invalid value for attribute '{}' of '{}': {}"
+                            .format(field, element[0], value))
+        grouped = {}
+        for child in children:
+            grouped.setdefault(child[0], []).append(child)
+        for field, type_, index in layout.pointer_fields:
+            at_pointer = at + layout.data_words + index
+            if type_ == "Text":
+                value = text if field is None else attrs.get(field)
+            elif (value := grouped.get(field)) is None:
+                continue
+            elif (segment := _STREAMED.get(field)) is not None:
+                # the streamed list is not kept in the element. Point it to its own segment instead
+                child = layout.children[field]
+                target = len(buf) // 8
+                buf += bytes(8 * child.words)
+                struct.pack_into("<Q", buf, 8 * at_pointer, _struct_pointer(target - at_pointer - 1, child))
+                struct.pack_into("<Q", buf, 8 * (target + child.data_words), _far_pointer(segment, 0))
+                continue
+            elif not type_.startswith("["):
+                value = value[0]
+            if value is None:
+                continue
+            elif far:
+                struct.pack_into("<Q", buf, 8 * at_pointer, self._encode_far(type_, value))
+            else:
+                self._encode_pointer(buf, at_pointer, type_, value)
+
+    def _write(self):
+        if self._root is None:
+            raise PRGAInternalError("No root element generated")
+        root = bytearray(8)
+        self._encode_pointer(root, 0, "RrGraph", self._root)
+        segments = [len(root) // 8]
+        for segment in range(1, _HEAP):
+            _, count, layout = self._lists[segment]
+            segments.append(2 + count * layout.words)
+        segments.extend(words for _, words in self._heaps)
+        if any(words >= 1 << 32 for words in segments):
+            raise PRGAInternalError("Routing resource graph too large for the binary format")
+        header = struct.pack("<{}I".format(1 + len(segments)), len(segments) - 1, *segments)
+        self._ostream.write(header + bytes(-len(header) % 8))
+        self._ostream.write(root)
+        for segment in range(1, _HEAP):
+            f, count, layout = self._lists[segment]
+            if count * layout.words >= _MAX_SEGMENT_WORDS:
+                raise PRGAInternalError("Too many elements in the list in segment {}".format(segment))
+            # landing pad for the far pointer, and the tag of the list
+            self._ostream.write(struct.pack("<QQ", _list_pointer(0, _INLINE_COMPOSITE, count * layout.words),
+                _struct_pointer(count, layout)))
+            f.seek(0)
+            shutil.copyfileobj(f, self._ostream)
+        for f, _ in self._heaps:
+            f.seek(0)
+            shutil.copyfileobj(f, self._ostream)
+
+    # == high-level API ======================================================
+    class __ElementContextManager(object):
+        """Context manager for an element."""
+        def __init__(self, writer, tag, attrs):
+            self.__writer = writer
+            self.__tag = tag
+            self.__attrs = attrs
+
+        def __enter__(self):
+            self.__writer._open(self.__tag, self.__attrs)
+            return self.__writer
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            if exc_type is None:
+                self.__writer._close()
+
+    def element(self, tag, attrs = None):
+        """Open an element. Use the returned object as a context manager."""
+        return self.__ElementContextManager(self, tag, attrs)
+
+    def element_leaf(self, tag, attrs = None, text = ''):
+        """Add an element without child elements."""
+        self._open(tag, attrs)
+        if text:
+            self._stack[-1][3] = text.strip()
+        self._close()
+
+# ----------------------------------------------------------------------------
+# -- Binary Routing Resource Graph Reader ------------------------------------
+# ----------------------------------------------------------------------------
+class RRGBinaryReader(Object):
+    """Read a routing resource graph in VPR's binary format.
+
+    Args:
+        file_ (:obj:`str`): The input file
+
+    This reader is meant for checking generated files. It decodes elements one by one, so it works on graphs larger
+    than the memory.
+    """
+
+    __slots__ = ['_file', '_map', '_segments']
+    def __init__(self, file_):
+        self._file = open(file_, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+        count = struct.unpack_from("<I", self._map)[0] + 1
+        sizes = struct.unpack_from("<{}I".format(count), self._map, 4)
+        offset = (4 * (1 + count) + 7) // 8 * 8
+        self._segments = []
+        for size in sizes:
+            self._segments.append(memoryview(self._map)[offset : offset + 8 * size])
+            offset += 8 * size
+
+    def close(self):
+        """Close the input file."""
+        for segment in self._segments:
+            segment.release()
+        self._map.close()
+        self._file.close()
+
+    def _word(self, segment, at):
+        return struct.unpack_from("<Q", self._segments[segment], 8 * at)[0]
+
+    def _resolve(self, segment, at):
+        """Follow the pointer at word ``at`` in ``segment``.
+
+        Returns:
+            :obj:`tuple` [:obj:`int`, :obj:`int`, :obj:`int` ]: Segment and word of the target, and the pointer word
+                describing the target. ``None`` if the pointer is null
+        """
+        if (pointer := self._word(segment, at)) == 0:
+            return None
+        elif pointer & 3 == _FAR:
+            landing_segment, landing = pointer >> 32, (pointer & 0xFFFFFFFF) >> 3
+            if not pointer & 4:
+                return self._resolve(landing_segment, landing)
+            far = self._word(landing_segment, landing)
+            return far >> 32, (far & 0xFFFFFFFF) >> 3, self._word(landing_segment, landing + 1)
+        offset = (pointer & 0xFFFFFFFF) >> 2
+        if offset >= 1 << 29:
+            offset -= 1 << 30
+        return segment, at + 1 + offset, pointer
+
+    def _text(self, segment, at):
+        if (target := self._resolve(segment, at)) is None:
+            return None
+        segment, at, pointer = target
+        return bytes(self._segments[segment][8 * at : 8 * at + (pointer >> 35) - 1]).decode("ascii")
+
+    def _elements(self, tag, layout, segment, at, pointer):
+        """Decode the struct at word ``at`` in ``segment``, and yield its child elements and itself in post-order."""
+        data_words, pointers = (pointer >> 32) & 0xFFFF, pointer >> 48
+        data = self._segments[segment][8 * at : 8 * (at + data_words)]
+        fields, text = {}, None
+        for field, type_, packer, offset in layout.data:
+            value = packer.unpack_from(data, offset)[0] if offset < len(data) else 0
+            if type_ in _ENUMS:
+                value = _ENUMS[type_][value - 1] if value else None
+            fields[field] = value
+        for field, type_, index in layout.pointer_fields:
+            if index >= pointers:
+                continue
+            elif type_ == "Text":
+                value = self._text(segment, at + data_words + index)
+                if field is None:
+                    text = value
+                else:
+                    fields[field] = value
+            elif (target := self._resolve(segment, at + data_words + index)) is None:
+                continue
+            elif type_.startswith("["):
+                child_segment, child_at, _ = target
+                tag_word = self._word(child_segment, child_at)
+                child = _LAYOUTS[type_[1:]]
+                words = ((tag_word >> 32) & 0xFFFF) + (tag_word >> 48)
+                for i in range((tag_word & 0xFFFFFFFF) >> 2):
+                    yield from self._elements(field, child, child_segment, child_at + 1 + i * words, tag_word)
+            else:
+                yield from self._elements(field, _LAYOUTS[type_], *target)
+        yield tag, fields, text
+
+    def elements(self):
+        """Iterate over all elements in post-order, i.e. child elements before their parents.
+
+        Yields:
+            :obj:`tuple` [:obj:`str`, :obj:`dict`, :obj:`str` ]: Tag, attributes and text of each element. All
+                attributes defined in the schema are present. Attributes that are not set are ``None`` or 0
+        """
+        return self._elements("rr_graph", _LAYOUTS["RrGraph"], *self._resolve(0, 0))
+
+# ----------------------------------------------------------------------------
+# -- Comparison --------------------------------------------------------------
+# ----------------------------------------------------------------------------
+def _xml_elements(file_):
+    """Iterate over all elements in an XML routing resource graph in the same way as `RRGBinaryReader.elements`."""
+    stream = gzip.open(file_, "rb") if file_.endswith(".gz") else open(file_, "rb")
+    with stream:
+        layouts = []
+        for event, element in iterparse(stream, events = ("start", "end")):
+            if event == "start":
+                if not layouts:
+                    layouts.append(_LAYOUTS["RrGraph"])
+                    continue
+                type_ = dict(_STRUCTS[layouts[-1].name]).get(element.tag)
+                if type_ is None or type_.lstrip("[") not in _LAYOUTS:
+                    raise PRGAInternalError("Element '{}' is not in the schema".format(element.tag))
+                layouts.append(_LAYOUTS[type_.lstrip("[")])
+                continue
+            layout = layouts.pop()
+            fields, text = {}, None
+            for field, type_, _, _ in layout.data:
+                if (value := element.get(field)) is None:
+                    fields[field] = None if type_ in _ENUMS else 0
+                elif type_ == "Float32":
+                    fields[field] = _float32(value)
+                else:
+                    fields[field] = value if type_ in _ENUMS else int(value)
+            for field, type_, _ in layout.pointer_fields:
+                if field is None:
+                    text = (element.text or "").strip() or None
+                elif type_ == "Text":
+                    fields[field] = element.get(field)
+            yield element.tag, fields, text
+            element.clear()
+
+def compare_rrg(xml_file, binary_file):
+    """Check if an XML routing resource graph and a binary one describe the same graph.
+
+    Args:
+        xml_file (:obj:`str`): The XML file. Gzipped if the name ends with ".gz"
+        binary_file (:obj:`str`): The binary file
+
+    Returns:
+        :obj:`int`: Number of elements compared
+
+    Raises:
+        `PRGAInternalError`: If the two files differ
+    """
+    reader = RRGBinaryReader(binary_file)
+    try:
+        for count, (x, b) in enumerate(zip_longest(_xml_elements(xml_file), reader.elements())):
+            if x != b:
+                raise PRGAInternalError("Element #{} differs: {} (XML) != {} (binary)".format(count, x, b))
+        return count + 1
+    finally:
+        reader.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level = logging.INFO, format = "%(message)s")
+    _logger.info("{} elements are the same".format(compare_rrg(sys.argv[1], sys.argv[2])))
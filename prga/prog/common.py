@@ -91,7 +91,7 @@ class ProgDataBitmap(object):
             self._construct(args)
             return self
         else:
-            return type(self)(*args)
+            return type(self)(args)
 
 class ProgDataValue(object):
 
@@ -135,6 +135,10 @@ class ProgDataValue(object):
 class AbstractProgCircuitryEntry(Object):
     """Abstract base class for programming circuitry entry point."""
 
+    # set if `insert_prog_circuitry` can be called again after some modules are re-translated, i.e. it skips the
+    # design-view modules in which programming circuitry is already inserted
+    supports_incremental_insertion = False
+
     @classmethod
     def _get_or_create_prog_nets(cls, module, excludes = None):
         nets = {}
@@ -182,6 +186,9 @@ class AbstractProgCircuitryEntry(Object):
 
         Returns:
             :obj:`int`: Levels of buffering of ``prog_rst`` and ``prog_done``
+
+        The levels of buffering are also kept in the ``prog_ctrl_levels`` attribute of each module, so modules
+        processed by a previous call are skipped.
         """
         _cache = uno(_cache, {})
 
@@ -194,6 +201,8 @@ class AbstractProgCircuitryEntry(Object):
         # check if we've processed this module already
         elif (l := _cache.get(m.key)) is not None:
             return l
+        elif (l := getattr(m, "prog_ctrl_levels", None)) is not None:
+            return l
 
         # create programming ctrl signals
         signals = {
@@ -214,7 +223,7 @@ class AbstractProgCircuitryEntry(Object):
                 for name, port in signals.items():
                     if (pin := i.pins.get(name)) is not None:
                         NetUtils.connect(port, pin)
-            _cache[m.key] = 0
+            _cache[m.key] = m.prog_ctrl_levels = 0
             return 0
 
         elif (m.module_class.is_block or m.module_class.is_routing_box or
@@ -262,7 +271,7 @@ class AbstractProgCircuitryEntry(Object):
             NetUtils.connect(signals["prog_rst"],  buf_rst_prev.pins["D"])
             NetUtils.connect(signals["prog_done"], buf_done_prev.pins["D"])
 
-            _cache[m.key] = len(levels)
+            _cache[m.key] = m.prog_ctrl_levels = len(levels)
             return len(levels)
 
     @classmethod
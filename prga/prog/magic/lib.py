@@ -19,6 +19,8 @@ __all__ = ['Magic']
 class Magic(AbstractProgCircuitryEntry):
     """Entry point for magic programming circuitry (not ASIC implementable)."""
 
+    supports_incremental_insertion = True
+
     @classmethod
     def materialize(cls, ctx, inplace = False):
         ctx = super().materialize(ctx, inplace = inplace)
@@ -51,9 +53,9 @@ class Magic(AbstractProgCircuitryEntry):
                 cls._insert_prog_circuitry(context, i.model, _cache)
 
         if lmod.module_class.is_slice or lmod.module_class.is_block or lmod.module_class.is_routing_box:
-            # connect ``prog_data`` to constant 0
+            # connect ``prog_data`` to constant 0, unless already connected in a previous run
             for i in lmod.instances.values():
-                if (pin := i.pins.get("prog_data")) is not None:
+                if (pin := i.pins.get("prog_data")) is not None and NetUtils.get_source(pin) is None:
                     NetUtils.connect(Const(0, len(pin)), pin)
 
         _logger.info(" .. Inserted: {}".format(lmod))
@@ -24,6 +24,8 @@ _logger = logging.getLogger(__name__)
 class Pktchain(Scanchain):
     """Entry point for pktchain programming circuitry."""
 
+    supports_incremental_insertion = False
+
     @classmethod
     def materialize(cls, ctx, inplace = False, *,
             phit_width = 8, chain_width = 1, router_fifo_depth_log2 = 4):
@@ -18,6 +18,8 @@ _logger = logging.getLogger(__name__)
 class Scanchain(AbstractProgCircuitryEntry):
     """Entry point for scanchain programming circuitry."""
 
+    supports_incremental_insertion = True
+
     @classmethod
     def materialize(cls, ctx, inplace = False, *,
             chain_width = 1):
@@ -9,10 +9,21 @@ def def_argparser(name):
 
     parser.add_argument("-c", "--context", metavar="context",
             help="Pickled PRGA architecture context")
+    parser.add_argument("-i", "--index", metavar="index",
+            help=("Precompiled bitstream index generated by the `BitstreamIndexGeneration` pass. "
+                "If specified, the architecture context is not loaded"))
     parser.add_argument("-f", "--fasm", metavar="fasm",
             help="Raw FASM input")
     parser.add_argument("-o", "--output", metavar="output",
             help="Output file")
+    parser.add_argument("-b", "--bitstream", metavar="bitstream",
+            help=("Decode this bitstream instead of generating one. The decoded FASM features are written to the "
+                "output file if specified, and compared against the FASM input if specified"))
+    parser.add_argument("-j", "--jobs", metavar="jobs", type=int, default=1,
+            help="Number of worker processes used to parse the FASM file. Default: 1")
+    parser.add_argument("--format", metavar="format", choices=("hex", "memh", "bin"), default="hex",
+            help=("Format of the bitstream file: `hex` (annotated hexadecimal text), `memh` (bare hexadecimal text "
+                "loadable with ``$readmemh``), or `bin` (raw little-endian binary words). Default: hex"))
     parser.add_argument("-p", "--prog_type", metavar="prog_type",
             help=("[Export Option] Overwrite the programming circuitry type in the pickled context. "
                 "For example, use `Magic` to generate a fake bitstream with Verilog ``force`` statements. "))
@@ -5,6 +5,8 @@ from .magic import MagicBitstreamGenerator
 from .scanchain import ScanchainBitstreamGenerator
 from .pktchain import PktchainBitstreamGenerator
 from .frame import FrameBitstreamGenerator
+from .index import BitstreamIndex
+from .common import AbstractBitstreamGenerator
 from ...core.context import Context
 from ...util import enable_stdout_logging, uno
 
@@ -22,9 +24,13 @@ enable_stdout_logging(__name__, logging.INFO)
 ns, args = def_argparser(__name__).parse_known_args()
 
 # validate arguments
-if ns.context is None:
-    _logger.error("Missing required argument: -c context")
+if ns.context is None and ns.index is None:
+    _logger.error("Missing required argument: -c context (or -i index)")
     exit()
+elif ns.bitstream is not None:
+    if ns.fasm is None and ns.output is None:
+        _logger.error("Missing required argument: -f fasm and/or -o output for bitstream decoding")
+        exit()
 elif ns.fasm is None:
     _logger.error("Missing required argument: -f fasm")
     exit()
@@ -32,21 +38,63 @@ elif ns.output is None:
     _logger.error("Missing required argument: -o output")
     exit()
 
-# unpickle context
-_logger.info("Unpickling architecture context: {}".format(ns.context))
-context = Context.unpickle(ns.context)
+if ns.index is not None:
+    # open precompiled index
+    _logger.info("Opening precompiled bitstream index: {}".format(ns.index))
+    index = BitstreamIndex.open(ns.index)
+
+    if ns.prog_type is not None and ns.prog_type != index.prog_type:
+        _logger.error("Bitstream index is compiled for programming circuitry type: {}".format(index.prog_type))
+        exit()
+    _logger.info("Using programming circuitry type: {}".format(index.prog_type))
+    context, prog_type, kwargs = None, index.prog_type, {"index": index}
 
-# select the correct bitstream generator
-prog_type = uno(ns.prog_type, context.prog_entry.__name__)
-if prog_type != context.prog_entry.__name__:
-    _logger.info("Using programming circuitry type: {} ({} used in architecture)"
-            .format(prog_type, context.prog_entry.__name__))
 else:
-    _logger.info("Using programming circuitry type: {}".format(prog_type))
-generator = _generators[prog_type](context)
+    # unpickle context
+    _logger.info("Unpickling architecture context: {}".format(ns.context))
+    context = Context.unpickle(ns.context)
+
+    # select the correct bitstream generator
+    prog_type = uno(ns.prog_type, context.prog_entry.__name__)
+    if prog_type != context.prog_entry.__name__:
+        _logger.info("Using programming circuitry type: {} ({} used in architecture)"
+                .format(prog_type, context.prog_entry.__name__))
+    else:
+        _logger.info("Using programming circuitry type: {}".format(prog_type))
+    kwargs = {}
+
+if ns.bitstream is not None and _generators[prog_type].read_bitstream is AbstractBitstreamGenerator.read_bitstream:
+    _logger.error("Bitstream decoding (-b) is not supported for programming circuitry type: {}".format(prog_type))
+    exit(1)
+generator = _generators[prog_type](context, jobs = ns.jobs, output_format = ns.format, **kwargs)
+
+if ns.bitstream is not None:
+    # decode bitstream
+    _logger.info("Decoding bitstream: {} ...".format(ns.bitstream))
+    generator.read_bitstream(ns.bitstream)
 
-# generate bitstream
-_logger.info("Generating bitstream: {} from FASM: {} ...".format(ns.output, ns.fasm))
-generator.generate_bitstream(ns.fasm, ns.output, args)
+    if ns.output is not None:
+        with open(ns.output, "w") as f:
+            for feature in generator.decode():
+                f.write(feature + "\n")
+        _logger.info("Decoded FASM features written to: {}".format(ns.output))
 
-_logger.info("Bitstream generated. Bye")
+    if ns.fasm is not None:
+        missing, unexpected = generator.verify_fasm(ns.fasm)
+        for feature in missing:
+            _logger.error("Missing from bitstream: {}".format(feature))
+        for feature in unexpected:
+            _logger.error("Unexpected in bitstream: {}".format(feature))
+        if missing or unexpected:
+            _logger.error("Bitstream verification failed: {} missing, {} unexpected"
+                    .format(len(missing), len(unexpected)))
+            exit(1)
+        _logger.info("Bitstream verified against FASM: {}".format(ns.fasm))
+
+    _logger.info("Bitstream decoded. Bye")
+
+else:
+    # generate bitstream
+    _logger.info("Generating bitstream: {} from FASM: {} ...".format(ns.output, ns.fasm))
+    generator.generate_bitstream(ns.fasm, ns.output, args)
+    _logger.info("Bitstream generated. Bye")
@@ -0,0 +1,106 @@
+# -*- encoding: ascii -*-
+"""Benchmarks for the bitstream generation utilities.
+
+Run with ``python -m prga.tools.bitgen.benchmark``. The equivalence tests are in ``tests/test_bitgen.py``.
+"""
+
+from .util import CRC, BitstreamSegmentTree, BitstreamIntervalBuilder
+
+from bitarray import bitarray
+from bitarray.util import int2ba
+from timeit import timeit
+import random
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ['benchmark_crc', 'benchmark_segments']
+
+# ----------------------------------------------------------------------------
+# -- Reference Implementations -----------------------------------------------
+# ----------------------------------------------------------------------------
+def _crc_serial(bits, lanes):
+    """Bit-serial, per-lane CRC-8 CCITT checksum, as originally calculated by the pktchain generator."""
+    checksums = []
+    for lane in range(lanes):
+        crc = 0
+        for b in (b for i, b in enumerate(bits) if i % lanes == lane):
+            crc = ((crc << 1) & 0xFF) ^ (0x7 if bool(crc & 0x80) != bool(b) else 0x0)
+        checksums.append(crc)
+    return checksums
+
+def _unshift_zeros_serial(crc, zeros):
+    """Bit-serial inverse of consuming ``zeros`` zero bits."""
+    for _ in range(zeros):
+        crc = (crc >> 1) ^ (0x83 if crc & 1 else 0x0)
+    return crc
+
+# ----------------------------------------------------------------------------
+# -- CRC Benchmark -----------------------------------------------------------
+# ----------------------------------------------------------------------------
+def benchmark_crc(lengths = (0, 1, 7, 8, 9, 1023, 32768), lanes = (1, 2, 4, 8), repeat = 3, seed = 0):
+    """Compare the performance of the table-driven `CRC` against the bit-serial reference.
+
+    Args:
+        lengths (:obj:`Sequence` [:obj:`int` ]): Lengths of the random bitstreams
+        lanes (:obj:`Sequence` [:obj:`int` ]): Numbers of lanes
+        repeat (:obj:`int`): Number of runs for each timing measurement
+        seed (:obj:`int`): Random seed
+
+    Returns:
+        :obj:`list` [:obj:`tuple` ]: \(length, lanes, reference time, table-driven time\) for each configuration
+    """
+    rng, results = random.Random(seed), []
+    for length, width in ((l, w) for l in lengths for w in lanes):
+        bits = bitarray(endian = "little")
+        bits.frombytes(rng.getrandbits(length + 7 & ~7).to_bytes(length + 7 >> 3, "little"))
+        del bits[length:]
+
+        ref = timeit(lambda: [_unshift_zeros_serial(c, length // width) for c in _crc_serial(bits, width)],
+                number = repeat) / repeat
+        new = timeit(lambda: [CRC.unshift_zeros(c, length // width) for c in CRC.checksum_lanes(bits, width)],
+                number = repeat) / repeat
+        results.append( (length, width, ref, new) )
+        _logger.info("CRC: {:>8d} bits, {} lanes: reference {:.3e}s, table-driven {:.3e}s ({:.1f}x)"
+                .format(length, width, ref, new, ref / new if new else float("inf")))
+    return results
+
+# ----------------------------------------------------------------------------
+# -- Segment Backend Benchmark -----------------------------------------------
+# ----------------------------------------------------------------------------
+def benchmark_segments(sizes = (100, 1000, 10000, 50000), min_gaps = (0, 64), span = 1 << 20, seed = 0):
+    """Compare the performance of `BitstreamIntervalBuilder` against `BitstreamSegmentTree`.
+
+    Args:
+        sizes (:obj:`Sequence` [:obj:`int` ]): Numbers of random segments
+        min_gaps (:obj:`Sequence` [:obj:`int` ]): Minimum gaps between segments
+        span (:obj:`int`): Range of the segment offsets
+        seed (:obj:`int`): Random seed
+
+    Returns:
+        :obj:`list` [:obj:`tuple` ]: \(size, min gap, tree time, batch time\) for each configuration
+    """
+    rng, results = random.Random(seed), []
+    for size, min_gap in ((s, g) for s in sizes for g in min_gaps):
+        writes = []
+        for _ in range(size):
+            low, length = rng.randrange(span), rng.randint(1, 64)
+            writes.append( (low, low + length, int2ba(rng.getrandbits(length), length, 'little')) )
+
+        def run(backend):
+            segments = backend(min_gap)
+            for write in writes:
+                segments.set_data(*write)
+            return list(segments.itertree())
+
+        tree = timeit(lambda: run(BitstreamSegmentTree), number = 1)
+        batch = timeit(lambda: run(BitstreamIntervalBuilder), number = 1)
+        results.append( (size, min_gap, tree, batch) )
+        _logger.info("Segments: {:>8d} writes, min gap {:>3d}: tree {:.3e}s, batch {:.3e}s ({:.1f}x)"
+                .format(size, min_gap, tree, batch, tree / batch if batch else float("inf")))
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(level = logging.INFO, format = "%(message)s")
+    benchmark_crc()
+    benchmark_segments()
@@ -1,10 +1,13 @@
 # -*- encoding: ascii -*-
 
+from .util import LRUCache
 from ...netlist.net.util import NetUtils
-from ...prog.common import ProgDataValue
+from ...core.common import ModuleClass
+from ...prog.common import ProgDataValue, ProgDataBitmap
 from ...util import Object
 
-import re
+from bitarray.util import ba2int
+import re, multiprocessing
 from collections import namedtuple
 
 import logging
@@ -25,26 +28,74 @@ class FASMFeatureParam(namedtuple('FASMFeatureParam', 'parameter value hierarchy
     def type_(self):
         return 'param'
 
+# generator in the worker processes. Refer to `AbstractBitstreamGenerator._parse_fasm_parallel`
+_worker = None
+
+def _init_worker(generator):
+    global _worker
+    _worker = generator
+
+def _parse_chunk(chunk):
+    start, lines = chunk
+    for cache in (_worker._prefix_cache, _worker._compose_cache):
+        cache.hits = cache.misses = 0
+    _worker._reset_partial()
+    _worker._parse_lines(lines, start)
+    _worker._flush()
+    return _worker._get_partial(), _worker.cache_stats
+
 class AbstractBitstreamGenerator(Object):
     """Abstract base class for bitstream generators.
 
     Args:
         context (`Context`):
+
+    Keyword Args:
+        index (`BitstreamIndex`): Precompiled bitstream index. If set, FASM features are looked up in the index
+            instead of being resolved in ``context``, and ``context`` may be ``None``
+        cache_size (:obj:`int`): Maximum number of hierarchical prefixes and composed bitmaps memoized
+        jobs (:obj:`int`): Number of worker processes used to parse the FASM file
+        output_format (:obj:`str`): Format of the bitstream file. Refer to `BitstreamWriter.open` for the
+            supported formats
     """
 
-    __slots__ = ['context']
+    __slots__ = ['context', 'index', 'jobs', 'output_format', '_prefix_cache', '_compose_cache']
 
-    def __init__(self, context):
+    def __init__(self, context, *, index = None, cache_size = 4096, jobs = 1, output_format = "hex"):
         self.context = context
+        self.index = index
+        self.jobs = jobs
+        self.output_format = output_format
+        self._prefix_cache = LRUCache(cache_size)
+        self._compose_cache = LRUCache(cache_size)
 
     _reprog_param = re.compile("(?P<name>\w+)\[(?P<high>\d+):(?P<low>\d+)\]")
     _reprog_value = re.compile("(?P<width>\d+)'(?P<notation>[bdhBDH])(?P<value>[a-fA-F0-9xzXZ]+)")
     _none = object()
 
+    @property
+    def summary(self):
+        """`ContextSummary`: Summary of the FPGA."""
+        return self.context.summary if self.index is None else self.index.summary
+
+    @property
+    def cache_stats(self):
+        """:obj:`dict` [:obj:`str`, :obj:`tuple` [:obj:`int`, :obj:`int` ]]: Hits and misses of the hierarchical
+        prefix cache (``"prefix"``) and the composed bitmap cache (``"compose"``)."""
+        return {"prefix": (self._prefix_cache.hits, self._prefix_cache.misses),
+                "compose": (self._compose_cache.hits, self._compose_cache.misses)}
+
+    def _report_cache_stats(self):
+        for name, (hits, misses) in self.cache_stats.items():
+            _logger.info("Memoized {} cache: {} hits, {} misses".format(name, hits, misses))
+
     def set_bits(self, value, hierarchy = None, *, inplace = False):
         """Update bitstream with the specified ``value`` and ``hierarchy``. Subclass may implement this method to use
         `AbstractBitstreamGenerator.parse_fasm`.
 
+        The default implementation locates ``value`` with `AbstractBitstreamGenerator._locate` then writes it with
+        `AbstractBitstreamGenerator._write`.
+
         Args:
             value (`ProgDataValue`):
             hierarchy (`AbstractInstance`):
@@ -52,24 +103,69 @@ class AbstractBitstreamGenerator(Object):
         Keyword Args:
             inplace (:obj:`bool`): If set, ``value`` may be modified in place.
         """
+        if (located := self._locate(value, hierarchy, inplace = inplace)) is not None:
+            self._write(*located)
+
+    def _compose(self, hierarchy):
+        """Compose the bitmaps in ``hierarchy`` and calculate the base address. Subclass may implement this method to
+        use the default `AbstractBitstreamGenerator.set_bits` and `AbstractBitstreamGenerator.build_index`.
+
+        Args:
+            hierarchy (`AbstractInstance`):
+
+        Returns:
+            :obj:`tuple` [:obj:`int`, `ProgDataBitmap` ]: Base address and the composed bitmap. The bitmap is
+                ``None`` if no remapping is needed. ``None`` if values in ``hierarchy`` should be discarded
+        """
         raise NotImplementedError
 
-    def parse_feature(self, line):
-        """Parse one FASM feature.
+    def _locate(self, value, hierarchy = None, *, inplace = False):
+        """Remap ``value`` with the composed bitmap of ``hierarchy`` and get the base address. Composed bitmaps are
+        memoized.
 
         Args:
-            line (:obj:`str`):
+            value (`ProgDataValue`):
+            hierarchy (`AbstractInstance`):
+
+        Keyword Args:
+            inplace (:obj:`bool`): If set, ``value`` may be modified in place.
 
         Returns:
-            `FASMFeatureConn` or `FASMFeaturePlain` or `FASMFeatureParam`:
+            :obj:`tuple` [:obj:`int`, `ProgDataValue` ]: Base address and the remapped value. ``None`` if
+                ``value`` should be discarded
         """
-        # special handling first
-        if not (line := line.strip()):  # empty line
-            return None
-        elif line.startswith("#"):      # comment
+        key = hierarchy.hierarchy if hierarchy else None
+        if (composed := self._compose_cache.get(key, self._none)) is self._none:
+            composed = self._compose_cache[key] = self._compose(hierarchy)
+
+        if composed is None:
             return None
 
-        # tokenize
+        base, bitmap = composed
+        if bitmap is not None:
+            value = value.remap(bitmap, inplace = inplace)
+        return base, value
+
+    def _write(self, base, value):
+        """Write a located value into the bitstream.
+
+        Args:
+            base (:obj:`int`): Base address returned by `AbstractBitstreamGenerator._locate`
+            value (`ProgDataValue`): Remapped value returned by `AbstractBitstreamGenerator._locate`. Must not be
+                modified
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _tokenize(cls, line):
+        """Tokenize one FASM feature.
+
+        Args:
+            line (:obj:`str`): Stripped FASM feature
+
+        Returns:
+            :obj:`list` [:obj:`str` ]:
+        """
         tokens, quoted = [], None
         for token in line.split('.'):
             if not quoted:
@@ -85,22 +181,97 @@ class AbstractBitstreamGenerator(Object):
                     quoted = None
                 else:
                     quoted += '.' + token
+        return tokens
 
-        # hierarchy
-        module, instances = self.context.top, []
-        for token in tokens[:-1]:
+    @classmethod
+    def _join_tokens(cls, tokens):
+        """Join tokens into a FASM feature in the canonical form, i.e. only tokens with dots are quoted.
 
-            # handle mode selection
-            if token.startswith('@'):
-                module = module.modes[token[1:]]
+        Args:
+            tokens (:obj:`Sequence` [:obj:`str` ]):
 
-            # get instance
-            else:
-                instances.append(instance := module.children[token])
-                module = instance.model
+        Returns:
+            :obj:`str`:
+        """
+        return ".".join("{" + t + "}" if "." in t else t for t in tokens)
 
-        hierarchy = (instances[0]._extend_hierarchy(below = tuple(reversed(instances[1:])))
-                if instances else None)
+    @classmethod
+    def _parse_param(cls, token):
+        """Parse the last token of a parameter feature.
+
+        Args:
+            token (:obj:`str`):
+
+        Returns:
+            :obj:`tuple` [:obj:`str`, `ProgDataValue` ]: Name and value of the parameter. ``None`` if the value is
+                all x's and/or z's
+        """
+        param, value = token.split('=')
+
+        # parameter and range specifier
+        obj = cls._reprog_param.match(param)
+        name, high, low = obj.group( "name", "high", "low" )
+
+        # value
+        obj = cls._reprog_value.match(value)
+        width, notation, value = obj.group( "width", "notation", "value" )
+        if all(c in "xzXZ" for c in value):     # no useful value at all
+            return None
+        else:
+            value = value.lower().replace('x','0').replace('z','0')
+        value = int(value, {"b": 2, "d": 10, "h": 16, "B": 2, "D": 10, "H": 16}[notation])
+
+        return name, ProgDataValue(value, (int(low), int(width)))
+
+    def _resolve_prefix(self, tokens):
+        """Resolve the hierarchical prefix of a FASM feature. Results are memoized, and resolving a prefix reuses the
+        memoized result of its parent prefix.
+
+        Args:
+            tokens (:obj:`tuple` [:obj:`str` ]): Tokens in the prefix
+
+        Returns:
+            :obj:`tuple` [`Module`, `AbstractInstance` ]: The module and the hierarchy that the prefix leads to
+        """
+        if not tokens:
+            return self.context.top, None
+        elif (resolved := self._prefix_cache.get(tokens)) is not None:
+            return resolved
+
+        module, hierarchy = self._resolve_prefix(tokens[:-1])
+
+        # handle mode selection
+        if (token := tokens[-1]).startswith('@'):
+            module = module.modes[token[1:]]
+
+        # get instance
+        else:
+            instance = module.children[token]
+            module, hierarchy = instance.model, instance._extend_hierarchy(above = hierarchy)
+
+        self._prefix_cache[tokens] = module, hierarchy
+        return module, hierarchy
+
+    def parse_feature(self, line):
+        """Parse one FASM feature.
+
+        Args:
+            line (:obj:`str`):
+
+        Returns:
+            `FASMFeatureConn` or `FASMFeaturePlain` or `FASMFeatureParam`:
+        """
+        # special handling first
+        if not (line := line.strip()):  # empty line
+            return None
+        elif line.startswith("#"):      # comment
+            return None
+
+        # tokenize
+        tokens = self._tokenize(line)
+
+        # hierarchy
+        module, hierarchy = self._resolve_prefix(tuple(tokens[:-1]))
 
         # process the last token
         last = tokens[-1]
@@ -108,27 +279,75 @@ class AbstractBitstreamGenerator(Object):
             src, sink = map(lambda n: NetUtils._dereference(module, n, byname = True), subtokens)
             return FASMFeatureConn(NetUtils.get_connection(src, sink, skip_validations = True), hierarchy)
 
-        elif len(subtokens := last.split('=')) > 1:
-            # parameter and range specifier
-            obj = self._reprog_param.match(subtokens[0])
-            name, high, low = obj.group( "name", "high", "low" )
-
-            # value
-            obj = self._reprog_value.match(subtokens[1])
-            width, notation, value = obj.group( "width", "notation", "value" )
-            if all(c in "xzXZ" for c in value):     # no useful value at all
+        elif '=' in last:
+            if (param := self._parse_param(last)) is None:
                 return None
+            return FASMFeatureParam(*param, hierarchy)
+
+        else:
+            return FASMFeaturePlain(last, module, hierarchy)
+
+    def _expand_feature(self, feature):
+        """Expand one parsed FASM feature into `AbstractBitstreamGenerator.set_bits` calls.
+
+        Args:
+            feature (`FASMFeatureConn` or `FASMFeaturePlain` or `FASMFeatureParam`):
+
+        Returns:
+            :obj:`list` [:obj:`tuple` [`ProgDataValue`, `AbstractInstance`, :obj:`bool` ]]: Arguments to
+                `AbstractBitstreamGenerator.set_bits`, i.e. ``value``, ``hierarchy`` and ``inplace``. ``None`` if the
+                feature is not supported
+        """
+        if feature.type_ == "conn":
+            if (prog_enable := getattr(feature.conn, "prog_enable", self._none)) is self._none:
+                calls = []
+                for net in getattr(feature.conn, "switch_path", tuple()):
+                    bus, idx = (net.bus, net.index) if net.net_type.is_bit else (net, 0)
+                    calls.append( (bus.instance.model.prog_enable[idx],
+                        bus.instance._extend_hierarchy(above = feature.hierarchy), False) )
+                return calls
+
+            elif prog_enable is None:
+                return []
+
             else:
-                value = value.lower().replace('x','0').replace('z','0')
-            value = int(value, {"b": 2, "d": 10, "h": 16, "B": 2, "D": 10, "H": 16}[notation])
+                return [(prog_enable, feature.hierarchy, False)]
+
+        elif feature.type_ == "param":
+            leaf = feature.hierarchy.hierarchy[0]
+
+            if (parameters := getattr(leaf, "prog_parameters", self._none)) is self._none:
+                if (parameters := getattr(leaf.model, "prog_parameters", self._none)) is self._none:
+                    return []
+
+            if parameters is None or (bitmap := parameters.get(feature.parameter)) is None:
+                return []
+
+            feature.value.remap(bitmap, inplace = True)
+            return [(feature.value, feature.hierarchy, True)]
 
-            return FASMFeatureParam(name, ProgDataValue(value, (int(low), int(width))), hierarchy)
+        elif feature.type_ == "plain" and feature.feature == "+":
+            leaf = feature.hierarchy.hierarchy[0]
+
+            prog_enable = None
+            if (feature.module.module_class.is_mode
+                    or (prog_enable := getattr(leaf, "prog_enable", self._none)) is self._none):
+                prog_enable = getattr(feature.module, "prog_enable", None)
+
+            if prog_enable is None:
+                return []
+
+            return [(prog_enable, feature.hierarchy, False)]
 
         else:
-            return FASMFeaturePlain(last, module, hierarchy)
+            return None
 
     def parse_fasm(self, fasm):
         """Parse an FASM file. Calls `AbstractBitstreamGenerator.set_bits`, which must be implemented by a sub-class.
+        If a precompiled bitstream index is used, calls `AbstractBitstreamGenerator._write` instead.
+
+        If more than one job is requested, the FASM file is split into chunks which are parsed by worker processes.
+        The partial bitstreams generated by the workers are then merged in order.
 
         Args:
             fasm (:obj:`str` or file-like object):
@@ -136,52 +355,304 @@ class AbstractBitstreamGenerator(Object):
         if isinstance(fasm, str):
             fasm = open(fasm, "r")
 
-        for lineno, line in enumerate(fasm, 1):
+        if self.jobs > 1:
+            self._parse_fasm_parallel(fasm)
+        else:
+            self._parse_lines(fasm)
+
+        self._flush()
+        self._report_cache_stats()
+
+    def _parse_lines(self, lines, start = 1):
+        """Parse FASM features.
+
+        Args:
+            lines (:obj:`Iterable` [:obj:`str` ]):
+            start (:obj:`int`): Line number of the first line
+        """
+        if self.index is not None:
+            self._parse_lines_indexed(lines, start)
+            return
+
+        for lineno, line in enumerate(lines, start):
 
             if (feature := self.parse_feature(line)) is None:
                 continue
 
-            elif feature.type_ == "conn":
-                if (prog_enable := getattr(feature.conn, "prog_enable", self._none)) is self._none:
-                    for net in getattr(feature.conn, "switch_path", tuple()):
-                        bus, idx = (net.bus, net.index) if net.net_type.is_bit else (net, 0)
-                        self.set_bits(bus.instance.model.prog_enable[idx],
-                                bus.instance._extend_hierarchy(above = feature.hierarchy))
+            elif (calls := self._expand_feature(feature)) is None:
+                _logger.warning("[Line {:0>4d}] Unsupported feature: {}".format(lineno, line.strip()))
+
+            else:
+                for value, hierarchy, inplace in calls:
+                    self.set_bits(value, hierarchy, inplace = inplace)
+
+    def _parse_fasm_parallel(self, fasm):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            _logger.warning("Parallel bitstream generation is not supported on this platform. Use 1 job instead")
+            self._parse_lines(fasm)
+            return
+
+        # split the FASM file into ordered chunks, a few chunks per job for load balancing
+        lines = fasm.readlines()
+        chunksize = max(1, -(-len(lines) // (self.jobs * 4)))
+        chunks = [(start + 1, lines[start : start + chunksize]) for start in range(0, len(lines), chunksize)]
+
+        # worker processes are forked, so the context (or the index) is shared instead of pickled
+        with multiprocessing.get_context("fork").Pool(self.jobs, _init_worker, (self, )) as pool:
+            for partial, stats in pool.imap(_parse_chunk, chunks):
+                self._merge_partial(partial)
+                for cache, (hits, misses) in zip((self._prefix_cache, self._compose_cache),
+                        (stats["prefix"], stats["compose"])):
+                    cache.hits += hits
+                    cache.misses += misses
+
+    def _flush(self):
+        """Apply pending writes buffered by `AbstractBitstreamGenerator._write`, if any. Called after the FASM file
+        (or a chunk of it) is parsed."""
+        pass
+
+    def _reset_partial(self):
+        """Reset the bitstream in a worker process before parsing a chunk of the FASM file. Sub-class must implement
+        this method to support parallel bitstream generation."""
+        raise NotImplementedError
 
-                elif prog_enable is None:
+    def _get_partial(self):
+        """Get the partial bitstream generated by a worker process.
+
+        Returns:
+            Picklable partial bitstream, passed to `AbstractBitstreamGenerator._merge_partial`
+        """
+        raise NotImplementedError
+
+    def _merge_partial(self, partial):
+        """Merge a partial bitstream into this generator. Partial bitstreams are merged in the order of the chunks,
+        so a feature in a later chunk overwrites the ones in the earlier chunks, as if the FASM file is parsed
+        sequentially.
+
+        Args:
+            partial: Returned by `AbstractBitstreamGenerator._get_partial`
+        """
+        raise NotImplementedError
+
+    def _parse_lines_indexed(self, lines, start = 1):
+        for lineno, line in enumerate(lines, start):
+
+            if not (line := line.strip()) or line.startswith("#"):
+                continue
+
+            tokens = self._tokenize(line)
+            if '->' not in (last := tokens[-1]) and '=' in last:
+                if (param := self._parse_param(last)) is None:
+                    continue
+                name, value = param
+                if (records := self.index.get(self._join_tokens(tokens[:-1] + [name]))) is not None:
+                    for base, bitmap in records:
+                        self._write(base, value.remap(bitmap))
                     continue
 
-                else:
-                    self.set_bits(prog_enable, feature.hierarchy)
+            elif (records := self.index.get(self._join_tokens(tokens))) is not None:
+                for base, value in records:
+                    self._write(base, value)
+                continue
 
-            elif feature.type_ == "param":
-                leaf = feature.hierarchy.hierarchy[0]
+            _logger.warning("[Line {:0>4d}] Unsupported feature: {}".format(lineno, line))
 
-                if (parameters := getattr(leaf, "prog_parameters", self._none)) is self._none:
-                    if (parameters := getattr(leaf.model, "prog_parameters", self._none)) is self._none:
-                        continue
+    def _iter_features(self, module = None, tokens = tuple(), instances = tuple()):
+        """Iterate over all legal FASM features under ``module``.
+
+        Args:
+            module (`Module`): Default to the top-level array
+            tokens (:obj:`tuple` [:obj:`str` ]): Tokens in the FASM feature leading to ``module``
+            instances (:obj:`tuple` [`Instance` ]): Instances in the FASM feature leading to ``module``, in top-down
+                order
+
+        Yields:
+            :obj:`tuple` [:obj:`tuple` [:obj:`str` ], `FASMFeatureConn` or `FASMFeaturePlain` or
+                `FASMFeatureParam` ]: Tokens of the feature, and the parsed feature. For parameters, the last token
+                is the name of the parameter, and the value of the parsed feature covers the whole parameter
+        """
+        module = self.context.top if module is None else module
+
+        hierarchy = (instances[0]._extend_hierarchy(below = tuple(reversed(instances[1:])))
+                if instances else None)
 
-                if parameters is None or (bitmap := parameters.get(feature.parameter)) is None:
+        # connections. Connections in arrays and tiles are not features unless they are programmable
+        if not module.is_cell:
+            programmable_only = module.module_class in (ModuleClass.array, ModuleClass.tile)
+            nets = list(module.ports.values())
+            for instance in module.instances.values():
+                nets.extend(instance.pins.values())
+            for net in nets:
+                if not net.is_sink:
                     continue
+                for bit in getattr(net, "_bits", (net, )):
+                    for conn in bit._connections.values():
+                        if (not programmable_only
+                                or hasattr(conn, "prog_enable") or hasattr(conn, "switch_path")):
+                            yield tokens + ("{}->{}".format(NetUtils._reference(conn.source, byname = True),
+                                NetUtils._reference(conn.sink, byname = True)), ), FASMFeatureConn(conn, hierarchy)
+
+        if hierarchy is not None:
+            # enable features
+            yield tokens + ("+", ), FASMFeaturePlain("+", module, hierarchy)
+
+            # parameters
+            if not module.module_class.is_mode:
+                leaf = instances[-1]
+                if (parameters := getattr(leaf, "prog_parameters", self._none)) is self._none:
+                    parameters = getattr(leaf.model, "prog_parameters", None)
+                for name, bitmap in (parameters or {}).items():
+                    yield tokens + (name, ), FASMFeatureParam(name, ProgDataValue(0, (0, bitmap.length)), hierarchy)
 
-                feature.value.remap(bitmap, inplace = True)
-                self.set_bits(feature.value, feature.hierarchy, inplace = True)
+        # sub-instances
+        for instance in module.instances.values():
+            for feature in self._iter_features(instance.model, tokens + (instance.name, ), instances + (instance, )):
+                yield feature
 
-            elif feature.type_ == "plain" and feature.feature == "+":
-                leaf = feature.hierarchy.hierarchy[0]
+        # modes
+        for name, mode in getattr(module, "modes", {}).items():
+            for feature in self._iter_features(mode, tokens + ("@" + name, ), instances):
+                yield feature
 
-                prog_enable = None
-                if (feature.module.module_class.is_mode
-                        or (prog_enable := getattr(leaf, "prog_enable", self._none)) is self._none):
-                    prog_enable = getattr(feature.module, "prog_enable", None)
+    def build_index(self):
+        """Resolve all legal FASM features into located bitstream values.
 
-                if prog_enable is None:
+        Returns:
+            :obj:`dict` [:obj:`str`, :obj:`list` [:obj:`tuple` [:obj:`int`, `ProgDataValue` or `ProgDataBitmap` ]]]:
+                Mapping from FASM features in the canonical form to base addresses and located values. For
+                parameters, located bitmaps are used instead of values
+        """
+        index = {}
+        for tokens, feature in self._iter_features():
+            if (calls := self._expand_feature(feature)) is None:
+                continue
+            records = index.setdefault(self._join_tokens(tokens), [])
+            for value, hierarchy, inplace in calls:
+                if (located := self._locate(value, hierarchy, inplace = inplace)) is None:
                     continue
+                base, value = located
+                records.append( (base, value.bitmap if feature.type_ == "param" else value) )
+        return index
+
+    # == bitstream decoding ==================================================
+    def read_bitstream(self, input_):
+        """Load a bitstream generated by `AbstractBitstreamGenerator.generate_bitstream`. Sub-class must implement
+        this method to support `AbstractBitstreamGenerator.decode` and `AbstractBitstreamGenerator.verify_fasm`.
 
-                self.set_bits(prog_enable, feature.hierarchy)
+        Args:
+            input_ (:obj:`str`): Bitstream file in the format specified by ``output_format``
+        """
+        raise NotImplementedError
+
+    def _read(self, base, bitmap):
+        """Read located bits from the loaded bitstream. Inverse of `AbstractBitstreamGenerator._write`.
+
+        Args:
+            base (:obj:`int`): Base address returned by `AbstractBitstreamGenerator._locate`
+            bitmap (`ProgDataBitmap`): Located bitmap
+
+        Returns:
+            :obj:`int`:
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _read_bits(cls, bits, base, bitmap):
+        """Read located bits from a little-endian bitarray.
+
+        Args:
+            bits (`bitarray`_):
+            base (:obj:`int`):
+            bitmap (`ProgDataBitmap`):
+
+        Returns:
+            :obj:`int`:
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        value = 0
+        for src, (offset, length) in bitmap._bitmap[:-1]:
+            value |= ba2int(bits[base + offset : base + offset + length]) << src
+        return value
+
+    def _match(self, records):
+        """Test if the loaded bitstream contains all ``records`` of a connection or plain feature."""
+        return all(self._read(base, value.bitmap) == value.value for base, value in records)
+
+    def decode(self):
+        """Decode the loaded bitstream into FASM features. Features that do not set any bit, e.g. selecting the
+        first input of a mux, cannot be told apart from an unprogrammed bitstream and are not decoded.
+
+        Yields:
+            :obj:`str`: FASM features in the canonical form. Parameters are decoded as a whole in hexadecimal
+        """
+        index = self.build_index() if self.index is None else self.index
+
+        for key in index:
+            if not (records := index.get(key)):
+                continue
+
+            elif isinstance(records[0][1], ProgDataBitmap):
+                base, bitmap = records[0]
+                if value := self._read(base, bitmap):
+                    yield "{}[{}:0]={}'h{:x}".format(key, bitmap.length - 1, bitmap.length, value)
+
+            elif any(value.value for _, value in records) and self._match(records):
+                yield key
+
+    def verify_fasm(self, fasm):
+        """Verify the loaded bitstream against a FASM file.
+
+        Args:
+            fasm (:obj:`str` or file-like object):
+
+        Returns:
+            :obj:`tuple` [:obj:`list` [:obj:`str` ], :obj:`list` [:obj:`str` ]]: FASM features missing from the
+                bitstream, and features decoded from the bitstream but not in the FASM file
+        """
+        if isinstance(fasm, str):
+            with open(fasm, "r") as f:
+                return self.verify_fasm(f)
+
+        index = self.build_index() if self.index is None else self.index
+
+        # check the expected features
+        missing, expected, params = [], set(), set()
+        for lineno, line in enumerate(fasm, 1):
+            if not (line := line.strip()) or line.startswith("#"):
+                continue
+
+            tokens = self._tokenize(line)
+            if '->' not in (last := tokens[-1]) and '=' in last:
+                if (param := self._parse_param(last)) is None:
+                    continue
+                name, value = param
+                params.add(key := self._join_tokens(tokens[:-1] + [name]))
+                if records := index.get(key):
+                    (low, _), mask = value.bitmap._bitmap[0][1], (1 << value.bitmap.length) - 1
+                    if (self._read(*records[0]) >> low) & mask != value.value:
+                        missing.append(line)
+                    continue
 
             else:
-                _logger.warning("[Line {:0>4d}] Unsupported feature: {}".format(lineno, line.strip()))
+                expected.add(key := self._join_tokens(tokens))
+                if (records := index.get(key)) is not None:
+                    if not self._match(records):
+                        missing.append(line)
+                    continue
+
+            _logger.warning("[Line {:0>4d}] Unsupported feature: {}".format(lineno, line))
+
+        # check the decoded features
+        unexpected = []
+        for feature in self.decode():
+            if '=' in feature:
+                if feature[:feature.index('[')] not in params:
+                    unexpected.append(feature)
+            elif feature not in expected:
+                unexpected.append(feature)
+
+        return missing, unexpected
 
     def generate_bitstream(self, input_, output, args):
         """Generate bitstream without storing parsed data.
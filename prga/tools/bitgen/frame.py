@@ -1,42 +1,74 @@
 # -*- encoding: ascii -*-
 
 from .common import AbstractBitstreamGenerator
-from .util import BitstreamSegmentTree, CRC
-from ...exception import PRGAInternalError
+from .util import BitstreamSegmentTree, BitstreamIntervalBuilder, BitstreamWriteBuffer, CRC
+from .writer import BitstreamWriter, BitstreamReader
+from ...exception import PRGAInternalError, PRGAAPIError
 from ...util import uno
 
-from bitarray.util import int2ba, zeros, ba2hex, parity
+from bitarray import bitarray
+from bitarray.util import int2ba, ba2int, zeros, ba2hex, parity
 from struct import unpack
 from itertools import chain, repeat
+from bisect import bisect
+import argparse, logging
 
 __all__ = ['FrameBitstreamGenerator']
 
+_subparser = argparse.ArgumentParser()
+_subparser.add_argument('--diff-against', type = str, default = None, metavar = 'old.fasm',
+        help = "Generate a partial bitstream that reconfigures the FPGA from the given FASM file to the new one")
+
+_logger = logging.getLogger(__name__)
+
 class FrameBitstreamGenerator(AbstractBitstreamGenerator):
-    """Bitstream generator for 'frame' Programming circuitry."""
+    """Bitstream generator for 'frame' Programming circuitry.
+
+    Args:
+        context (`Context`):
+
+    Keyword Args:
+        segment_backend (:obj:`str`): Data structure used to collect and merge bitstream segments. ``"batch"``
+            \(default\) uses `BitstreamIntervalBuilder` which sorts and merges all segments once before the
+            bitstream is emitted. ``"tree"`` uses `BitstreamSegmentTree` which merges segments as they are set
+        **kwargs: Refer to `AbstractBitstreamGenerator`
+    """
 
     __slots__ = ["bst", "output",
             "offset_x", "offset_y",
             "offset_subblock_id", "offset_cbox_id", "offset_sbox_id",
             "cbox_base", "sbox_base", "block_base",
-            "word_size", "protocol",
+            "word_size", "protocol", "_buffer", "_segments", "_loaded",
             ]
 
-    def __init__(self, context):
-        super().__init__(context)
+    _segment_backends = {
+            "tree":     BitstreamSegmentTree,
+            "batch":    BitstreamIntervalBuilder,
+            }
 
+    def __init__(self, context, *, segment_backend = "batch", **kwargs):
+        super().__init__(context, **kwargs)
+
+        if (segments := self._segment_backends.get(segment_backend)) is None:
+            raise PRGAAPIError("Unknown segment backend: {}. Supported backends are: {}"
+                    .format(segment_backend, ", ".join(self._segment_backends)))
+
+        self._segments = segments
         self.bst = None
+        self._loaded = None     # segments of the loaded bitstream
         self.output = None
+        self._buffer = BitstreamWriteBuffer()
 
-        self.offset_y           = context.summary.frame["addr_width"]["tile"]
-        self.offset_x           = self.offset_y + context.summary.frame["addr_width"]["y"]
-        self.offset_subblock_id = context.summary.frame["addr_width"]["block"]
-        self.offset_cbox_id     = context.summary.frame["addr_width"]["cbox"]
-        self.offset_sbox_id     = context.summary.frame["addr_width"]["sbox"]
+        self.offset_y           = self.summary.frame["addr_width"]["tile"]
+        self.offset_x           = self.offset_y + self.summary.frame["addr_width"]["y"]
+        self.offset_subblock_id = self.summary.frame["addr_width"]["block"]
+        self.offset_cbox_id     = self.summary.frame["addr_width"]["cbox"]
+        self.offset_sbox_id     = self.summary.frame["addr_width"]["sbox"]
         self.sbox_base          = 0
         self.cbox_base          = 3 << (self.offset_y - 2)
         self.block_base         = 2 << (self.offset_y - 2)
-        self.word_size          = context.summary.frame["word_width"]
-        self.protocol           = context.summary.frame["protocol"]
+        self.word_size          = self.summary.frame["word_width"]
+        self.protocol           = self.summary.frame["protocol"]
 
     def _emit_inst(self, opcode, argument = None):
         """Emit an instruction.
@@ -65,10 +97,10 @@ class FrameBitstreamGenerator(AbstractBitstreamGenerator):
         inst[6] = parity(inst[24:32])
         inst[7] = parity(inst[ 0: 7])
 
-        self.output.write(ba2hex(inst) + " // {}, 0x{:0>6s}\n".format(opcode.name, ba2hex(argument)))
+        self.output.word(ba2int(inst), "{}, 0x{:0>6s}".format(opcode.name, ba2hex(argument)))
 
-    def set_bits(self, value, hierarchy = None, *, inplace = False):
-        x, y, type_, id_, baseaddr = 0, 0, None, 0, 0
+    def _compose(self, hierarchy):
+        x, y, type_, id_, baseaddr, composed = 0, 0, None, 0, 0, None
 
         if hierarchy:
             for i in hierarchy.hierarchy:
@@ -77,11 +109,10 @@ class FrameBitstreamGenerator(AbstractBitstreamGenerator):
                     bitmap = getattr(i, "prog_bitmap", self._none)
 
                 if bitmap is None:
-                    return
+                    return None
 
                 elif bitmap is not self._none:
-                    value = value.remap(bitmap, inplace = inplace)
-                    inplace = True
+                    composed = bitmap if composed is None else composed.remap(bitmap)
 
                 # baseaddr?
                 if baseaddr_inc := getattr(i, "frame_baseaddr", None):
@@ -112,28 +143,111 @@ class FrameBitstreamGenerator(AbstractBitstreamGenerator):
             addr += self.cbox_base + (id_ << self.offset_cbox_id)
         else:
             raise PRGAInternalError("Unknown module type: {}".format(type_))
-        addr *= self.word_size
+        return addr * self.word_size, composed
+
+    def _write(self, base, value):
+        self._buffer.append(base, value)
+
+    def _flush(self):
+        for base, offset, length, v in self._buffer.drain():
+            self.bst.set_data(base + offset, base + offset + length, int2ba(v, length = length, endian = 'little'))
+
+    def _reset_partial(self):
+        # use zero margin so the partial bitstream contains no fillers
+        self.bst = self._segments()
+
+    def _get_partial(self):
+        return list(self.bst.itertree())
+
+    def _merge_partial(self, partial):
+        for low, high, data in partial:
+            self.bst.set_data(low, high, data)
+
+    def _iter_words(self, segments):
+        """Iterate the words covered by ``segments``.
+
+        Args:
+            segments (:obj:`Iterable` [:obj:`tuple` [:obj:`int`, :obj:`int`, `bitarray`_ ]]): Segments returned by
+                ``itertree()`` of the segment backend
+
+        Yields:
+            :obj:`int`: Word address
+            `bitarray`_: Content of the word
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        for low, high, data in segments:
+            if rem := low % self.word_size:
+                data = zeros(rem, endian='little') + data
+                low -= rem
+
+            if rem := len(data) % self.word_size:
+                data = data + zeros(self.word_size - rem, endian='little')
+
+            for i in range(0, len(data), self.word_size):
+                yield (low + i) // self.word_size, data[i:i + self.word_size]
+
+    def _diff(self, old, new):
+        """Calculate the words that must be written to reconfigure the FPGA from ``old`` to ``new``. Words not
+        covered by a bitstream are treated as zeros, so words only covered by ``old`` are cleared.
+
+        Args:
+            old (:obj:`Iterable` [:obj:`tuple` [:obj:`int`, :obj:`int`, `bitarray`_ ]]): Segments of the old bitstream
+            new (:obj:`Iterable` [:obj:`tuple` [:obj:`int`, :obj:`int`, `bitarray`_ ]]): Segments of the new bitstream
+
+        Returns:
+            `BitstreamIntervalBuilder`: Segments to be written
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        old, new = dict(self._iter_words(old)), dict(self._iter_words(new))
+        zero = zeros(self.word_size, endian='little')
+        changed = sorted(addr for addr in old.keys() | new.keys() if old.get(addr, zero) != new.get(addr, zero))
+
+        # each jump over unchanged words costs two instructions (JR and DATA), so short runs of unchanged words are
+        # rewritten with their (new) content instead
+        max_gap = -(-64 // self.word_size)
+
+        diff, prev = BitstreamIntervalBuilder(), None
+        for addr in changed:
+            if prev is not None and addr - prev <= max_gap:
+                prev += 1
+            else:
+                prev = addr
+            for a in range(prev, addr + 1):
+                diff.set_data(a * self.word_size, (a + 1) * self.word_size, new.get(a, zero))
+            prev = addr
 
-        for v, (offset, length) in value.breakdown():
-            segment = int2ba(v, length = length, endian = 'little')
-            self.bst.set_data(addr + offset, addr + offset + length, segment)
+        _logger.info("Differential bitstream: {} of {} words changed".format(len(changed), len(new)))
+        return diff
 
     def generate_bitstream(self, fasm, output, args):
+        ns = _subparser.parse_args(args)
+
+        if ns.diff_against is not None:
+            # parse the old FASM file first
+            _logger.info("Parsing old FASM: {} ...".format(ns.diff_against))
+            self.bst = self._segments(32 + self.word_size)
+            self.parse_fasm(ns.diff_against)
+            old = list(self.bst.itertree())
+
         # use margin `32 + self.word_size` to avoid aligned overwrite
-        self.bst = BitstreamSegmentTree(32 + self.word_size)
+        self.bst = self._segments(32 + self.word_size)
         self.parse_fasm(fasm)
 
-        if isinstance(output, str):
-            output = open(output, 'w')
-        self.output = output
+        if ns.diff_against is not None:
+            self.bst = self._diff(old, self.bst.itertree())
+
+        self.output = BitstreamWriter.open(output, 32, self.output_format)
 
         # a few header comments
-        self.output.write("// Frame-based bitstream\n// Word size: {}\n"
-                .format(self.word_size) )
+        self.output.comment("Frame-based bitstream" if ns.diff_against is None else
+                "Frame-based differential bitstream against {}".format(ns.diff_against))
+        self.output.comment("Word size: {}".format(self.word_size))
 
         # emit an SOB instruction
         self._emit_inst(self.protocol.Programming.MSGType.SOB)
-        self.output.write('\n')
+        self.output.newline()
         addr = 0
 
         # # initialize CRC
@@ -142,7 +256,7 @@ class FrameBitstreamGenerator(AbstractBitstreamGenerator):
 
         # output data
         for offset, high, data in self.bst.itertree():
-            self.output.write("// Write bits {}:{}\n".format(high - 1, offset))
+            self.output.comment("Write bits {}:{}".format(high - 1, offset))
             baseaddr = offset // self.word_size
 
             # jump?
@@ -170,10 +284,59 @@ class FrameBitstreamGenerator(AbstractBitstreamGenerator):
             for i in range(0, len(data), 32):
                 d = data[i:i+32]
                 d += zeros(32 - len(d), endian='little')
-                self.output.write('{:0>8x}\n'.format(unpack('<L', d.tobytes())[0]))
+                self.output.word(unpack('<L', d.tobytes())[0])
 
             addr = baseaddr + len(data) // self.word_size
-            self.output.write("\n")
+            self.output.newline()
 
         # output EOB
         self._emit_inst(self.protocol.Programming.MSGType.EOB)
+        self.output.flush()
+
+    def read_bitstream(self, input_):
+        MSGType = self.protocol.Programming.MSGType
+
+        # replay the instructions
+        segments, words = BitstreamIntervalBuilder(), list(BitstreamReader.read(input_, 32, self.output_format))
+        i, addr = 0, 0
+        while i < len(words):
+            opcode, argument = MSGType(words[i] >> 28), words[i] & 0xFFFFFF
+            i += 1
+
+            if opcode.is_JR:
+                addr += argument - (1 << 24) if argument & (1 << 23) else argument
+            elif opcode.is_JAL:
+                addr = (addr & ~0xFFFFFF) | argument
+            elif opcode.is_JAH:
+                addr = (addr & ~(0xFFFFFF << 24)) | (argument << 24)
+            elif opcode.is_JAE:
+                addr = (addr & ~(0xFFFFFF << 48)) | (argument << 48)
+            elif opcode.is_DATA:
+                length = (argument + 1) * self.word_size
+                data = bitarray(endian='little')
+                for word in words[i : (i := i + -(-length // 32))]:
+                    data.extend(int2ba(word, 32, 'little'))
+                segments.set_data(addr * self.word_size, addr * self.word_size + length, data[:length])
+                addr += argument + 1
+
+        self.bst = segments
+        self._loaded = list(segments.itertree())
+
+    def _read_range(self, low, length):
+        """Read ``length`` bits starting from ``low`` in the loaded bitstream. Bits never written are zeros."""
+        if (i := bisect(self._loaded, (low, float("inf")))) > 0:
+            seglow, seghigh, data = self._loaded[i - 1]
+            if low + length <= seghigh:
+                return ba2int(data[low - seglow : low - seglow + length])
+
+        if length == 1:     # not written at all
+            return 0
+
+        # crossing segment boundaries
+        return sum(self._read_range(low + j, 1) << j for j in range(length))
+
+    def _read(self, base, bitmap):
+        value = 0
+        for src, (offset, length) in bitmap._bitmap[:-1]:
+            value |= self._read_range(base + offset, length) << src
+        return value
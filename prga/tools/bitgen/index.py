@@ -0,0 +1,178 @@
+# -*- encoding: ascii -*-
+
+from ...prog.common import ProgDataBitmap, ProgDataValue
+from ...util import Object
+from ...exception import PRGAAPIError
+
+import struct, mmap, pickle
+
+import logging
+_logger = logging.getLogger(__name__)
+
+__all__ = ['BitstreamIndex']
+
+class BitstreamIndex(Object):
+    """Precompiled mapping from FASM features to located bitstream values.
+
+    Args:
+        buffer_ (:obj:`bytes` or :obj:`mmap.mmap`): Content of the index file
+
+    Direct instantiation of this class is not recommended. Use `BitstreamIndex.open` instead.
+
+    The index file is laid out as follows. All integers are little-endian:
+
+        1. Header: magic number, format version, number of features, and sizes of the following sections
+        2. Pickled meta data, including the programming circuitry type and the `ContextSummary`
+        3. String offsets: ``N + 1`` 64-bit offsets into the string table
+        4. Record offsets: ``N + 1`` 64-bit offsets into the record table
+        5. String table: FASM features in the canonical form, sorted
+        6. Record table: For each feature, a list of records. Each record is a header (kind, base address, number
+           of ranges, number of value bytes), followed by the ranges (offset, length) and the value bytes
+    """
+
+    __slots__ = ['prog_type', 'summary', '_buffer', '_size', '_strtab', '_records']
+
+    _MAGIC = b"PRGABIDX"
+    _VERSION = 1
+    _HEADER = struct.Struct("<8sIIQQQ")     # magic, version, reserved, size, meta length, string table length
+    _OFFSET = struct.Struct("<Q")
+    _RECORD = struct.Struct("<BQII")        # kind, base address, number of ranges, number of value bytes
+    _RANGE = struct.Struct("<QI")           # offset, length
+
+    _KIND_VALUE = 0
+    _KIND_BITMAP = 1
+
+    def __init__(self, buffer_):
+        magic, version, _, size, meta_len, strtab_len = self._HEADER.unpack_from(buffer_, 0)
+        if magic != self._MAGIC:
+            raise PRGAAPIError("Not a PRGA bitstream index")
+        elif version != self._VERSION:
+            raise PRGAAPIError("Bitstream index format version {} not supported (current version: {})"
+                    .format(version, self._VERSION))
+
+        offset = self._HEADER.size
+        meta = pickle.loads(buffer_[offset : offset + meta_len])
+        self.prog_type = meta["prog_type"]
+        self.summary = meta["summary"]
+
+        self._buffer = buffer_
+        self._size = size
+        self._strtab = offset + meta_len
+        self._records = self._strtab + 2 * (size + 1) * self._OFFSET.size + strtab_len
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._key(i).decode("ascii")
+
+    def __contains__(self, feature):
+        return self._search(feature) is not None
+
+    def _string_offset(self, i):
+        base = self._strtab + 2 * (self._size + 1) * self._OFFSET.size
+        return base + self._OFFSET.unpack_from(self._buffer, self._strtab + i * self._OFFSET.size)[0]
+
+    def _record_offset(self, i):
+        return self._records + self._OFFSET.unpack_from(self._buffer,
+                self._strtab + (self._size + 1 + i) * self._OFFSET.size)[0]
+
+    def _key(self, i):
+        return self._buffer[self._string_offset(i) : self._string_offset(i + 1)]
+
+    def _search(self, feature):
+        key, lo, hi = feature.encode("ascii"), 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._size and self._key(lo) == key:
+            return lo
+        return None
+
+    def get(self, feature, default = None):
+        """Look up a FASM feature.
+
+        Args:
+            feature (:obj:`str`): FASM feature in the canonical form. For parameters, the value and the range
+                specifier are omitted
+
+        Returns:
+            :obj:`list` [:obj:`tuple` [:obj:`int`, `ProgDataValue` or `ProgDataBitmap` ]]: Base addresses and located
+                values. For parameters, located bitmaps are returned instead of values
+        """
+        if (i := self._search(feature)) is None:
+            return default
+
+        records, offset, end = [], self._record_offset(i), self._record_offset(i + 1)
+        while offset < end:
+            kind, base, num_ranges, num_bytes = self._RECORD.unpack_from(self._buffer, offset)
+            offset += self._RECORD.size
+            ranges = [self._RANGE.unpack_from(self._buffer, offset + j * self._RANGE.size)
+                    for j in range(num_ranges)]
+            offset += num_ranges * self._RANGE.size
+            if kind == self._KIND_BITMAP:
+                records.append( (base, ProgDataBitmap(ranges)) )
+            else:
+                value = int.from_bytes(self._buffer[offset : offset + num_bytes], "little")
+                records.append( (base, ProgDataValue(value, ranges)) )
+            offset += num_bytes
+        return records
+
+    @classmethod
+    def open(cls, filename):
+        """Open a bitstream index file. The file is memory-mapped.
+
+        Args:
+            filename (:obj:`str`):
+
+        Returns:
+            `BitstreamIndex`:
+        """
+        with open(filename, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+
+    @classmethod
+    def write(cls, f, prog_type, summary, index):
+        """Write a bitstream index file.
+
+        Args:
+            f (file-like object): Output file opened in binary mode
+            prog_type (:obj:`str`): Name of the programming circuitry type
+            summary (`ContextSummary`):
+            index (:obj:`Mapping`): Returned by `AbstractBitstreamGenerator.build_index`
+        """
+        keys = sorted(k.encode("ascii") for k in index)
+
+        strtab, stroffsets = bytearray(), [0]
+        records, recoffsets = bytearray(), [0]
+        for key in keys:
+            strtab += key
+            stroffsets.append(len(strtab))
+
+            for base, value in index[key.decode("ascii")]:
+                if isinstance(value, ProgDataValue):
+                    kind, bitmap = cls._KIND_VALUE, value.bitmap
+                    data = value.value.to_bytes((value.value.bit_length() + 7) // 8, "little")
+                else:
+                    kind, bitmap, data = cls._KIND_BITMAP, value, b""
+                ranges = bitmap._bitmap[:-1]
+                records += cls._RECORD.pack(kind, base, len(ranges), len(data))
+                for _, (offset, length) in ranges:
+                    records += cls._RANGE.pack(offset, length)
+                records += data
+            recoffsets.append(len(records))
+
+        meta = pickle.dumps({"prog_type": prog_type, "summary": summary}, pickle.HIGHEST_PROTOCOL)
+
+        f.write(cls._HEADER.pack(cls._MAGIC, cls._VERSION, 0, len(keys), len(meta), len(strtab)))
+        f.write(meta)
+        for offset in stroffsets:
+            f.write(cls._OFFSET.pack(offset))
+        for offset in recoffsets:
+            f.write(cls._OFFSET.pack(offset))
+        f.write(strtab)
+        f.write(records)
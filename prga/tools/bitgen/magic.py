@@ -1,6 +1,8 @@
 # -*- encoding: ascii -*-
 
 from .common import AbstractBitstreamGenerator
+from ...exception import PRGAAPIError
+from io import StringIO
 import argparse, logging
 
 __all__ = ['MagicBitstreamGenerator']
@@ -16,15 +18,15 @@ class MagicBitstreamGenerator(AbstractBitstreamGenerator):
 
     __slots__ = ["prefix", "checkmode", "output"]
 
-    def __init__(self, context, prefix = "dut"):
-        super().__init__(context)
+    def __init__(self, context, prefix = "dut", **kwargs):
+        super().__init__(context, **kwargs)
 
         self.prefix = prefix
         self.checkmode = False
 
-    def __process_hierarchy(self, hierarchy):
+    def _compose(self, hierarchy):
         if hierarchy is None:
-            return None, None
+            return None
 
         path, bitmap = 'prog_data', None
 
@@ -32,13 +34,13 @@ class MagicBitstreamGenerator(AbstractBitstreamGenerator):
             if ((suffix := getattr(i, "prog_magic_suffix", self._none)) is not self._none
                     or (suffix := getattr(i.model, "prog_magic_suffix", self._none)) is not self._none):
                 if suffix is None:
-                    return None, None
+                    return None
                 else:
                     path = suffix
 
             elif (prog_bitmap := getattr(i, "prog_bitmap", self._none)) is not self._none:
                 if prog_bitmap is None:
-                    return None, None
+                    return None
                 else:
                     bitmap = prog_bitmap if bitmap is None else bitmap.remap(prog_bitmap)
 
@@ -47,11 +49,8 @@ class MagicBitstreamGenerator(AbstractBitstreamGenerator):
 
         return path, bitmap
 
-    def parse_fasm(self, fasm):
-        if isinstance(fasm, str):
-            fasm = open(fasm, "r")
-
-        for lineno, line in enumerate(fasm, 1):
+    def _parse_lines(self, lines, start = 1):
+        for lineno, line in enumerate(lines, start):
 
             if (feature := self.parse_feature(line)) is None:
                 continue
@@ -112,14 +111,16 @@ class MagicBitstreamGenerator(AbstractBitstreamGenerator):
             else:
                 _logger.warning("[Line {:0>4d}] Unsupported feature: {}".format(lineno, line.strip()))
 
-    def set_bits(self, value, hierarchy = None, *, inplace = False):
-        path, bitmap = self.__process_hierarchy(hierarchy)
-        if path is None:
-            return
+    def _reset_partial(self):
+        self.output = StringIO()
+
+    def _get_partial(self):
+        return self.output.getvalue()
 
-        if bitmap is not None:
-            value = value.remap(bitmap, inplace = inplace)
+    def _merge_partial(self, partial):
+        self.output.write(partial)
 
+    def _write(self, path, value):
         f = "        force {x}.{p}[{h}:{o}] = {l}'h{v:x};\n"
         if self.checkmode:
             f = \
@@ -136,6 +137,10 @@ class MagicBitstreamGenerator(AbstractBitstreamGenerator):
                 x = self.prefix, p = path, h = o + l - 1, o = o, l = l, v = v))
 
     def generate_bitstream(self, fasm, output, args):
+        if self.output_format != "hex":
+            raise PRGAAPIError("Magic bitstream is generated as Verilog. Format {} not supported"
+                    .format(self.output_format))
+
         if isinstance(output, str):
             output = open(output, "w")
         self.output = output
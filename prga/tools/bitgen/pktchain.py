@@ -1,24 +1,32 @@
 # -*- encoding: ascii -*-
 
 from .common import AbstractBitstreamGenerator
+from .util import BitstreamWriteBuffer, CRC
+from .writer import BitstreamWriter, BitstreamReader
 from ...exception import PRGAInternalError
 
 from bitarray import bitarray
+from bitarray.util import int2ba
 from itertools import product, count
-import struct
+import struct, logging
+
+_logger = logging.getLogger(__name__)
 
 class PktchainBitstreamGenerator(AbstractBitstreamGenerator):
     """Bitstream generator for 'pktchain' programming circuitry."""
 
-    __slots__ = ["bits"]
+    __slots__ = ["bits", "mask", "_buffer"]
 
-    def __init__(self, context):
-        super().__init__(context)
+    def __init__(self, context, **kwargs):
+        super().__init__(context, **kwargs)
 
         self.bits = [[bitarray('0', endian="little") * leaf
-            for leaf in branch] for branch in context.summary.pktchain["fabric"]["branches"]]
+            for leaf in branch] for branch in self.summary.pktchain["fabric"]["branches"]]
+        self.mask = None    # bits written. Only tracked for partial bitstreams
+        self._buffer = BitstreamWriteBuffer()
 
     _none = object()
+    _leaf_bits = 32
     _reversed_crc_lookup = {}   # to be filled later
 
     @classmethod
@@ -39,8 +47,7 @@ class PktchainBitstreamGenerator(AbstractBitstreamGenerator):
 
     @classmethod
     def reverse_crc(cls, crc, zeros = 0):
-        for i in range(zeros):
-            crc = (crc >> 1) ^ (0x83 if crc & 1 else 0x0)
+        crc = CRC.unshift_zeros(crc, zeros)
         # check pre-built CRC lookup table
         try:
             return cls._reversed_crc_lookup[crc]
@@ -48,8 +55,8 @@ class PktchainBitstreamGenerator(AbstractBitstreamGenerator):
             raise PRGAInternalError("No prefix checksum found for CRC-8 CCITT value 0x{:08x} prepended with {} zeros"
                     .format(crc, zeros))
 
-    def set_bits(self, value, hierarchy = None, inplace = False):
-        branch, leaf = 0, 0
+    def _compose(self, hierarchy):
+        branch, leaf, composed = 0, 0, None
 
         if hierarchy:
             for i in hierarchy.hierarchy:
@@ -57,43 +64,67 @@ class PktchainBitstreamGenerator(AbstractBitstreamGenerator):
                     bitmap = getattr(i, "prog_bitmap", self._none)
 
                 if bitmap is None:
-                    return
+                    return None
 
                 elif bitmap is not self._none:
-                    value = value.remap(bitmap, inplace = inplace)
-                    inplace = True
+                    composed = bitmap if composed is None else composed.remap(bitmap)
 
                 if (branchmap := getattr(i, "pktchain_branchmap", None)) is not None:
                     branch, leaf_inc = branchmap[branch]
                     leaf += leaf_inc
 
-        for v, (offset, length) in value.breakdown():
-            segment = bitarray(bin(v)[2:])
-            segment.reverse()
-            if length > len(segment):
-                segment.extend('0' * (length - len(segment)))
+        # base address: (branch, leaf) packed into one integer
+        return (branch << self._leaf_bits) | leaf, composed
+
+    def _write(self, base, value):
+        self._buffer.append(base, value)
+
+    def _flush(self):
+        leaf_mask = (1 << self._leaf_bits) - 1
+        for base, offset, length, v in self._buffer.drain():
+            branch, leaf = base >> self._leaf_bits, base & leaf_mask
+            BitstreamWriteBuffer.write(self.bits[branch][leaf], offset, length, v,
+                    None if self.mask is None else self.mask[branch][leaf])
+
+    def _reset_partial(self):
+        self.bits = [[bitarray('0', endian="little") * leaf
+            for leaf in branch] for branch in self.summary.pktchain["fabric"]["branches"]]
+        self.mask = [[bitarray('0', endian="little") * leaf
+            for leaf in branch] for branch in self.summary.pktchain["fabric"]["branches"]]
+
+    def _get_partial(self):
+        return self.bits, self.mask
+
+    def _merge_partial(self, partial):
+        for merged_branch, (bits_branch, mask_branch) in zip(self.bits, zip(*partial)):
+            for merged, bits, mask in zip(merged_branch, bits_branch, mask_branch):
+                merged &= ~mask
+                merged |= bits
+
+    def _checksum(self, leaf_bs, chain_width):
+        """Generate the checksum of a leaf bitstream, which is prepended and appended to the bitstream."""
+        crc = CRC.checksum_lanes(leaf_bs[::-1], chain_width)[::-1]
+        reversed_crc = [self.reverse_crc(c, len(leaf_bs) // chain_width) for c in crc]
+        checksum = bitarray(endian="little")
+
+        # fill checksum
+        for digit, idx in product(range(8), range(chain_width)):
+            checksum.append(bool(reversed_crc[idx] & (1 << digit)))
 
-            self.bits[branch][leaf][offset : offset + length] = segment
+        return checksum
 
     def generate_bitstream(self, fasm, output, args):
         self.parse_fasm(fasm)
 
         # add CRC
-        chain_width = self.context.summary.scanchain["chain_width"]
+        chain_width = self.summary.scanchain["chain_width"]
         for branch in self.bits:
             for leaf_id, leaf_bs in enumerate(branch):
                 if len(leaf_bs) == 0:
                     continue
 
                 # generate checksum
-                crc = [self.crc(iter(b for i, b in enumerate(reversed(leaf_bs)) if i % (chain_width) == idx))
-                        for idx in reversed(range(chain_width))]
-                reversed_crc = [self.reverse_crc(c, len(leaf_bs) // chain_width) for c in crc]
-                checksum = bitarray(endian="little")
-
-                # fill checksum
-                for digit, idx in product(range(8), range(chain_width)):
-                    checksum.append(bool(reversed_crc[idx] & (1 << digit)))
+                checksum = self._checksum(leaf_bs, chain_width)
 
                 # prepend & append checksum
                 fullstream = checksum + leaf_bs + checksum
@@ -106,11 +137,10 @@ class PktchainBitstreamGenerator(AbstractBitstreamGenerator):
                 branch[leaf_id] = fullstream
 
         # dump the bitstream (or more precisely, the "packet" stream)
-        if isinstance(output, str):
-            output = open(output, "w")
+        writer = BitstreamWriter.open(output, 32, self.output_format)
 
-        fabric = self.context.summary.pktchain["fabric"]
-        protocol = self.context.summary.pktchain["protocol"]
+        fabric = self.summary.pktchain["fabric"]
+        protocol = self.summary.pktchain["protocol"]
         max_packet_frames = min(256, (2 ** fabric["router_fifo_depth_log2"]) // (32 // fabric["phit_width"])) - 1
         for pkt in count():
             completed = True
@@ -129,17 +159,55 @@ class PktchainBitstreamGenerator(AbstractBitstreamGenerator):
                         protocol.Programming.MSGType.DATA_CHECKSUM if not init and checksum else
                         protocol.Programming.MSGType.DATA)
                 payload = min(max_packet_frames, total_frames - pkt * max_packet_frames)
-                output.write("// {} packet to ({}, {}), {} frames\n"
+                writer.comment("{} packet to ({}, {}), {} frames"
                         .format(msg_type.name, branch_id, leaf_id, payload))
-                output.write("{:0>8x}\n"
-                        .format(protocol.Programming.encode_msg_header(msg_type, branch_id, leaf_id, payload)))
+                writer.word(protocol.Programming.encode_msg_header(msg_type, branch_id, leaf_id, payload))
                 for i in range(payload):
                     i = total_frames - pkt * max_packet_frames - 1 - i
-                    output.write("{:0>8x}\n".format(
-                        struct.unpack("<L", bitstream[i*32:(i + 1)*32].tobytes())[0]))
-                output.write("\n")
+                    writer.word(struct.unpack("<L", bitstream[i*32:(i + 1)*32].tobytes())[0])
+                writer.newline()
             if completed:
                 break
+        writer.flush()
+
+    def read_bitstream(self, input_):
+        protocol = self.summary.pktchain["protocol"]
+        chain_width = self.summary.scanchain["chain_width"]
+
+        # collect frames of each leaf, in the order they are sent
+        frames, words = {}, list(BitstreamReader.read(input_, 32, self.output_format))
+        i = 0
+        while i < len(words):
+            _, branch_id, leaf_id, payload = protocol.Programming.decode_msg_header(words[i])
+            frames.setdefault( (branch_id, leaf_id), [] ).extend(words[i + 1 : i + 1 + payload])
+            i += 1 + payload
+
+        # frames are sent from the last one, and the checksum is prepended and appended to the leaf bitstream
+        for branch_id, branch in enumerate(self.bits):
+            for leaf_id, leaf_bs in enumerate(branch):
+                if not (leaf_frames := frames.get( (branch_id, leaf_id) )):
+                    leaf_bs.setall(0)
+                    continue
+
+                fullstream = bitarray(endian="little")
+                for frame in reversed(leaf_frames):
+                    fullstream.extend(int2ba(frame, 32, 'little'))
+
+                checksum_len = 8 * chain_width
+                if len(fullstream) < 2 * checksum_len + len(leaf_bs):
+                    _logger.warning("Truncated bitstream of ({}, {})".format(branch_id, leaf_id))
+                    fullstream.extend(bitarray('0', endian="little") * (2 * checksum_len + len(leaf_bs)))
+
+                leaf_bs[:] = fullstream[checksum_len : checksum_len + len(leaf_bs)]
+
+                checksum = self._checksum(leaf_bs, chain_width)
+                if (fullstream[:checksum_len] != checksum
+                        or fullstream[checksum_len + len(leaf_bs) : 2 * checksum_len + len(leaf_bs)] != checksum):
+                    _logger.warning("Checksum mismatch in the bitstream of ({}, {})".format(branch_id, leaf_id))
+
+    def _read(self, base, bitmap):
+        branch, leaf = base >> self._leaf_bits, base & ((1 << self._leaf_bits) - 1)
+        return self._read_bits(self.bits[branch][leaf], 0, bitmap)
 
 PktchainBitstreamGenerator._reversed_crc_lookup = {
         PktchainBitstreamGenerator.crc(PktchainBitstreamGenerator._int2bitseq(i)): i
@@ -1,8 +1,11 @@
 # -*- encoding: ascii -*-
 
 from .common import AbstractBitstreamGenerator
+from .util import BitstreamWriteBuffer
+from .writer import BitstreamWriter, BitstreamReader
 
 from bitarray import bitarray
+from bitarray.util import int2ba
 import struct
 
 import logging
@@ -13,18 +16,22 @@ __all__ = ['ScanchainBitstreamGenerator']
 class ScanchainBitstreamGenerator(AbstractBitstreamGenerator):
     """Bitstream generator for 'scanchain' programming circuitry."""
 
-    __slots__ = ["qwords", "bits"]
+    __slots__ = ["qwords", "bits", "mask", "_buffer"]
 
-    def __init__(self, context):
-        super().__init__(context)
+    def __init__(self, context, **kwargs):
+        super().__init__(context, **kwargs)
 
-        bitstream_size = self.context.summary.scanchain["bitstream_size"]
+        bitstream_size = self.summary.scanchain["bitstream_size"]
 
         # initialize bitstream
         self.qwords = bitstream_size // 64 + (1 if bitstream_size % 64 > 0 else 0)
         self.bits = bitarray('0', endian='little') * (self.qwords * 64)
+        self.mask = None    # bits written. Only tracked for partial bitstreams
+        self._buffer = BitstreamWriteBuffer()
+
+    def _compose(self, hierarchy):
+        composed = None
 
-    def set_bits(self, value, hierarchy = None, inplace = False):
         if hierarchy:
             for i in hierarchy.hierarchy:
                 if (bitmap := getattr(i, "scanchain_bitmap", self._none)) is self._none:
@@ -32,26 +39,51 @@ class ScanchainBitstreamGenerator(AbstractBitstreamGenerator):
                         continue
 
                 if bitmap is None:
-                    return
+                    return None
 
                 else:
-                    value = value.remap(bitmap, inplace = inplace)
-                    inplace = True
+                    composed = bitmap if composed is None else composed.remap(bitmap)
+
+        return 0, composed
+
+    def _write(self, base, value):
+        self._buffer.append(base, value)
+
+    def _flush(self):
+        for base, offset, length, v in self._buffer.drain():
+            BitstreamWriteBuffer.write(self.bits, base + offset, length, v, self.mask)
+
+    def _reset_partial(self):
+        self.bits = bitarray('0', endian='little') * (self.qwords * 64)
+        self.mask = bitarray('0', endian='little') * (self.qwords * 64)
 
-        for v, (offset, length) in value.breakdown():
-            segment = bitarray(bin(v)[2:])
-            segment.reverse()
-            if length > len(segment):
-                segment.extend('0' * (length - len(segment)))
+    def _get_partial(self):
+        return self.bits, self.mask
 
-            self.bits[offset : offset + length] = segment
+    def _merge_partial(self, partial):
+        bits, mask = partial
+        self.bits &= ~mask
+        self.bits |= bits
 
     def generate_bitstream(self, fasm, output, args):
         self.parse_fasm(fasm)
 
-        if isinstance(output, str):
-            output = open(output, "w")
+        writer = BitstreamWriter.open(output, 64, self.output_format)
 
-        # emit lines in quad words
+        # emit quad words
         for i in reversed(range(self.qwords)):
-            output.write('{:0>16x}'.format(struct.unpack('<Q', self.bits[i*64:(i + 1)*64].tobytes())[0]) + '\n')
+            writer.word(struct.unpack('<Q', self.bits[i*64:(i + 1)*64].tobytes())[0])
+        writer.flush()
+
+    def read_bitstream(self, input_):
+        words = list(BitstreamReader.read(input_, 64, self.output_format))
+        if len(words) != self.qwords:
+            _logger.warning("Bitstream size mismatch: {} quad words expected, {} found"
+                    .format(self.qwords, len(words)))
+
+        self.bits = bitarray('0', endian='little') * (self.qwords * 64)
+        for i, word in enumerate(reversed(words[-self.qwords:])):
+            self.bits[i*64:(i + 1)*64] = int2ba(word, 64, 'little')
+
+    def _read(self, base, bitmap):
+        return self._read_bits(self.bits, base, bitmap)
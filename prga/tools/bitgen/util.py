@@ -5,8 +5,10 @@ from ...exception import PRGAInternalError
 
 from bitarray import bitarray
 from bitarray.util import zeros, int2ba
+from collections import OrderedDict
+from array import array
 
-__all__ = ['BitstreamSegmentTree', 'CRC']
+__all__ = ['BitstreamSegmentTree', 'BitstreamIntervalBuilder', 'BitstreamWriteBuffer', 'CRC', 'LRUCache']
 
 # ----------------------------------------------------------------------------
 # -- Bitstream Segment Tree --------------------------------------------------
@@ -503,6 +505,153 @@ class BitstreamSegmentTree(Object):
         smaller than this gap."""
         return self._min_gap
 
+# ----------------------------------------------------------------------------
+# -- Bitstream Interval Builder ----------------------------------------------
+# ----------------------------------------------------------------------------
+class BitstreamIntervalBuilder(Object):
+    """A batch alternative to `BitstreamSegmentTree`. Segments are collected into flat arrays, then sorted once and
+    merged in a single linear pass when the bitstream is iterated.
+
+    Args:
+        min_gap (:obj:`int`): Minimum gap between segments. Two segments are merged when the distance between them is
+            smaller than this gap
+
+    Produces the same segments as `BitstreamSegmentTree` with the same ``min_gap``: overlapping or close-enough
+    segments are merged, gaps are filled with zeros, and segments set later overwrite the ones set earlier.
+    """
+
+    __slots__ = ["lows", "highs", "data", "_min_gap"]
+
+    def __init__(self, min_gap = 0):
+        self.lows = array('Q')
+        self.highs = array('Q')
+        self.data = []
+        self._min_gap = min_gap
+
+    def set_data(self, low, high, data):
+        """Set ``data`` to the specified interval.
+
+        Args:
+            low (:obj:`int`):
+            high (:obj:`int`):
+            data (`bitarray`_): Little-endian, ``high - low`` -bits bitarray.
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        self.lows.append(low)
+        self.highs.append(high)
+        self.data.append(data)
+
+    def _merge(self, lower, upper, members):
+        """Merge the segments in ``members`` into one segment covering ``[lower, upper)``."""
+        if len(members) == 1:
+            return lower, upper, self.data[members[0]]
+
+        merged = zeros(upper - lower, endian = 'little')
+        for i in sorted(members):   # insertion order, so later segments overwrite earlier ones
+            merged[self.lows[i] - lower : self.highs[i] - lower] = self.data[i]
+        return lower, upper, merged
+
+    def _build(self):
+        """Sort and merge all segments. The merged segments replace the collected ones."""
+        lows, highs = self.lows, self.highs
+
+        segments, members, lower, upper = [], [], 0, 0
+        for i in sorted(range(len(self.data)), key = lows.__getitem__):
+            if members and lows[i] <= upper + self._min_gap:
+                members.append(i)
+                upper = max(upper, highs[i])
+            else:
+                if members:
+                    segments.append(self._merge(lower, upper, members))
+                members, lower, upper = [i], lows[i], highs[i]
+        if members:
+            segments.append(self._merge(lower, upper, members))
+
+        self.__init__(self._min_gap)
+        for segment in segments:
+            self.set_data(*segment)
+
+    def itertree(self):
+        """Iterate the merged segments in ascending order.
+
+        Yields:
+            :obj:`int`: low
+            :obj:`int`: high
+            `bitarray`_: Little-endian, ``high - low`` -bits bitarray.
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        self._build()
+        yield from zip(self.lows, self.highs, self.data)
+
+    @property
+    def min_gap(self):
+        """:obj:`int`: Minimum gap between segments. Two segments are merged when the distance between them is
+        smaller than this gap."""
+        return self._min_gap
+
+# ----------------------------------------------------------------------------
+# -- Bitstream Write Buffer --------------------------------------------------
+# ----------------------------------------------------------------------------
+class BitstreamWriteBuffer(Object):
+    """Buffer of pending bitstream writes. Located values are broken down into \(base, offset, length, value\)
+    segments which are stored in flat arrays, then applied in bulk in the order they are appended.
+    """
+
+    __slots__ = ['bases', 'offsets', 'lengths', 'values']
+
+    def __init__(self):
+        self.bases = array('Q')
+        self.offsets = array('Q')
+        self.lengths = array('L')
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, base, value):
+        """Append a located value.
+
+        Args:
+            base (:obj:`int`): Base address
+            value (`ProgDataValue`): Located value
+        """
+        for v, (offset, length) in value.breakdown():
+            self.bases.append(base)
+            self.offsets.append(offset)
+            self.lengths.append(length)
+            self.values.append(v)
+
+    def drain(self):
+        """Iterate through and remove all pending segments.
+
+        Yields:
+            :obj:`tuple` [:obj:`int`, :obj:`int`, :obj:`int`, :obj:`int` ]: base address, offset, length, and value
+        """
+        yield from zip(self.bases, self.offsets, self.lengths, self.values)
+        self.__init__()
+
+    @classmethod
+    def write(cls, bits, offset, length, value, mask = None):
+        """Write one segment into ``bits`` without intermediate bit strings.
+
+        Args:
+            bits (`bitarray`_): The bitstream
+            offset (:obj:`int`):
+            length (:obj:`int`):
+            value (:obj:`int`):
+            mask (`bitarray`_): If set, the written bits are also marked in this bitarray
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        if length == 1:
+            bits[offset] = value
+        else:
+            bits[offset : offset + length] = int2ba(value, length, 'little')
+        if mask is not None:
+            mask[offset : offset + length] = 1
+
 # ----------------------------------------------------------------------------
 # -- Cyclic Redundant Code (CRC) Calculator ----------------------------------
 # ----------------------------------------------------------------------------
@@ -543,3 +692,139 @@ class CRC(Object):
             # inverse under specific conditions
             if self.crc[i][-1] != b:
                 self.crc[i] ^= self._mask
+
+    # -- table-driven, MSB-first engine --------------------------------------
+    _poly = 0x07        # x^8 + x^2 + x + 1, with the x^8 term omitted
+    _poly_inv_x = 0x83  # x^-1 mod (x^8 + x^2 + x + 1), i.e. x^7 + x + 1
+    _table = None       # byte-wise lookup table, built on first use
+
+    @classmethod
+    def _mulmod(cls, a, b):
+        """Multiply two polynomials modulo the CRC polynomial."""
+        p = 0
+        while b:
+            if b & 1:
+                p ^= a
+            b >>= 1
+            a = ((a << 1) & 0xFF) ^ (cls._poly if a & 0x80 else 0)
+        return p
+
+    @classmethod
+    def _get_table(cls):
+        if (table := cls._table) is None:
+            table = []
+            for byte in range(256):
+                crc = byte
+                for _ in range(8):
+                    crc = ((crc << 1) & 0xFF) ^ (cls._poly if crc & 0x80 else 0)
+                table.append(crc)
+            table = cls._table = tuple(table)
+        return table
+
+    @classmethod
+    def checksum(cls, bits, crc = 0):
+        """Calculate the CRC-8 CCITT checksum of ``bits``, one byte at a time.
+
+        Args:
+            bits (`bitarray`_): Input bits, consumed in index order, i.e. ``bits[0]`` first
+            crc (:obj:`int`): Initial value of the checksum
+
+        Returns:
+            :obj:`int`:
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        table = cls._get_table()
+
+        # full bytes: big-endian packing puts the first bit consumed at the MSB
+        nbytes = len(bits) // 8
+        for byte in bitarray(bits[:nbytes * 8], endian='big').tobytes():
+            crc = table[crc ^ byte]
+
+        # remaining bits
+        for b in bits[nbytes * 8:]:
+            crc = ((crc << 1) & 0xFF) ^ (cls._poly if bool(crc & 0x80) != bool(b) else 0)
+
+        return crc
+
+    @classmethod
+    def checksum_lanes(cls, bits, lanes):
+        """Calculate the CRC-8 CCITT checksum of each lane in interleaved ``bits``.
+
+        Args:
+            bits (`bitarray`_): Interleaved input bits. ``bits[i]`` belongs to lane ``i % lanes``
+            lanes (:obj:`int`): Number of lanes
+
+        Returns:
+            :obj:`list` [:obj:`int` ]: Checksum of each lane
+
+        .. _bitarray: https://pypi.org/project/bitarray/
+        """
+        return [cls.checksum(bits[lane::lanes]) for lane in range(lanes)]
+
+    @classmethod
+    def unshift_zeros(cls, crc, zeros):
+        """Calculate the checksum before ``zeros`` zero bits are consumed, i.e. the inverse of consuming ``zeros``
+        zero bits. Consuming a zero bit multiplies the checksum by ``x`` modulo the CRC polynomial, so the inverse
+        multiplies the checksum by ``x^-zeros``, which is calculated by square-and-multiply.
+
+        Args:
+            crc (:obj:`int`): Checksum after ``zeros`` zero bits are consumed
+            zeros (:obj:`int`):
+
+        Returns:
+            :obj:`int`:
+        """
+        factor, base = 1, cls._poly_inv_x
+        while zeros:
+            if zeros & 1:
+                factor = cls._mulmod(factor, base)
+            zeros >>= 1
+            base = cls._mulmod(base, base)
+        return cls._mulmod(crc, factor)
+
+# ----------------------------------------------------------------------------
+# -- LRU Cache ---------------------------------------------------------------
+# ----------------------------------------------------------------------------
+class LRUCache(Object):
+    """A bounded mapping which evicts the least recently used entry when full. Hits and misses are counted.
+
+    Args:
+        capacity (:obj:`int`): Maximum number of entries
+    """
+
+    __slots__ = ['capacity', 'hits', 'misses', '_data']
+
+    def __init__(self, capacity = 4096):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.capacity:
+            self._data.popitem(last = False)
+
+    def get(self, key, default = None):
+        """Get the value associated with ``key`` and mark the entry as the most recently used one.
+
+        Args:
+            key (:obj:`Hashable`):
+            default: Returned if ``key`` is not in this cache
+
+        Returns:
+            Value associated with ``key``, or ``default``
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
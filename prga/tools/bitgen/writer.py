@@ -0,0 +1,210 @@
+# -*- encoding: ascii -*-
+"""Streaming writers and readers for the supported bitstream file formats."""
+
+from ...util import Object
+from ...exception import PRGAAPIError
+
+from abc import abstractmethod
+import mmap
+
+__all__ = ['BitstreamWriter', 'BitstreamReader']
+
+# ----------------------------------------------------------------------------
+# -- Abstract Bitstream Writer -----------------------------------------------
+# ----------------------------------------------------------------------------
+class BitstreamWriter(Object):
+    """Abstract base class for streaming bitstream writers. A bitstream is a sequence of fixed-width words, written
+    in the order they are loaded into the programming circuitry.
+
+    Args:
+        output (file-like object): Output file. Opened in text mode for text formats, and binary mode for binary
+            formats
+        word_width (:obj:`int`): Number of bits in each word. Must be a multiple of 8
+
+    Direct instantiation of this class is not recommended. Use `BitstreamWriter.open` instead.
+    """
+
+    __slots__ = ['output', 'word_width']
+
+    def __init__(self, output, word_width):
+        self.output = output
+        self.word_width = word_width
+
+    @abstractmethod
+    def word(self, value, comment = None):
+        """Write one word.
+
+        Args:
+            value (:obj:`int`): Value of the word
+            comment (:obj:`str`): Comment associated with the word. Ignored by formats without comments
+        """
+        raise NotImplementedError
+
+    def comment(self, text):
+        """Write one line of comment. Ignored by formats without comments.
+
+        Args:
+            text (:obj:`str`):
+        """
+        pass
+
+    def newline(self):
+        """Write an empty line. Ignored by formats without line structure."""
+        pass
+
+    def flush(self):
+        """Flush buffered words to the output file."""
+        self.output.flush()
+
+    # == high-level API ======================================================
+    formats = ("hex", "memh", "bin")
+
+    @classmethod
+    def open(cls, output, word_width, format_ = "hex"):
+        """Create a bitstream writer.
+
+        Args:
+            output (:obj:`str` or file-like object): Output file name, or an opened file of the correct mode
+            word_width (:obj:`int`): Number of bits in each word
+            format_ (:obj:`str`): File format. Supported formats are:
+
+                * ``"hex"``: one hexadecimal word per line, annotated with comments
+                * ``"memh"``: one hexadecimal word per line without comments, loadable with ``$readmemh``
+                * ``"bin"``: raw little-endian binary words
+
+        Returns:
+            `BitstreamWriter`:
+        """
+        if format_ in ("hex", "memh"):
+            if isinstance(output, str):
+                output = open(output, "w")
+            return (_HexBitstreamWriter if format_ == "hex" else _MemhBitstreamWriter)(output, word_width)
+        elif format_ == "bin":
+            if isinstance(output, str):
+                output = open(output, "wb")
+            return _BinaryBitstreamWriter(output, word_width)
+        else:
+            raise PRGAAPIError("Unsupported bitstream format: {}. Supported formats are: {}"
+                    .format(format_, ", ".join(cls.formats)))
+
+# ----------------------------------------------------------------------------
+# -- Text Bitstream Writers --------------------------------------------------
+# ----------------------------------------------------------------------------
+class _HexBitstreamWriter(BitstreamWriter):
+    """Writer for hexadecimal text bitstreams annotated with comments."""
+
+    __slots__ = ['_fmt']
+
+    def __init__(self, output, word_width):
+        super().__init__(output, word_width)
+        self._fmt = "{{:0>{}x}}".format(word_width // 4)
+
+    def word(self, value, comment = None):
+        if comment is None:
+            self.output.write(self._fmt.format(value) + "\n")
+        else:
+            self.output.write(self._fmt.format(value) + " // " + comment + "\n")
+
+    def comment(self, text):
+        self.output.write("// " + text + "\n")
+
+    def newline(self):
+        self.output.write("\n")
+
+class _MemhBitstreamWriter(_HexBitstreamWriter):
+    """Writer for bare hexadecimal text bitstreams."""
+
+    def word(self, value, comment = None):
+        self.output.write(self._fmt.format(value) + "\n")
+
+    def comment(self, text):
+        pass
+
+    def newline(self):
+        pass
+
+# ----------------------------------------------------------------------------
+# -- Binary Bitstream Writer -------------------------------------------------
+# ----------------------------------------------------------------------------
+class _BinaryBitstreamWriter(BitstreamWriter):
+    """Writer for raw little-endian binary bitstreams. Words are buffered and written in large blocks."""
+
+    __slots__ = ['_buffer', '_bytes']
+
+    _BLOCK_SIZE = 1 << 20
+
+    def __init__(self, output, word_width):
+        if word_width % 8 != 0:
+            raise PRGAAPIError("Word width ({}) must be a multiple of 8 for binary bitstreams".format(word_width))
+        super().__init__(output, word_width)
+        self._buffer = bytearray()
+        self._bytes = word_width // 8
+
+    def word(self, value, comment = None):
+        self._buffer += value.to_bytes(self._bytes, "little")
+        if len(self._buffer) >= self._BLOCK_SIZE:
+            self.output.write(self._buffer)
+            self._buffer = bytearray()
+
+    def flush(self):
+        self.output.write(self._buffer)
+        self._buffer = bytearray()
+        super().flush()
+
+# ----------------------------------------------------------------------------
+# -- Bitstream Reader --------------------------------------------------------
+# ----------------------------------------------------------------------------
+class BitstreamReader(Object):
+    """Reader for bitstreams written by `BitstreamWriter`."""
+
+    @classmethod
+    def read(cls, filename, word_width, format_ = "hex"):
+        """Read the words in a bitstream file.
+
+        Args:
+            filename (:obj:`str`):
+            word_width (:obj:`int`): Number of bits in each word
+            format_ (:obj:`str`): File format. Refer to `BitstreamWriter.open` for the supported formats
+
+        Yields:
+            :obj:`int`: Value of each word
+        """
+        if format_ in ("hex", "memh"):
+            with open(filename, "r") as f:
+                try:
+                    for line in f:
+                        if (line := line.split("//", 1)[0].strip()):
+                            yield int(line, 16)
+                except (UnicodeDecodeError, ValueError):
+                    raise PRGAAPIError("Bitstream file {} is not in the '{}' format. Use `--format bin` for binary "
+                            "bitstreams".format(filename, format_)) from None
+
+        elif format_ == "bin":
+            with open(filename, "rb") as f:
+                data = cls.map(f)
+                bytes_ = word_width // 8
+                try:
+                    for offset in range(0, len(data) - len(data) % bytes_, bytes_):
+                        yield int.from_bytes(data[offset : offset + bytes_], "little")
+                finally:
+                    if isinstance(data, mmap.mmap):
+                        data.close()
+
+        else:
+            raise PRGAAPIError("Unsupported bitstream format: {}. Supported formats are: {}"
+                    .format(format_, ", ".join(BitstreamWriter.formats)))
+
+    @classmethod
+    def map(cls, f):
+        """Memory-map a binary bitstream file, e.g. to hand the raw words to a DMA engine without copying.
+
+        Args:
+            f (file-like object): Binary bitstream file opened in binary mode
+
+        Returns:
+            :obj:`mmap.mmap` or :obj:`bytes`: Content of the file. Empty files cannot be memory-mapped, so an empty
+                :obj:`bytes` object is returned instead
+        """
+        if f.seek(0, 2) == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
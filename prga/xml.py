@@ -3,8 +3,15 @@
 
 from lxml.etree import xmlfile
 
+from collections import OrderedDict
+
 __all__ = ['XMLGenerator']
 
+# escaped characters in attribute values and text, the same as lxml
+_ATTR_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;',
+    '\n': '&#10;', '\r': '&#13;', '\t': '&#9;'})
+_TEXT_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '\r': '&#13;'})
+
 # ----------------------------------------------------------------------------
 # -- Stream-based XML Generator ----------------------------------------------
 # ----------------------------------------------------------------------------
@@ -16,19 +23,45 @@ class XMLGenerator(object):
         pretty (:obj:`bool`): if the output XML should be nicely broken into multiple lines and indented
         skip_stringify (:obj:`bool`): assumes the dict passed into `element` and `element_leaf` are already converted
             to string objects
+
+    Keyword Args:
+        fast (:obj:`bool`): if set, the XML is formatted by this generator instead of lxml. Recently escaped
+            attributes are cached, and the output is collected into a buffer with ``str.join`` and written to ``ostream`` in large
+            chunks. ``ostream`` must be a binary file-like object in this mode. The output is the same either way
+        buffer_size (:obj:`int`): number of strings collected before the buffer is written in the fast mode
+        attr_cache_size (:obj:`int`): maximum number of escaped attributes cached in the fast mode
+        depth (:obj:`int`): depth of the elements generated, for generating a fragment of a document in the fast
+            mode, e.g. the children of an element that are spliced into the document later
     """
-    def __init__(self, ostream, pretty = False, skip_stringify = False):
+    def __init__(self, ostream, pretty = False, skip_stringify = False, *,
+            fast = False, buffer_size = 1 << 16, attr_cache_size = 4096, depth = 0):
         self.__ostream = ostream
         self.__pretty = pretty
         self.__skip_stringify = skip_stringify
+        self.__fast = fast
+        self.__buffer_size = buffer_size
+        self.__attr_cache_size = attr_cache_size
+        self.__depth = depth
 
     def __enter__(self):
-        self.__context = xmlfile(self.__ostream, encoding='ascii')
-        self._xf = self.__context.__enter__()
-        self._depth = 0
+        self._depth = self.__depth
+        if self.__fast:
+            self._buffer = []
+            self._attrs = OrderedDict() # (key, value) -> escaped attribute, for string values, in LRU order
+            self._indents = ['']    # depth -> indentation
+            self.element = self._fast_element
+            self.element_leaf = self._fast_element_leaf
+        else:
+            self.__context = xmlfile(self.__ostream, encoding='ascii')
+            self._xf = self.__context.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        if self.__fast:
+            del self.element, self.element_leaf
+            if exc_type is None:
+                self._flush()
+            return None
         return self.__context.__exit__(exc_type, exc_value, traceback)
 
     def _stringify(self, d):
@@ -67,6 +100,97 @@ class XMLGenerator(object):
             self.__gen._newline()
             return ret
 
+    # == fast mode =============================================================
+    def _flush(self):
+        self.__ostream.write(''.join(self._buffer).encode('ascii', 'xmlcharrefreplace'))
+        self._buffer = []
+
+    def _fast_indent(self, depth):
+        if not self.__pretty or depth == 0:
+            return ''
+        while depth >= len(self._indents):
+            self._indents.append('\t' * len(self._indents))
+        return self._indents[depth]
+
+    def _fast_start(self, tag, attrs):
+        """Append the indentation and the start tag of an element to the buffer."""
+        buf = self._buffer
+        buf.append(self._fast_indent(self._depth))
+        buf.append('<')
+        buf.append(tag)
+        if attrs:
+            cache = self._attrs
+            for k, v in attrs.items():
+                if (t := type(v)) is int:
+                    buf.append(' {}="{}"'.format(k, v))
+                elif t is float and not self.__skip_stringify:
+                    buf.append(' {}="{:g}"'.format(k, v))
+                elif (escaped := cache.get( (k, v) )) is None:
+                    escaped = cache[k, v] = ' {}="{}"'.format(k, str(v).translate(_ATTR_ESCAPES))
+                    if len(cache) > self.__attr_cache_size:
+                        cache.popitem(last = False)
+                    buf.append(escaped)
+                else:
+                    cache.move_to_end( (k, v) )
+                    buf.append(escaped)
+        buf.append('>')
+
+    def _fast_end(self, tag, indent = True):
+        """Append the indentation (if ``indent`` is set) and the end tag of an element and the newline after it to
+        the buffer."""
+        if indent:
+            self._buffer.append(self._fast_indent(self._depth))
+        self._buffer.append('</{}>'.format(tag))
+        if self.__pretty and self._depth > 0:
+            self._buffer.append('\n')
+        if len(self._buffer) >= self.__buffer_size:
+            self._flush()
+
+    class __FastXMLElementContextManager(object):
+        """Context manager for an XML element in the fast mode."""
+
+        __slots__ = ['gen', 'tag', 'attrs']
+        def __init__(self, gen, tag, attrs):
+            self.gen = gen
+            self.tag = tag
+            self.attrs = attrs
+
+        def __enter__(self):
+            self.gen._fast_start(self.tag, self.attrs)
+            self.gen._depth += 1
+            if self.gen._XMLGenerator__pretty:
+                self.gen._buffer.append('\n')
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.gen._depth -= 1
+            if exc_type is None:
+                self.gen._fast_end(self.tag)
+
+    def _fast_element(self, tag, attrs = None):
+        return self.__FastXMLElementContextManager(self, tag, attrs)
+
+    def _fast_element_leaf(self, tag, attrs = None, text = ''):
+        self._fast_start(tag, attrs)
+        lines = text.splitlines()
+        if len(lines) > 1:  # multiple lines
+            if self.__pretty and self._depth > 0:
+                self._buffer.append('\n')
+            indent = self._fast_indent(self._depth + 1)
+            newline = '\n' if self.__pretty else ''
+            for line in lines:
+                self._buffer.append(indent + line.strip().translate(_TEXT_ESCAPES) + newline)
+        elif len(lines) == 1:
+            self._buffer.append(lines[0].strip().translate(_TEXT_ESCAPES))
+        self._fast_end(tag, len(lines) > 1)
+
+    # == high-level API ======================================================
+    def flush(self):
+        """Write everything generated so far to the output stream."""
+        if self.__fast:
+            self._flush()
+        else:
+            self._xf.flush()
+
     def element(self, tag, attrs = None):
         return self.__XMLElementContextManager(self, tag, self._stringify(attrs or {}))
 
@@ -0,0 +1,115 @@
+# -*- encoding: ascii -*-
+
+from prga import *
+
+from lxml import etree
+import os, random
+
+import pytest
+
+def build_architecture(width = 4, height = 4):
+    """Build the abstract views of a small fabric. No pass is run on the returned context."""
+    ctx = Context()
+    gbl_clk = ctx.create_global("clk", is_clock = True)
+    gbl_clk.bind((0, 1), 0)
+    ctx.create_segment('L1', 4, 1)
+    ctx.create_segment('L2', 2, 2)
+
+    builder = ctx.build_io_block("iob")
+    o = builder.create_input("outpad", 1)
+    i = builder.create_output("inpad", 1)
+    builder.connect(builder.instances['io'].pins['inpad'], i)
+    builder.connect(o, builder.instances['io'].pins['outpad'])
+    iob = builder.commit()
+
+    iotiles = {}
+    for ori in Orientation:
+        iotiles[ori] = ctx.build_tile(iob, 2, name = "t_io_{}".format(ori.name[0]),
+                edge = OrientationTuple(False, **{ori.name: True})).fill( (1., 1.) ).auto_connect().commit()
+
+    builder = ctx.build_logic_block("clb")
+    clk = builder.create_global(gbl_clk, Orientation.south)
+    i = builder.create_input("i", 8, Orientation.west)
+    o = builder.create_output("o", 2, Orientation.east)
+    for j, inst in enumerate(builder.instantiate(ctx.primitives["lut4"], "lut", 2)):
+        ff = builder.instantiate(ctx.primitives["flipflop"], "ff{}".format(j))
+        builder.connect(clk, ff.pins['clk'])
+        builder.connect(i[4*j: 4*(j+1)], inst.pins['in'])
+        builder.connect(inst.pins['out'], o[j])
+        builder.connect(inst.pins['out'], ff.pins['D'], vpr_pack_patterns = ['lut_dff'])
+        builder.connect(ff.pins['Q'], o[j])
+    clb = builder.commit()
+    clbtile = ctx.build_tile(clb).fill( (0.4, 0.25) ).auto_connect().commit()
+
+    builder = ctx.build_array('top', width, height, set_as_top = True)
+    for x in range(width):
+        for y in range(height):
+            if x in (0, width - 1) and y in (0, height - 1):
+                continue
+            elif x == 0:
+                builder.instantiate(iotiles[Orientation.west], (x, y))
+            elif x == width - 1:
+                builder.instantiate(iotiles[Orientation.east], (x, y))
+            elif y == 0:
+                builder.instantiate(iotiles[Orientation.south], (x, y))
+            elif y == height - 1:
+                builder.instantiate(iotiles[Orientation.north], (x, y))
+            else:
+                builder.instantiate(clbtile, (x, y))
+    builder.fill( SwitchBoxPattern.cycle_free ).auto_connect().commit()
+    return ctx
+
+def build_fabric(directory, prog, width = 4, height = 4, **kwargs):
+    """Build a small fabric with the ``prog`` programming circuitry, and write the pickled context and the VPR
+    routing resource graph into ``directory``."""
+    ctx = build_architecture(width, height)
+    Flow(
+        Materialization(prog, **kwargs),
+        Translation(),
+        SwitchPathAnnotation(),
+        ProgCircuitryInsertion(),
+        VPRArchGeneration(os.path.join(directory, "arch.xml")),
+        VPR_RRG_Generation(os.path.join(directory, "rrg.xml")),
+        ).run(ctx)
+    ctx.pickle(os.path.join(directory, "ctx.pkl"))
+    return ctx
+
+def random_fasm(rrg, width = 4, height = 4, seed = 0):
+    """Pick random FASM features of the fabric built by `build_fabric`. Routing features are picked from the
+    ``fasm_features`` meta data in the routing resource graph ``rrg``. The features may conflict with each other,
+    which is fine for comparing bitstreams."""
+    rng, lines = random.Random(seed), []
+    for meta in etree.parse(rrg).iter("meta"):
+        if meta.get("name") == "fasm_features" and rng.random() < 0.3:
+            lines.extend(meta.text.split())
+    for x in range(1, width - 1):
+        for y in range(1, height - 1):
+            prefix = "i_tile_x{}y{}.i_blk".format(x, y)
+            for j in range(2):
+                lines.append("{}.lut_i{}.+".format(prefix, j))
+                lines.append("{}.lut_i{}.LUT[15:0]=16'h{:04x}".format(prefix, j, rng.getrandbits(16)))
+                for k in range(4):
+                    lines.append("{}.{{i[{}]->lut_i{}.in[{}]}}".format(prefix, 4*j+k, j, k))
+                lines.append("{}.{{lut_i{}.out->ff{}.D}}".format(prefix, j, j))
+                lines.append("{}.{{clk->ff{}.clk}}".format(prefix, j))
+                lines.append("{}.{{ff{}.Q->o[{}]}}".format(prefix, j, j))
+    rng.shuffle(lines)
+    return lines
+
+@pytest.fixture(scope = "session")
+def fabric(tmp_path_factory):
+    """Get the directory of a small fabric with the given programming circuitry, built once per session. The
+    directory contains the pickled context ``ctx.pkl``, the routing resource graph ``rrg.xml`` and random FASM
+    features ``design.fasm``."""
+    built = {}
+
+    def get(prog):
+        if (directory := built.get(prog)) is None:
+            directory = str(tmp_path_factory.mktemp(prog.lower()))
+            build_fabric(directory, prog, **({"chain_width": 2} if prog in ("scanchain", "pktchain") else {}))
+            with open(os.path.join(directory, "design.fasm"), "w") as f:
+                f.write("\n".join(random_fasm(os.path.join(directory, "rrg.xml"))) + "\n")
+            built[prog] = directory
+        return directory
+
+    return get
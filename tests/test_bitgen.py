@@ -0,0 +1,224 @@
+# -*- encoding: ascii -*-
+
+from prga.core.context import Context
+from conftest import random_fasm
+from prga.tools.bitgen.util import CRC, BitstreamSegmentTree, BitstreamIntervalBuilder, LRUCache
+from prga.tools.bitgen.scanchain import ScanchainBitstreamGenerator
+from prga.tools.bitgen.pktchain import PktchainBitstreamGenerator
+from prga.tools.bitgen.frame import FrameBitstreamGenerator
+from prga.tools.bitgen.benchmark import _crc_serial, _unshift_zeros_serial
+from prga.tools.bitgen.index import BitstreamIndex
+from prga.passes.bitgen import BitstreamIndexGeneration
+from prga.exception import PRGAAPIError
+
+from bitarray import bitarray
+from bitarray.util import int2ba
+import os, io, random, subprocess, sys
+
+import pytest
+
+def random_bits(rng, length):
+    bits = bitarray(endian = "little")
+    bits.frombytes(rng.getrandbits(length + 7 & ~7).to_bytes(length + 7 >> 3, "little"))
+    del bits[length:]
+    return bits
+
+# ----------------------------------------------------------------------------
+# -- CRC ---------------------------------------------------------------------
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("lanes", [1, 2, 4, 8])
+@pytest.mark.parametrize("length", [0, 1, 7, 8, 9, 1023, 32768])
+def test_crc_lanes(length, lanes):
+    bits = random_bits(random.Random(length * 8 + lanes), length)
+    checksums = CRC.checksum_lanes(bits, lanes)
+    assert checksums == _crc_serial(bits, lanes)
+    for crc in checksums:
+        assert CRC.unshift_zeros(crc, length // lanes) == _unshift_zeros_serial(crc, length // lanes)
+
+def test_pktchain_bitstream(fabric, tmp_path, monkeypatch):
+    directory = fabric("pktchain")
+    fasm = os.path.join(directory, "design.fasm")
+    context = Context.unpickle(os.path.join(directory, "ctx.pkl"))
+
+    PktchainBitstreamGenerator(context).generate_bitstream(fasm, str(tmp_path / "table.memh"), [])
+    monkeypatch.setattr(CRC, "checksum_lanes", staticmethod(_crc_serial))
+    monkeypatch.setattr(CRC, "unshift_zeros", staticmethod(_unshift_zeros_serial))
+    PktchainBitstreamGenerator(context).generate_bitstream(fasm, str(tmp_path / "serial.memh"), [])
+
+    assert (tmp_path / "table.memh").read_bytes() == (tmp_path / "serial.memh").read_bytes()
+
+# ----------------------------------------------------------------------------
+# -- Memoization -------------------------------------------------------------
+# ----------------------------------------------------------------------------
+def test_lru_cache():
+    cache = LRUCache(3)
+    for key in "abc":
+        cache[key] = key.upper()
+    assert cache.get("a") == "A"            # "a" becomes the most recently used entry
+    cache["d"] = "D"                        # evicts "b"
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert cache.get("b", 0) == 0
+    cache["c"] = "C2"                       # updating an entry does not grow the cache, and marks it used
+    cache["e"] = "E"                        # evicts "a"
+    assert len(cache) == 3
+    assert [cache.get(key) for key in "acde"] == [None, "C2", "D", "E"]
+    assert (cache.hits, cache.misses) == (4, 3)
+
+def test_cache_stats(fabric):
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+    generator = ScanchainBitstreamGenerator(context)
+    generator.parse_fasm(io.StringIO("i_tile_x1y1.i_blk.lut_i0.+\n"))
+    assert generator.cache_stats["prefix"][0] == 0
+    # "i_tile_x1y1.i_blk" is resolved from the cache
+    generator.parse_fasm(io.StringIO("i_tile_x1y1.i_blk.lut_i1.+\n"))
+    hits, misses = generator.cache_stats["prefix"]
+    assert hits == 1 and misses > 0
+    # so is the composed bitmap of a repeated feature
+    generator.parse_fasm(io.StringIO("i_tile_x1y1.i_blk.lut_i1.+\n"))
+    assert generator.cache_stats["compose"][0] == 1
+
+# ----------------------------------------------------------------------------
+# -- Frame Segments ----------------------------------------------------------
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("min_gap", [0, 64])
+@pytest.mark.parametrize("size", [100, 1000, 10000])
+def test_segment_backends(size, min_gap):
+    rng, writes = random.Random(size + min_gap), []
+    for _ in range(size):
+        low, length = rng.randrange(1 << 20), rng.randint(1, 64)
+        writes.append( (low, low + length, int2ba(rng.getrandbits(length), length, 'little')) )
+
+    def run(backend):
+        segments = backend(min_gap)
+        for write in writes:
+            segments.set_data(*write)
+        return list(segments.itertree())
+
+    assert run(BitstreamIntervalBuilder) == run(BitstreamSegmentTree)
+
+def test_frame_bitstream(fabric, tmp_path):
+    directory = fabric("frame")
+    fasm = os.path.join(directory, "design.fasm")
+    context = Context.unpickle(os.path.join(directory, "ctx.pkl"))
+
+    for backend in ("batch", "tree"):
+        FrameBitstreamGenerator(context, segment_backend = backend).generate_bitstream(fasm,
+                str(tmp_path / "{}.memh".format(backend)), [])
+
+    assert (tmp_path / "batch.memh").read_bytes() == (tmp_path / "tree.memh").read_bytes()
+
+def _frame_memory(generator, *bitstreams):
+    """Replay ``bitstreams`` in order with `FrameBitstreamGenerator.read_bitstream` and return the non-zero words
+    of the resulting configuration memory."""
+    memory = {}
+    for bitstream in bitstreams:
+        generator.read_bitstream(bitstream)
+        memory.update(generator._iter_words(generator._loaded))
+    return {addr: word for addr, word in memory.items() if word.any()}
+
+def test_frame_diff_bitstream(fabric, tmp_path):
+    directory = fabric("frame")
+    context = Context.unpickle(os.path.join(directory, "ctx.pkl"))
+    fasm = {"a": os.path.join(directory, "design.fasm"), "b": str(tmp_path / "b.fasm")}
+    with open(fasm["b"], "w") as f:
+        f.write("\n".join(random_fasm(os.path.join(directory, "rrg.xml"), seed = 1)) + "\n")
+
+    for name, f in fasm.items():
+        FrameBitstreamGenerator(context).generate_bitstream(f, str(tmp_path / "{}.memh".format(name)), [])
+
+    generator = FrameBitstreamGenerator(context)
+    for old, new in (("a", "b"), ("b", "a"), ("a", "a")):
+        diff = str(tmp_path / "{}_{}.memh".format(old, new))
+        FrameBitstreamGenerator(context).generate_bitstream(fasm[new], diff, ["--diff-against", fasm[old]])
+        expected = _frame_memory(generator, str(tmp_path / "{}.memh".format(new)))
+        assert expected
+        assert _frame_memory(generator, str(tmp_path / "{}.memh".format(old)), diff) == expected
+
+        if old == new:
+            generator.read_bitstream(diff)
+            assert generator._loaded == []
+
+# ----------------------------------------------------------------------------
+# -- Parallel Generation -----------------------------------------------------
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("jobs", [2, 3])
+@pytest.mark.parametrize("prog, generator, kwargs", [
+    ("scanchain", ScanchainBitstreamGenerator, {}),
+    ("pktchain", PktchainBitstreamGenerator, {}),
+    ("frame", FrameBitstreamGenerator, {"segment_backend": "batch"}),
+    ("frame", FrameBitstreamGenerator, {"segment_backend": "tree"}),
+    ])
+def test_parallel_bitstream(fabric, tmp_path, prog, generator, kwargs, jobs):
+    directory = fabric(prog)
+    fasm = os.path.join(directory, "design.fasm")
+    context = Context.unpickle(os.path.join(directory, "ctx.pkl"))
+
+    generator(context, **kwargs).generate_bitstream(fasm, str(tmp_path / "serial.memh"), [])
+    generator(context, jobs = jobs, **kwargs).generate_bitstream(fasm, str(tmp_path / "parallel.memh"), [])
+    assert (tmp_path / "serial.memh").read_bytes()
+    assert (tmp_path / "parallel.memh").read_bytes() == (tmp_path / "serial.memh").read_bytes()
+
+# ----------------------------------------------------------------------------
+# -- Precompiled Index -------------------------------------------------------
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("prog, generator", [
+    ("scanchain", ScanchainBitstreamGenerator),
+    ("pktchain", PktchainBitstreamGenerator),
+    ("frame", FrameBitstreamGenerator),
+    ])
+def test_index_bitstream(fabric, tmp_path, prog, generator):
+    directory = fabric(prog)
+    fasm = os.path.join(directory, "design.fasm")
+    context = Context.unpickle(os.path.join(directory, "ctx.pkl"))
+    BitstreamIndexGeneration(str(tmp_path / "bitgen.idx")).run(context)
+
+    generator(context).generate_bitstream(fasm, str(tmp_path / "context.memh"), [])
+    generator(None, index = BitstreamIndex.open(str(tmp_path / "bitgen.idx"))).generate_bitstream(fasm,
+            str(tmp_path / "index.memh"), [])
+    assert (tmp_path / "context.memh").read_bytes()
+    assert (tmp_path / "index.memh").read_bytes() == (tmp_path / "context.memh").read_bytes()
+
+    # command line
+    result = subprocess.run([sys.executable, "-m", "prga.tools.bitgen", "-i", str(tmp_path / "bitgen.idx"),
+        "-f", fasm, "-o", str(tmp_path / "cli.memh")],
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.returncode == 0
+    assert (tmp_path / "cli.memh").read_bytes() == (tmp_path / "context.memh").read_bytes()
+
+# ----------------------------------------------------------------------------
+# -- Bitstream Decoding ------------------------------------------------------
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("prog, generator", [
+    ("scanchain", ScanchainBitstreamGenerator),
+    ("pktchain", PktchainBitstreamGenerator),
+    ("frame", FrameBitstreamGenerator),
+    ])
+def test_decode_bitstream(fabric, tmp_path, prog, generator):
+    directory = fabric(prog)
+    context = Context.unpickle(os.path.join(directory, "ctx.pkl"))
+    generator(context).generate_bitstream(os.path.join(directory, "design.fasm"), str(tmp_path / "design.memh"), [])
+
+    decoder = generator(context)
+    decoder.read_bitstream(str(tmp_path / "design.memh"))
+    with open(tmp_path / "decoded.fasm", "w") as f:
+        for feature in decoder.decode():
+            f.write(feature + "\n")
+    assert decoder.verify_fasm(str(tmp_path / "decoded.fasm")) == ([], [])
+
+    generator(context).generate_bitstream(str(tmp_path / "decoded.fasm"), str(tmp_path / "decoded.memh"), [])
+    assert (tmp_path / "decoded.memh").read_bytes() == (tmp_path / "design.memh").read_bytes()
+
+    # command line: decode and verify against the decoded FASM file
+    result = subprocess.run([sys.executable, "-m", "prga.tools.bitgen", "-c", os.path.join(directory, "ctx.pkl"),
+        "-b", str(tmp_path / "design.memh"), "-f", str(tmp_path / "decoded.fasm"), "-o", str(tmp_path / "cli.fasm")],
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.returncode == 0
+    assert (tmp_path / "cli.fasm").read_bytes() == (tmp_path / "decoded.fasm").read_bytes()
+
+def test_read_binary_as_hex(fabric, tmp_path):
+    context = Context.unpickle(os.path.join(fabric("frame"), "ctx.pkl"))
+    FrameBitstreamGenerator(context, output_format = "bin").generate_bitstream(
+            os.path.join(fabric("frame"), "design.fasm"), str(tmp_path / "design.bin"), [])
+    with pytest.raises(PRGAAPIError, match = "--format bin"):
+        FrameBitstreamGenerator(context).read_bitstream(str(tmp_path / "design.bin"))
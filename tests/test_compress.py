@@ -0,0 +1,61 @@
+# -*- encoding: ascii -*-
+
+from prga.compress import ParallelGzipWriter, open_output
+
+import io, gzip, random, multiprocessing
+
+import pytest
+
+def sample(seed, size):
+    """Mix of random and repetitive bytes, so blocks both compress and refer to the previous blocks."""
+    rng, chunks, length = random.Random(seed), [], 0
+    while length < size:
+        if rng.random() < 0.5:
+            chunk = rng.getrandbits(8 * 64).to_bytes(64, "little")
+        else:
+            chunk = b"<edge src_node=\"%d\" sink_node=\"%d\"/>\n" % (rng.randrange(1000), rng.randrange(1000))
+        chunks.append(chunk)
+        length += len(chunk)
+    return b''.join(chunks)
+
+@pytest.mark.parametrize("threads", [1, 4])
+@pytest.mark.parametrize("compresslevel", [0, 1, 6, 9])
+def test_parallel_gzip(compresslevel, threads):
+    data, rng = sample(compresslevel, 100000), random.Random(threads)
+    f = io.BytesIO()
+    with ParallelGzipWriter(f, compresslevel = compresslevel, threads = threads, block_size = 1000) as writer:
+        # writes smaller and larger than a block
+        start = 0
+        while start < len(data):
+            size = rng.choice([1, 17, 999, 1000, 1001, 4567])
+            assert writer.write(data[start : start + size]) == len(data[start : start + size])
+            start += size
+    assert writer.closed
+    assert gzip.decompress(f.getvalue()) == data
+
+def test_parallel_gzip_empty():
+    f = io.BytesIO()
+    ParallelGzipWriter(f, block_size = 1000).close()
+    assert gzip.decompress(f.getvalue()) == b''
+
+def test_open_output(tmp_path):
+    data = sample(0, 10000)
+    with open(tmp_path / "out.xml.gz", "wb") as raw:
+        with open_output(raw, raw.name, compresslevel = 6) as f:
+            assert isinstance(f, ParallelGzipWriter)
+            f.write(data)
+    compressed = (tmp_path / "out.xml.gz").read_bytes()
+    assert gzip.decompress(compressed) == data
+    # the original file name is kept in the header
+    assert compressed[10:].startswith(b"out.xml\0")
+
+    with open(tmp_path / "out.xml", "wb") as raw:
+        assert open_output(raw, raw.name) is raw
+
+def _default_threads():
+    return ParallelGzipWriter(io.BytesIO()).threads
+
+def test_default_threads():
+    assert 1 <= _default_threads() <= ParallelGzipWriter.max_default_threads
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        assert pool.apply(_default_threads) == 1
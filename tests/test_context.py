@@ -0,0 +1,65 @@
+# -*- encoding: ascii -*-
+
+from prga.core.common import ModuleView
+from prga.core.context import Context
+from prga.core.shard import ShardedModuleDatabase
+from prga.passes.flow import Flow
+from prga.passes.rtl import VerilogCollection
+from prga.tools.bitgen.scanchain import ScanchainBitstreamGenerator
+
+import os
+
+def read_tree(directory):
+    """Read all files under ``directory`` into a mapping from relative paths to contents."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            with open(os.path.join(root, name), "rb") as f:
+                files[os.path.relpath(os.path.join(root, name), directory)] = f.read()
+    return files
+
+def test_sharded_pickle(fabric, tmp_path, monkeypatch):
+    directory = fabric("scanchain")
+    context = Context.unpickle(os.path.join(directory, "ctx.pkl"))
+    context.pickle(str(tmp_path / "sharded"), sharded = True)
+
+    # modules are loaded lazily
+    sharded = Context.unpickle(str(tmp_path / "sharded"))
+    assert isinstance(sharded._database, ShardedModuleDatabase)
+    assert len(sharded._database._loaded) < len(sharded._database)
+    clb = sharded.database[ModuleView.abstract, "clb"]
+    assert clb.name == "clb"
+    assert len(sharded._database._loaded) < len(sharded._database)
+
+    # module iteration order is kept
+    assert ([ShardedModuleDatabase._token(k) for k in sharded.database] ==
+            [ShardedModuleDatabase._token(k) for k in context.database])
+
+    # RTL and bitstream are the same as the ones generated from the monolithic pickle. RTL is only generated into
+    # relative paths
+    monkeypatch.chdir(tmp_path)
+    for name, ctx in (("monolithic", Context.unpickle(os.path.join(directory, "ctx.pkl"))),
+            ("sharded", Context.unpickle(str(tmp_path / "sharded")))):
+        Flow(VerilogCollection(os.path.join(name, "rtl"))).run(ctx)
+        ScanchainBitstreamGenerator(ctx).generate_bitstream(os.path.join(directory, "design.fasm"),
+                str(tmp_path / name / "design.memh"), [])
+    assert (rtl := read_tree(tmp_path / "monolithic" / "rtl"))
+    assert read_tree(tmp_path / "sharded" / "rtl") == rtl
+    assert ((tmp_path / "sharded" / "design.memh").read_bytes() ==
+            (tmp_path / "monolithic" / "design.memh").read_bytes())
+
+def test_sharded_pickle_cycle(fabric, tmp_path):
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+    clb, iob = context.database[ModuleView.abstract, "clb"], context.database[ModuleView.abstract, "iob"]
+    clb.peer, iob.peer = iob.ports["outpad"], clb.ports["i"]
+    context.pickle(str(tmp_path / "sharded"), sharded = True)
+
+    shards = ShardedModuleDatabase.read_index(str(tmp_path / "sharded"))["shards"]
+    tokens = [ShardedModuleDatabase._token( (ModuleView.abstract, name) ) for name in ("clb", "iob")]
+    assert shards[tokens[0]] == shards[tokens[1]]
+    assert len(set(shards.values())) == len(shards) - 1
+
+    sharded = Context.unpickle(str(tmp_path / "sharded"))
+    clb = sharded.database[ModuleView.abstract, "clb"]
+    iob = sharded._database._loaded[ModuleView.abstract, "iob"]
+    assert clb.peer is iob.ports["outpad"] and iob.peer is clb.ports["i"]
@@ -0,0 +1,294 @@
+# -*- encoding: ascii -*-
+
+from prga.core.common import NetClass
+from prga.core.context import Context
+from prga.netlist import Module, ModuleUtils, NetUtils, PortDirection, Const
+from prga.netlist.module.graph import IndexedDiGraph
+from prga.netlist.module.instance import HierarchicalInstance
+from prga.netlist.net.bus import HierarchicalPin
+from prga.exception import PRGAInternalError
+
+import os, sys, gc, pickle, weakref
+
+import pytest
+
+def create_module(coalesce_connections):
+    m = Module("m", coalesce_connections = coalesce_connections)
+    for name, width, direction in (("a", 4, PortDirection.input_), ("b", 4, PortDirection.input_),
+            ("x", 4, PortDirection.output), ("y", 4, PortDirection.output), ("z", 1, PortDirection.output)):
+        ModuleUtils.create_port(m, name, width, direction)
+    return m
+
+def connections(m):
+    """Get the source of every sink bit in ``m``."""
+    conns = {}
+    for port in m.ports.values():
+        if port.direction.is_output:
+            if m.coalesce_connections:
+                conns[port.name] = repr(NetUtils.get_source(port))
+            else:
+                for i in range(len(port)):
+                    conns[port.name, i] = repr(NetUtils.get_source(port[i]))
+    return conns
+
+# ----------------------------------------------------------------------------
+# -- Bulk Connections --------------------------------------------------------
+# ----------------------------------------------------------------------------
+def _bit_pairs(ports):
+    yield ports["a"][0:2], ports["y"][2:4]
+    # the bits of "a" are broken by the pair above, so "a"[3] is a bit now
+    yield ports["a"][3], ports["z"]
+    yield ports["b"], ports["x"]
+
+_pairs = {
+        "port":     lambda p: [(p["a"], p["x"]), (p["b"], p["y"])],
+        "const":    lambda p: [(Const(5, 4), p["x"]), (Const(1, 1), p["z"]), (Const(width = 4), p["y"])],
+        "slice":    lambda p: [(p["a"][1], p["z"]), (p["a"][2:4], p["x"][0:2]), (p["b"][0:2], p["x"][2:4])],
+        "bit":      lambda p: _bit_pairs(p),
+        }
+
+@pytest.mark.parametrize("coalesce_connections", [False, True])
+@pytest.mark.parametrize("pairs", list(_pairs))
+def test_connect_bulk(pairs, coalesce_connections):
+    expected = create_module(coalesce_connections)
+    try:
+        for src, sink in _pairs[pairs](expected.ports):
+            NetUtils.connect(src, sink)
+    except PRGAInternalError:
+        with pytest.raises(PRGAInternalError):
+            m = create_module(coalesce_connections)
+            NetUtils.connect_bulk(_pairs[pairs](m.ports), module = m)
+        return
+
+    m = create_module(coalesce_connections)
+    NetUtils.connect_bulk(_pairs[pairs](m.ports), module = m)
+    assert connections(m) == connections(expected)
+
+# ----------------------------------------------------------------------------
+# -- Frozen Modules ----------------------------------------------------------
+# ----------------------------------------------------------------------------
+def create_frozen_module(coalesce_connections):
+    cell = Module("cell", is_cell = True)
+    ModuleUtils.create_port(cell, "i", 4, PortDirection.input_)
+    ModuleUtils.create_port(cell, "o", 4, PortDirection.output)
+    NetUtils.create_timing_arc("comb_bitwise", cell.ports["i"], cell.ports["o"])
+
+    m = create_module(coalesce_connections)
+    c = ModuleUtils.instantiate(m, cell, "c")
+    NetUtils.connect(m.ports["a"], c.pins["i"], tag = "a2i")
+    NetUtils.connect(c.pins["o"], m.ports["x"])
+    NetUtils.connect(Const(1, 1), m.ports["z"])
+    if coalesce_connections:
+        NetUtils.connect(c.pins["o"], m.ports["y"])
+    else:
+        NetUtils.connect(c.pins["o"][0:2], m.ports["y"][0:2])
+        NetUtils.connect(m.ports["b"][2:4], m.ports["y"][2:4])
+    return m
+
+def frozen_view(m):
+    """Get the source, sinks and connection attributes of every net in ``m``."""
+    view = {}
+    for bus in list(m.ports.values()) + list(m.instances["c"].pins.values()):
+        for net in ([bus] if bus._coalesce_connections else bus._bits):
+            if bus.is_sink:
+                view[repr(net), "source"] = repr(NetUtils.get_source(net))
+            if bus.is_source:
+                view[repr(net), "sinks"] = tuple(map(repr, NetUtils.get_sinks(net)))
+                for sink in NetUtils.get_sinks(net):
+                    conn = NetUtils.get_connection(net, sink)
+                    view[repr(net), repr(sink)] = repr(conn.arc), getattr(conn, "tag", None)
+    return view
+
+@pytest.mark.parametrize("coalesce_connections", [False, True])
+def test_freeze(coalesce_connections):
+    m = create_frozen_module(coalesce_connections)
+    expected = frozen_view(m)
+    m.freeze()
+    assert m.is_frozen
+    assert frozen_view(m) == expected
+    assert NetUtils.get_connection(m.ports["a"], m.ports["z"]) is None
+
+    # the module and its connections are read-only
+    with pytest.raises(PRGAInternalError):
+        NetUtils.connect(m.ports["b"], m.instances["c"].pins["i"])
+    with pytest.raises(PRGAInternalError):
+        NetUtils.disconnect(m.ports["a"], m.instances["c"].pins["i"])
+    with pytest.raises(PRGAInternalError):
+        NetUtils.connect_bulk([(m.ports["b"], m.ports["x"])], module = m)
+    with pytest.raises(PRGAInternalError):
+        ModuleUtils.instantiate(m, m.instances["c"].model, "d")
+    with pytest.raises(PRGAInternalError):
+        NetUtils.get_connection(m.ports["a"], m.instances["c"].pins["i"]).tag = "foo"
+
+    # timing arcs in a frozen cell module are kept, but new ones cannot be created
+    cell = m.instances["c"].model
+    cell.freeze()
+    assert len(NetUtils.get_timing_arcs(source = cell.ports["i"])) == 1
+    with pytest.raises(PRGAInternalError):
+        NetUtils.create_timing_arc("comb_matrix", cell.ports["i"], cell.ports["o"])
+
+    # pickle round trip
+    m = pickle.loads(pickle.dumps(m))
+    assert m.is_frozen and m.instances["c"].model.is_frozen
+    assert frozen_view(m) == expected
+    with pytest.raises(PRGAInternalError):
+        NetUtils.connect(m.ports["b"], m.instances["c"].pins["i"])
+
+# ----------------------------------------------------------------------------
+# -- Hierarchical Instances --------------------------------------------------
+# ----------------------------------------------------------------------------
+def create_hierarchy():
+    cell = Module("cell", is_cell = True)
+    ModuleUtils.create_port(cell, "i", 1, PortDirection.input_)
+    mid = Module("mid")
+    ModuleUtils.instantiate(mid, cell, "c")
+    top = Module("top")
+    ModuleUtils.instantiate(top, mid, "m")
+    return top
+
+def test_hierarchy_interning():
+    top = create_hierarchy()
+    c, m = top.instances["m"].model.instances["c"], top.instances["m"]
+    interned = HierarchicalInstance._HierarchicalInstance__interned
+    count = len(interned)
+
+    hierarchy = c._extend_hierarchy(above = m)
+    assert isinstance(hierarchy, HierarchicalInstance)
+    assert c._extend_hierarchy(above = m) is hierarchy
+    assert m._extend_hierarchy(below = c) is hierarchy
+    assert HierarchicalInstance( (c, m) ) is hierarchy
+    assert hierarchy.pins["i"] is hierarchy.pins["i"]
+    assert len(interned) == count + 1
+
+    # interned objects are released once the references drop
+    ref, pin = weakref.ref(hierarchy), weakref.ref(hierarchy.pins["i"])
+    del hierarchy
+    gc.collect()
+    assert ref() is None and pin() is None
+    assert len(interned) == count
+
+def test_hierarchy_pickle():
+    top = create_hierarchy()
+    hierarchy = top.instances["m"].model.instances["c"]._extend_hierarchy(above = top.instances["m"])
+    pin = hierarchy.pins["i"]
+
+    top, hierarchy, pin = pickle.loads(pickle.dumps( (top, hierarchy, pin) ))
+    # unpickled hierarchical instances and pins are interned again
+    c, m = top.instances["m"].model.instances["c"], top.instances["m"]
+    assert hierarchy.hierarchy == (c, m)
+    assert c._extend_hierarchy(above = m) is hierarchy
+    assert hierarchy.pins["i"] is pin
+    assert HierarchicalPin(hierarchy, c.model.ports["i"]) is pin
+
+# ----------------------------------------------------------------------------
+# -- Reduced Graphs ----------------------------------------------------------
+# ----------------------------------------------------------------------------
+def _blackbox_instance(i):
+    return i.model.module_class.is_block or i.model.module_class.is_routing_box
+
+def _conn_graph(top, **kwargs):
+    """Reduce the connection graph of ``top`` with the arguments used by VPR RRG generation."""
+    return ModuleUtils.reduce_conn_graph(top,
+            coalesce_connections = True,
+            blackbox_instance = _blackbox_instance,
+            node_key = lambda n: (None if n.net_type.is_port or not _blackbox_instance(n.instance) else
+                NetUtils._reference(n)),
+            node_attrs = lambda n: {"width": len(n)},
+            edge_attrs = lambda p: {"length": len(p)},
+            **kwargs)
+
+def _timing_graph(module, **kwargs):
+    """Reduce the timing graph of ``module`` with the arguments used by switch path annotation."""
+    def node_key(n):
+        bus = n.bus if n.net_type.is_bit or n.net_type.is_slice else n
+        model = bus.model if bus.net_type.is_pin else bus
+        if getattr(model, "net_class", None) in (NetClass.user, NetClass.block, NetClass.global_, NetClass.segment, NetClass.bridge):
+            return NetUtils._reference(n)
+    return ModuleUtils.reduce_timing_graph(module,
+            blackbox_instance = lambda i: not i.model.module_class.is_switch,
+            node_key = node_key,
+            **kwargs)
+
+def _attrs(attrs):
+    # nets that are not persistent, e.g. bits of buses that are not broken, are created on every access
+    return {k: repr(v) for k, v in attrs.items()}
+
+def assert_same_graph(indexed, g):
+    multigraph = g.is_multigraph()
+    assert indexed.is_multigraph() == multigraph
+    assert indexed.number_of_nodes() == g.number_of_nodes()
+    assert indexed.number_of_edges() == g.number_of_edges()
+
+    assert list(indexed.nodes) == list(g.nodes)
+    for node in g.nodes:
+        assert node in indexed.nodes and indexed.has_node(node)
+        assert _attrs(indexed.nodes[node]) == _attrs(g.nodes[node])
+        assert list(indexed.predecessors(node)) == list(g.predecessors(node))
+        assert list(indexed.successors(node)) == list(g.successors(node))
+
+    edges = list(g.edges(keys = True) if multigraph else g.edges)
+    assert set(indexed.edges) == set(edges)
+    for edge in edges:
+        assert indexed.has_edge(*edge) and edge in indexed.edges
+        assert _attrs(indexed.edges[edge]) == _attrs(g.edges[edge])
+        if multigraph:
+            assert indexed.has_edge(*edge[:2])
+    assert not indexed.has_edge(next(iter(g.nodes)), next(iter(g.nodes)), "nonexistent")
+
+    converted = indexed.to_networkx()
+    for view in (lambda g: g.nodes(data = True),
+            lambda g: g.edges(data = True, keys = True) if multigraph else g.edges(data = True)):
+        assert [item[:-1] + (_attrs(item[-1]), ) for item in view(converted)] == \
+                [item[:-1] + (_attrs(item[-1]), ) for item in view(g)]
+
+@pytest.mark.parametrize("threshold", [4096, 4])
+def test_indexed_conn_graph(fabric, monkeypatch, threshold):
+    # a small threshold folds the hash index of new edges into the CSR tables many times
+    monkeypatch.setattr(IndexedDiGraph, "_PENDING_THRESHOLD", threshold)
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+    g = _conn_graph(context.top)
+    assert g.number_of_edges() > 0
+    assert_same_graph(_conn_graph(context.top, backend = "indexed"), g)
+
+@pytest.mark.parametrize("threshold", [4096, 4])
+def test_indexed_timing_graph(fabric, monkeypatch, threshold):
+    monkeypatch.setattr(IndexedDiGraph, "_PENDING_THRESHOLD", threshold)
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+    for module in context.database.values():
+        if module.view.is_design and module.module_class.is_routing_box:
+            g = _timing_graph(module)
+            assert g.number_of_edges() > 0
+            assert_same_graph(_timing_graph(module, backend = "indexed"), g)
+
+def test_compositional_conn_graph_chain():
+    # a chain of transparent instances longer than the recursion limit. `prga.core.context` raises the limit, so a
+    #   lower one is used while reducing the graph
+    limit = 1000
+    cell = Module("cell", is_cell = True)
+    ModuleUtils.create_port(cell, "i", 1, PortDirection.input_)
+    ModuleUtils.create_port(cell, "o", 1, PortDirection.output)
+    wire = Module("wire", coalesce_connections = True)
+    NetUtils.connect(ModuleUtils.create_port(wire, "i", 1, PortDirection.input_),
+            ModuleUtils.create_port(wire, "o", 1, PortDirection.output))
+
+    top = Module("top", coalesce_connections = True)
+    prev = ModuleUtils.instantiate(top, cell, "src").pins["o"]
+    for i in range(limit * 2):
+        inst = ModuleUtils.instantiate(top, wire, "w{}".format(i))
+        NetUtils.connect(prev, inst.pins["i"])
+        prev = inst.pins["o"]
+    NetUtils.connect(prev, ModuleUtils.instantiate(top, cell, "sink").pins["i"])
+
+    graphs, old_limit = [], sys.getrecursionlimit()
+    sys.setrecursionlimit(limit)
+    try:
+        for summaries in ({}, None):
+            g = ModuleUtils.reduce_conn_graph(top,
+                    coalesce_connections = True,
+                    node_key = lambda n: None if n.net_type.is_port or not n.instance.model.is_cell else
+                        NetUtils._reference(n),
+                    summaries = summaries)
+            graphs.append([(u, v, len(path)) for u, v, path in g.edges(data = "path")])
+    finally:
+        sys.setrecursionlimit(old_limit)
+    assert graphs[0] == graphs[1] == [(graphs[0][0][0], graphs[0][0][1], limit * 4 + 2)]
@@ -0,0 +1,155 @@
+# -*- encoding: ascii -*-
+
+from prga import *
+from prga.netlist import ModuleUtils
+from conftest import build_architecture
+from test_context import read_tree
+
+import logging, os, io
+
+import pytest
+
+def add_flipflop(context):
+    """Change the abstract view of ``clb`` by adding a flipflop to it."""
+    ModuleUtils.instantiate(context.database[ModuleView.abstract, "clb"], context.primitives["flipflop"], "ff_x")
+
+def build_rtl(context, prog, directory, jobs = 1):
+    Flow(
+        Materialization(prog, chain_width = 2),
+        Translation(jobs = jobs),
+        SwitchPathAnnotation(),
+        ProgCircuitryInsertion(),
+        VerilogCollection(directory),
+        ).run(context)
+
+# ----------------------------------------------------------------------------
+# -- Translation -------------------------------------------------------------
+# ----------------------------------------------------------------------------
+@pytest.mark.parametrize("prog", ["scanchain", "pktchain"])
+def test_incremental_translation(prog, tmp_path, monkeypatch, caplog):
+    # RTL is only generated into relative paths
+    monkeypatch.chdir(tmp_path)
+
+    context = build_architecture()
+    add_flipflop(context)
+    build_rtl(context, prog, "scratch")
+
+    context = build_architecture()
+    build_rtl(context, prog, "incremental")
+    add_flipflop(context)
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger = "prga.passes.translation"):
+        Flow(
+            Translation(),
+            SwitchPathAnnotation(),
+            ProgCircuitryInsertion(),
+            VerilogCollection("incremental"),
+            ).run(context)
+    translated = sum(message.startswith(" .. Translated") for message in caplog.messages)
+    design = sum(1 for view, _ in context.database if view is ModuleView.design)
+    if context.prog_entry.supports_incremental_insertion:
+        assert 0 < translated < design
+    else:
+        assert translated > 0
+
+    assert (rtl := read_tree(tmp_path / "scratch"))
+    assert read_tree(tmp_path / "incremental") == rtl
+
+    # nothing is translated again if nothing changed
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger = "prga.passes.translation"):
+        Flow(Translation()).run(context)
+    assert "0 modules to be translated (0 changed)" in caplog.messages
+    assert not any(message.startswith(" .. Translated") for message in caplog.messages)
+
+@pytest.mark.parametrize("jobs", [2, 4])
+@pytest.mark.parametrize("prog", ["scanchain", "pktchain"])
+def test_parallel_translation(prog, jobs, tmp_path, monkeypatch):
+    # RTL is only generated into relative paths
+    monkeypatch.chdir(tmp_path)
+
+    serial = build_architecture()
+    build_rtl(serial, prog, "serial")
+
+    parallel = build_architecture()
+    build_rtl(parallel, prog, "parallel", jobs)
+
+    # some keys refer to modules, which are not equal across contexts
+    assert list(map(repr, parallel.database)) == list(map(repr, serial.database))
+    assert (rtl := read_tree(tmp_path / "serial"))
+    assert read_tree(tmp_path / "parallel") == rtl
+
+# ----------------------------------------------------------------------------
+# -- Flow Checkpoints --------------------------------------------------------
+# ----------------------------------------------------------------------------
+def test_pass_digest():
+    assert (Flow._pass_digest(BitstreamIndexGeneration(io.BytesIO())) ==
+            Flow._pass_digest(BitstreamIndexGeneration(io.BytesIO())))
+    assert Flow._pass_digest(Translation(jobs = 1)) == Flow._pass_digest(Translation(jobs = 4))
+    assert Flow._pass_digest(VerilogCollection("rtl")) != Flow._pass_digest(VerilogCollection("src"))
+    assert (Flow._pass_digest(Materialization("scanchain", chain_width = 1)) !=
+            Flow._pass_digest(Materialization("scanchain", chain_width = 2)))
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_parallel_flow(jobs, tmp_path, monkeypatch, caplog):
+    # RTL is only generated into relative paths
+    monkeypatch.chdir(tmp_path)
+
+    def flow(directory, jobs):
+        return Flow(
+            Materialization("scanchain", chain_width = 2),
+            Translation(),
+            SwitchPathAnnotation(),
+            ProgCircuitryInsertion(),
+            VerilogCollection(os.path.join(directory, "rtl")),
+            VPRArchGeneration(os.path.join(directory, "arch.xml")),
+            VPR_RRG_Generation(os.path.join(directory, "rrg.xml")),
+            jobs = jobs,
+            )
+
+    flow("serial", 1).run(serial := build_architecture())
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger = "prga.passes.flow"):
+        flow("parallel", jobs).run(parallel := build_architecture())
+    concurrent = [message for message in caplog.messages if message.startswith("running passes concurrently")]
+    if jobs > 1:
+        # RTL and VPR architecture are generated concurrently. RRG generation depends on the architecture, and
+        #   reads the summary updated by it in the worker process
+        assert concurrent == ["running passes concurrently: 'rtl.verilog', 'vpr.arch'"]
+    else:
+        assert not concurrent
+
+    assert parallel.summary.vpr["arch"] == os.path.join("parallel", "arch.xml")
+    assert parallel.summary.vpr["rrg"] == os.path.join("parallel", "rrg.xml")
+    assert len(parallel.summary.rtl["sources"]) == len(serial.summary.rtl["sources"])
+    assert (files := read_tree(tmp_path / "serial"))
+    assert read_tree(tmp_path / "parallel") == files
+
+def test_flow_resume(tmp_path, monkeypatch, caplog):
+    # RTL is only generated into relative paths
+    monkeypatch.chdir(tmp_path)
+
+    def flow(directory):
+        return Flow(
+            Materialization("scanchain", chain_width = 2),
+            Translation(),
+            SwitchPathAnnotation(),
+            ProgCircuitryInsertion(),
+            VerilogCollection(os.path.join(directory, "rtl")),
+            VPRArchGeneration(os.path.join(directory, "arch.xml")),
+            checkpoint_dir = "checkpoints",
+            )
+
+    flow("first").run(build_architecture())
+
+    # resume in a fresh context
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger = "prga.passes.flow"):
+        flow("resumed").run(build_architecture(), resume = True)
+    skipped = set(message.split("'")[1] for message in caplog.messages
+            if message.startswith("skipping pass"))
+    assert skipped == {"materialization", "translation", "annotation.switch_path", "prog.insertion"}
+
+    assert (files := read_tree(tmp_path / "first"))
+    assert read_tree(tmp_path / "resumed") == files
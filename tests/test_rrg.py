@@ -0,0 +1,113 @@
+# -*- encoding: ascii -*-
+
+from prga.core.context import Context
+from prga.passes.vpr.rrg import VPR_RRG_Generation
+from prga.passes.vpr.rrgbin import compare_rrg
+from prga.netlist import ModuleUtils
+from prga.exception import PRGAAPIError
+from conftest import build_fabric
+
+from lxml import etree
+from collections import Counter
+import os, gzip, zlib, re, logging
+
+import pytest
+
+def read_rrg(f):
+    """Read the routing resource graph ``f``. Nodes are identified by their contents instead of their IDs.
+
+    Returns:
+        :obj:`Counter`: Nodes
+        :obj:`Counter`: Edges
+        :obj:`list`: Other sections
+    """
+    with (gzip.open(f) if f.endswith(".gz") else open(f, "rb")) as stream:
+        tree = etree.parse(stream)
+    nodes = {}
+    for node in tree.iter("node"):
+        nodes[node.attrib.pop("id")] = etree.tostring(node, with_tail = False)
+    edges = Counter()
+    for edge in tree.iter("edge"):
+        source, sink = nodes[edge.attrib.pop("src_node")], nodes[edge.attrib.pop("sink_node")]
+        edges[source, sink, etree.tostring(edge, with_tail = False)] += 1
+    others = [etree.tostring(e, with_tail = False) for e in tree.getroot() if e.tag not in ("rr_nodes", "rr_edges")]
+    return Counter(nodes.values()), edges, others
+
+def gzip_members(f):
+    """Count the members in the gzip file ``f``. Raises an error if the file is truncated or corrupted."""
+    with open(f, "rb") as stream:
+        data = stream.read()
+    count = 0
+    while data:
+        decompressor = zlib.decompressobj(31)
+        decompressor.decompress(data)
+        assert decompressor.eof
+        data, count = decompressor.unused_data, count + 1
+    return count
+
+def test_binary_rrg(fabric, tmp_path):
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+    VPR_RRG_Generation(str(tmp_path / "rrg.xml")).run(context)
+    VPR_RRG_Generation(str(tmp_path / "rrg.bin")).run(context)
+    assert compare_rrg(str(tmp_path / "rrg.xml"), str(tmp_path / "rrg.bin")) > 0
+
+def test_gzipped_binary_rrg(fabric, tmp_path):
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+    with pytest.raises(PRGAAPIError):
+        VPR_RRG_Generation(str(tmp_path / "rrg.bin.gz")).run(context)
+    assert not (tmp_path / "rrg.bin.gz").exists()
+
+def test_compositional_conn_graph(fabric, tmp_path, monkeypatch):
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+
+    # capture the arguments used by VPR RRG generation
+    calls, reduce_conn_graph = [], ModuleUtils.reduce_conn_graph
+    def capture(module, **kwargs):
+        calls.append( (module, kwargs) )
+        return reduce_conn_graph(module, **kwargs)
+    monkeypatch.setattr(ModuleUtils, "reduce_conn_graph", capture)
+    VPR_RRG_Generation(str(tmp_path / "rrg.xml")).run(context)
+    (top, kwargs), = calls
+
+    # node attributes assign IDs in the order the nodes are created, so they are left out
+    kwargs.update(node_attrs = lambda n: {}, store_paths = True)
+    graphs = []
+    for summaries in ({}, None):
+        g = reduce_conn_graph(top, **dict(kwargs, summaries = summaries))
+        graphs.append( (list(g.nodes), [(u, v, repr(path)) for u, v, path in g.edges(data = "path")]) )
+    assert graphs[0][1]
+    assert graphs[0] == graphs[1]
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_parallel_rrg(fabric, tmp_path, compress):
+    context = Context.unpickle(os.path.join(fabric("scanchain"), "ctx.pkl"))
+    f = str(tmp_path / ("rrg.xml.gz" if compress else "rrg.xml"))
+    VPR_RRG_Generation(f, jobs = 2).run(context)
+    assert context.summary.vpr["rrg"] == f
+
+    # the RRG of the fabric is generated with 1 job
+    nodes, edges, others = read_rrg(f)
+    assert nodes and edges
+    assert (nodes, edges, others) == read_rrg(os.path.join(fabric("scanchain"), "rrg.xml"))
+    if compress:
+        # one member for the head and tail of the file, and one per band
+        assert gzip_members(f) > 2
+
+@pytest.fixture(scope = "module")
+def large_fabric(tmp_path_factory):
+    """Context of a fabric large enough for edge templates to be replicated. Templates are only shared by tiles and
+    switch boxes at least ``margin`` (longest segment + 2) positions away from the edges of the fabric, so the fabric
+    must be larger than 2 * margin in both dimensions."""
+    return build_fabric(str(tmp_path_factory.mktemp("large")), "scanchain", 12, 12, chain_width = 2)
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_edge_templates(large_fabric, tmp_path, caplog, jobs):
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger = "prga.passes.vpr.rrg"):
+        VPR_RRG_Generation(str(tmp_path / "templates.xml"), jobs = jobs).run(large_fabric)
+    replicated = [int(m.group(1)) for m in map(re.compile(r"\s*\.\. Edges of (\d+) sink node bits replicated").match,
+        caplog.messages) if m]
+    assert replicated and replicated[0] > 0
+
+    VPR_RRG_Generation(str(tmp_path / "plain.xml"), edge_templates = False, jobs = jobs).run(large_fabric)
+    assert (tmp_path / "templates.xml").read_bytes() == (tmp_path / "plain.xml").read_bytes()
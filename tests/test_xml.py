@@ -0,0 +1,24 @@
+# -*- encoding: ascii -*-
+
+from prga.benchmark import _rrg_like_xml
+from prga.xml import XMLGenerator
+
+from io import BytesIO
+
+import pytest
+
+@pytest.mark.parametrize("pretty", [True, False])
+def test_fast_xml_generator(pretty):
+    assert _rrg_like_xml(1000, pretty, True) == _rrg_like_xml(1000, pretty, False)
+
+def test_fast_xml_attr_cache():
+    outputs = []
+    for fast in (True, False):
+        ostream = BytesIO()
+        with XMLGenerator(ostream, True, fast = fast, attr_cache_size = 8) as xml, xml.element("top"):
+            for i in range(100):
+                xml.element_leaf("pin", {"name": "i[{}]".format(i % 20), "type": "<input>"})
+            if fast:
+                assert len(xml._attrs) <= 8
+        outputs.append(ostream.getvalue())
+    assert outputs[0] == outputs[1]